@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Content-addressed backup store for tweets.json.
+
+Snapshots are gzip-compressed and stored once per distinct content under
+`backups/objects/<sha256>.json.gz`; `backups/index.json` lists (timestamp, hash) entries.
+Saving identical contents twice costs one hash and no write. A retention policy keeps the
+last N entries, one per hour for the last 2 days and one per day for the last 30 days;
+objects no longer referenced are deleted.
+"""
+from __future__ import annotations
+import gzip
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+KEEP_LAST = 20
+HOURLY_SECONDS = 2 * 24 * 3600
+DAILY_SECONDS = 30 * 24 * 3600
+
+LEGACY_RE = re.compile(r"\.bak\.(\d{8}_\d{6})$")
+
+
+class BackupStore:
+    def __init__(self, target: str, root: Optional[str] = None):
+        self.target = target
+        self.root = root or os.path.join(os.path.dirname(os.path.abspath(target)), "backups")
+        self.objects = os.path.join(self.root, "objects")
+        self.index_path = os.path.join(self.root, "index.json")
+
+    # --- index ---
+    def _load_index(self) -> List[Dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return []
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return []
+
+    def _save_index(self, entries: List[Dict[str, Any]]):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.replace(tmp, self.index_path)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.objects, f"{digest}.json.gz")
+
+    # --- write ---
+    def add(self, data: bytes, ts: Optional[int] = None) -> Optional[str]:
+        """Record a snapshot of `data`. Returns the object path, or None if it equals the latest snapshot."""
+        ts = int(ts if ts is not None else time.time())
+        digest = hashlib.sha256(data).hexdigest()
+        entries = self._load_index()
+        if entries and entries[-1]["hash"] == digest:
+            return None
+        os.makedirs(self.objects, exist_ok=True)
+        obj = self._object_path(digest)
+        if not os.path.exists(obj):
+            tmp = obj + ".tmp"
+            with gzip.open(tmp, "wb", compresslevel=6) as f:
+                f.write(data)
+            os.replace(tmp, obj)
+        entries.append({"ts": ts, "hash": digest, "size": len(data)})
+        entries.sort(key=lambda e: e["ts"])
+        self._save_index(self.apply_retention(entries))
+        return obj
+
+    def backup_target(self) -> Optional[str]:
+        """Snapshot the current contents of the target file (called before overwriting it)."""
+        if not os.path.exists(self.target):
+            return None
+        with open(self.target, "rb") as f:
+            return self.add(f.read())
+
+    # --- retention ---
+    def apply_retention(self, entries: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = now if now is not None else time.time()
+        keep = set()
+        newest_first = sorted(range(len(entries)), key=lambda i: entries[i]["ts"], reverse=True)
+        keep.update(newest_first[:KEEP_LAST])
+        seen_hours, seen_days = set(), set()
+        for i in newest_first:
+            age = now - entries[i]["ts"]
+            hour, day = entries[i]["ts"] // 3600, entries[i]["ts"] // 86400
+            if age <= HOURLY_SECONDS and hour not in seen_hours:
+                seen_hours.add(hour)
+                keep.add(i)
+            if age <= DAILY_SECONDS and day not in seen_days:
+                seen_days.add(day)
+                keep.add(i)
+        kept = [entries[i] for i in sorted(keep)]
+        self._gc({e["hash"] for e in kept})
+        return kept
+
+    def _gc(self, live: set):
+        if not os.path.isdir(self.objects):
+            return
+        for name in os.listdir(self.objects):
+            if name.endswith(".json.gz") and name[:-len(".json.gz")] not in live:
+                try:
+                    os.unlink(os.path.join(self.objects, name))
+                except OSError:
+                    pass
+
+    # --- read ---
+    def list(self) -> List[Dict[str, Any]]:
+        """Entries newest first."""
+        return list(reversed(self._load_index()))
+
+    def find(self, ref: str) -> Optional[Dict[str, Any]]:
+        """`ref` is a position from list() (1 = newest) or a hash prefix."""
+        entries = self.list()
+        if ref.isdigit() and len(ref) < 6:
+            i = int(ref) - 1
+            return entries[i] if 0 <= i < len(entries) else None
+        matches = [e for e in entries if e["hash"].startswith(ref)]
+        return matches[0] if matches else None
+
+    def read(self, digest: str) -> bytes:
+        with gzip.open(self._object_path(digest), "rb") as f:
+            return f.read()
+
+    def restore(self, ref: str) -> Optional[Dict[str, Any]]:
+        """Replace the target with a snapshot (the current contents are backed up first)."""
+        entry = self.find(ref)
+        if entry is None:
+            return None
+        data = self.read(entry["hash"])
+        self.backup_target()
+        tmp = self.target + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.target)
+        return entry
+
+    def import_legacy(self, remove: bool = True) -> int:
+        """Absorb old `tweets.json.bak.<YYYYmmdd_HHMMSS>` copies into the store."""
+        folder = os.path.dirname(os.path.abspath(self.target))
+        prefix = os.path.basename(self.target) + ".bak."
+        found = []
+        for name in os.listdir(folder):
+            m = LEGACY_RE.search(name)
+            if name.startswith(prefix) and m:
+                ts = int(time.mktime(time.strptime(m.group(1), "%Y%m%d_%H%M%S")))
+                found.append((ts, os.path.join(folder, name)))
+        entries = self._load_index()
+        known = {e["hash"] for e in entries}
+        os.makedirs(self.objects, exist_ok=True)
+        for ts, path in sorted(found):
+            with open(path, "rb") as f:
+                data = f.read()
+            digest = hashlib.sha256(data).hexdigest()
+            if digest not in known:
+                obj = self._object_path(digest)
+                with gzip.open(obj, "wb", compresslevel=6) as f:
+                    f.write(data)
+                known.add(digest)
+            if not any(e["hash"] == digest and e["ts"] == ts for e in entries):
+                entries.append({"ts": ts, "hash": digest, "size": len(data)})
+        entries.sort(key=lambda e: e["ts"])
+        # consecutive identical snapshots carry no information
+        deduped = [e for i, e in enumerate(entries) if i == 0 or e["hash"] != entries[i - 1]["hash"]]
+        self._save_index(self.apply_retention(deduped))
+        if remove:
+            for _, path in found:
+                os.unlink(path)
+        return len(found)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Chromium launch profiles (launch_profiles.py) on this machine: launch time, time-to-textbox
+and peak RSS of all browser processes.
+
+time-to-textbox is new_context + goto(compose) + the compose textbox appearing, with
+storage_state.json if it exists; a run where the textbox does not show up counts as failed.
+Peak RSS is the largest sum of the Chromium processes' RSS seen during the run (sampled every
+50 ms with psutil, or /proc on Linux). Headed profiles need a display.
+
+Usage:
+  python benchmarks/bench_launch.py                               # كل الملفات، 3 مرات
+  python benchmarks/bench_launch.py --profiles minimal-ci low-memory --runs 5
+  python benchmarks/bench_launch.py --no-compose                  # زمن الإطلاق والذاكرة فقط
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from launch_profiles import (COMPOSE_TEXTBOX, PROFILES, compose_url, context_kwargs,  # noqa: E402
+                             get_profile, launch_kwargs)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORAGE = os.path.join(ROOT, "storage_state.json")
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _browser_rss_psutil() -> int:
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            if "chrom" in child.name().lower() or "headless_shell" in child.name():
+                total += child.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+def _browser_rss_proc() -> int:
+    # /proc/<pid>/stat: pid (comm) state ppid ...
+    parents, names = {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        parents[int(entry)] = int(stat[stat.rindex(")") + 2:].split()[1])
+        names[int(entry)] = name
+    mine = {os.getpid()}
+    grew = True
+    while grew:
+        grew = False
+        for pid, ppid in parents.items():
+            if ppid in mine and pid not in mine:
+                mine.add(pid)
+                grew = True
+    total = 0
+    page = os.sysconf("SC_PAGE_SIZE")
+    for pid in mine:
+        if "chrom" not in names[pid].lower() and "headless_shell" not in names[pid]:
+            continue
+        try:
+            with open(f"/proc/{pid}/statm", "r") as f:
+                total += int(f.read().split()[1]) * page
+        except OSError:
+            pass
+    return total
+
+
+if psutil is not None:
+    browser_rss = _browser_rss_psutil
+elif os.path.isdir("/proc"):
+    browser_rss = _browser_rss_proc
+else:
+    browser_rss = None
+
+
+class PeakSampler:
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, browser_rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if browser_rss is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+async def one_run(p, profile, compose: bool):
+    """(launch seconds, textbox seconds or None, peak RSS bytes, ok)."""
+    with PeakSampler() as sampler:
+        t0 = time.perf_counter()
+        browser = await p.chromium.launch(**launch_kwargs(profile))
+        launched = time.perf_counter() - t0
+        textbox, ok = None, True
+        try:
+            if compose:
+                t1 = time.perf_counter()
+                storage = STORAGE if os.path.exists(STORAGE) else None
+                context = await browser.new_context(storage_state=storage, **context_kwargs(profile))
+                page = await context.new_page()
+                try:
+                    await page.goto(compose_url(), timeout=60000)
+                    await page.wait_for_selector(COMPOSE_TEXTBOX, timeout=45000)
+                    textbox = time.perf_counter() - t1
+                except Exception as e:
+                    print(f"  {profile['name']}: no textbox ({type(e).__name__})")
+                    ok = False
+                await context.close()
+        finally:
+            await browser.close()
+    return launched, textbox, sampler.peak, ok
+
+
+async def run(names, runs, compose):
+    from playwright.async_api import async_playwright
+
+    if compose and not os.path.exists(STORAGE):
+        print("storage_state.json not found: compose will load logged out (time-to-textbox may fail)")
+    if browser_rss is None:
+        print("RSS not available on this platform (pip install psutil)")
+    results = {}
+    async with async_playwright() as p:
+        for name in names:
+            profile = get_profile(name)
+            results[name] = [await one_run(p, profile, compose) for _ in range(runs)]
+
+    print(f"{'profile':<14} {'launch':>9} {'textbox':>9} {'peak RSS':>11} {'ok':>6}")
+    for name, rows in results.items():
+        launch = statistics.median(r[0] for r in rows)
+        boxes = [r[1] for r in rows if r[1] is not None]
+        box = f"{statistics.median(boxes):8.2f}s" if boxes else "      n/a"
+        peak = max(r[2] for r in rows)
+        peak_s = f"{peak / 1024 / 1024:7.0f} MiB" if peak else "        n/a"
+        ok = sum(1 for r in rows if r[3])
+        print(f"{name:<14} {launch:8.2f}s {box} {peak_s} {ok:>3}/{len(rows)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-compose", action="store_true", help="launch only, no compose page")
+    args = parser.parse_args()
+    asyncio.run(run(args.profiles, args.runs, not args.no_compose))
+
+
+if __name__ == "__main__":
+    main()
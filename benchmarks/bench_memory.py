@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""
+Memory benchmark: plain dicts vs Tweet / PostHistory.
+
+Usage:
+  python benchmarks/bench_memory.py              # 100k و 1M
+  python benchmarks/bench_memory.py 50000
+"""
+from __future__ import annotations
+import gc
+import hashlib
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tweet_models import PostHistory, Tweet  # noqa: E402
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - t0
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    gc.collect()
+    return size, elapsed
+
+
+def tweet_dicts(n, texts):
+    return [{"id": f"t{i}", "text": texts[i % len(texts)], "hashtags": ["#a", "#b"], "enabled": True} for i in range(n)]
+
+
+def tweet_objects(n, texts):
+    return [Tweet(id=f"t{i}", text=texts[i % len(texts)], hashtags=["#a", "#b"], enabled=True) for i in range(n)]
+
+
+def history_dicts(n, hashes):
+    return [{"hash": hashes[i % len(hashes)], "timestamp": 1_700_000_000 + i} for i in range(n)]
+
+
+def history_columns(n, hashes):
+    hist = PostHistory()
+    for i in range(n):
+        hist.append(hashes[i % len(hashes)], 1_700_000_000 + i)
+    return hist
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [100_000, 1_000_000]
+    # texts/hashes shared across rows so we measure the container overhead, not the payload
+    texts = [f"نص تغريدة تجريبي رقم {i}" for i in range(1000)]
+    # history hashes are unique per post in practice: generate them up front (not measured)
+    for n in sizes:
+        hashes = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(n)]
+        print(f"--- n={n:,}")
+        for label, fn, arg in (
+            ("tweets: dict", tweet_dicts, texts),
+            ("tweets: Tweet(slots)", tweet_objects, texts),
+            ("history: list[dict]", history_dicts, hashes),
+            ("history: PostHistory", history_columns, hashes),
+        ):
+            size, elapsed = measure(lambda: fn(n, arg))
+            print(f"{label:<24} {size / 1024 / 1024:9.1f} MiB  {size / n:7.1f} B/record  {elapsed:6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+End-to-end posting benchmark: post_with_retries() / post_tweet() against the local stand-in
+compose server (benchmarks/compose_server.py), many times in one browser.
+
+Reports per post: latency of post_with_retries() (p50/p95/p99), time until the server accepted
+the CreateTweet call ("confirmed"), posts per minute, retry rate (extra post_tweet() attempts
+per post), posts the poster reported as sent but the server rejected, and peak RSS of this
+process and of Chromium. Failures are injected by the server (see its --fail-rate /
+--page-fail-rate); the compose textbox timeout, post-send wait and retry delay are lowered to
+the values below so a failing page costs seconds, not minutes.
+
+Results can be kept as JSON baselines in benchmarks/baselines/<name>.json and compared later;
+the comparison exits with 1 when a metric is worse than the baseline by more than --tolerance.
+
+Usage:
+  python benchmarks/bench_post.py                                  # 50 منشوراً، 200ms للإرسال
+  python benchmarks/bench_post.py --posts 200 --fail-rate 0.05 --page-fail-rate 0.05
+  python benchmarks/bench_post.py --parts 3                        # سلاسل من 3 أجزاء
+  python benchmarks/bench_post.py --save-baseline default
+  python benchmarks/bench_post.py --compare default                # رمز خروج 1 عند التراجع
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+from bench_launch import PeakSampler  # noqa: E402
+from compose_server import ComposeServer  # noqa: E402
+
+BASELINE_DIR = os.path.join(HERE, "baselines")
+BASELINE_VERSION = 1
+# metric -> True when bigger is better
+COMPARED = {
+    "latency_p50": False, "latency_p95": False, "latency_p99": False,
+    "confirm_p95": False, "posts_per_minute": True, "retry_rate": False,
+    "python_peak_rss_mib": False, "browser_peak_rss_mib": False,
+}
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100); None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
+
+
+def python_peak_rss_mib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def post_content(i, parts):
+    # "[b<i>]" starts every post so the server's log can be matched back to it
+    text = f"[b{i}] تغريدة قياس الأداء رقم {i} مع نص عربي يكفي لملء الصندوق"
+    if parts == 1:
+        return text
+    return [text] + [f"[b{i}] الجزء {k + 1}" for k in range(1, parts)]
+
+
+async def run(args, server):
+    # open_compose() reads COMPOSE_URL per call; post_tweets writes debug_outputs/ and runner.log in the cwd
+    os.environ["COMPOSE_URL"] = server.url
+    os.chdir(tempfile.mkdtemp(prefix="bench_post_"))
+    import post_tweets as pt
+    from launch_profiles import context_kwargs, get_profile, launch_kwargs
+    from playwright.async_api import async_playwright
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    pt.COMPOSE_TIMEOUT_MS = args.textbox_timeout
+    pt.POST_SETTLE_SECONDS = args.settle
+
+    attempts = []
+    post_tweet = pt.post_tweet
+
+    async def counted_post_tweet(*a, **kw):
+        attempts[-1] += 1
+        return await post_tweet(*a, **kw)
+
+    # post_with_retries() looks post_tweet up at call time
+    pt.post_tweet = counted_post_tweet
+
+    profile = get_profile(args.profile)
+    rows = []
+    with PeakSampler() as sampler:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(**launch_kwargs(profile))
+            context = await browser.new_context(**context_kwargs(profile))
+            page = await context.new_page()
+            started = time.perf_counter()
+            for i in range(args.posts):
+                content = post_content(i, args.parts)
+                attempts.append(0)
+                t0 = time.perf_counter()
+                ok = await pt.post_with_retries(page, content, retries=args.retries, delay=args.retry_delay)
+                rows.append({"marker": f"[b{i}]", "start": t0, "latency": time.perf_counter() - t0, "ok": ok})
+            total = time.perf_counter() - started
+            # let the last CreateTweet calls finish before reading the server's log
+            await asyncio.sleep((server.latency_ms + server.jitter_ms) / 1000 + 0.5)
+            await context.close()
+            await browser.close()
+
+    accepted = {}
+    for c in server.creates:
+        if c["ok"] and c["parts"]:
+            first = c["parts"][0]
+            marker = first[:first.index("]") + 1] if first.startswith("[b") else None
+            accepted.setdefault(marker, c["answered"])
+    confirm = [accepted[r["marker"]] - r["start"] for r in rows if r["marker"] in accepted]
+    latency = [r["latency"] for r in rows]
+    reported = sum(1 for r in rows if r["ok"])
+    confirmed = sum(1 for r in rows if r["ok"] and r["marker"] in accepted)
+
+    def ms(v):
+        return None if v is None else round(v * 1000, 1)
+
+    return {
+        "version": BASELINE_VERSION,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "config": {"posts": args.posts, "parts": args.parts, "profile": profile["name"],
+                   "latency_ms": server.latency_ms, "jitter_ms": server.jitter_ms,
+                   "fail_rate": server.fail_rate, "page_fail_rate": server.page_fail_rate,
+                   "retries": args.retries, "retry_delay": args.retry_delay,
+                   "settle": args.settle, "textbox_timeout": args.textbox_timeout},
+        "reported_ok": reported,
+        "confirmed": confirmed,
+        "unconfirmed": reported - confirmed,
+        "failed": len(rows) - reported,
+        "attempts": sum(attempts),
+        "retry_rate": round((sum(attempts) - len(rows)) / len(rows), 3) if rows else 0,
+        "latency_p50": ms(percentile(latency, 50)),
+        "latency_p95": ms(percentile(latency, 95)),
+        "latency_p99": ms(percentile(latency, 99)),
+        "latency_mean": ms(statistics.mean(latency)) if latency else None,
+        "confirm_p50": ms(percentile(confirm, 50)),
+        "confirm_p95": ms(percentile(confirm, 95)),
+        "posts_per_minute": round(len(rows) / total * 60, 1) if total else None,
+        "python_peak_rss_mib": python_peak_rss_mib(),
+        "browser_peak_rss_mib": round(sampler.peak / 1024 / 1024, 1) if sampler.peak else None,
+        "server": server.stats(),
+    }
+
+
+def report(result):
+    print(f"posts: {result['config']['posts']} x {result['config']['parts']} part(s), profile {result['config']['profile']}")
+    print(f"  ok {result['reported_ok']} (confirmed by server {result['confirmed']}, "
+          f"rejected but reported ok {result['unconfirmed']}), failed {result['failed']}")
+    print(f"  latency ms  p50 {result['latency_p50']}  p95 {result['latency_p95']}  p99 {result['latency_p99']}")
+    print(f"  confirm ms  p50 {result['confirm_p50']}  p95 {result['confirm_p95']}")
+    print(f"  {result['posts_per_minute']} posts/min, retry rate {result['retry_rate']}")
+    print(f"  peak RSS MiB: python {result['python_peak_rss_mib']}, chromium {result['browser_peak_rss_mib']}")
+
+
+def compare(result, name, tolerance):
+    """Print metric vs baseline; returns True when something regressed beyond tolerance."""
+    with open(os.path.join(BASELINE_DIR, name + ".json"), "r", encoding="utf-8") as f:
+        base = json.load(f)
+    if base.get("config") != result["config"]:
+        print(f"warning: baseline '{name}' was recorded with a different config: {base.get('config')}")
+    regressed = False
+    print(f"{'metric':<22} {'baseline':>10} {'now':>10} {'change':>8}")
+    for key, higher_better in COMPARED.items():
+        old, new = base.get(key), result.get(key)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+        worse = -change if higher_better else change
+        flag = ""
+        if worse > tolerance:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"{key:<22} {old:>10} {new:>10} {change:>+7.0%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--posts", type=int, default=50)
+    parser.add_argument("--parts", type=int, default=1, help="thread parts per post")
+    parser.add_argument("--latency", type=int, default=200, help="CreateTweet latency (ms)")
+    parser.add_argument("--jitter", type=int, default=50)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--page-fail-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0, help="failure injection seed")
+    parser.add_argument("--profile", default=None, help="launch profile (LAUNCH_PROFILE)")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--retry-delay", type=float, default=0.5)
+    parser.add_argument("--settle", type=float, default=0.5, help="wait after sending (poster: 2s)")
+    parser.add_argument("--textbox-timeout", type=int, default=3000, help="ms (poster: 45000)")
+    parser.add_argument("--save-baseline", metavar="NAME")
+    parser.add_argument("--compare", metavar="NAME")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--verbose", action="store_true", help="keep the poster's INFO logging")
+    args = parser.parse_args()
+
+    server = ComposeServer(latency_ms=args.latency, jitter_ms=args.jitter, fail_rate=args.fail_rate,
+                           page_fail_rate=args.page_fail_rate, seed=args.seed)
+    server.start()
+    try:
+        result = asyncio.run(run(args, server))
+    finally:
+        server.stop()
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        report(result)
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, args.save_baseline + ".json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"Saved baseline {path}")
+    if args.compare and compare(result, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
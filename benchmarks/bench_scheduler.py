@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+post_scheduler.PostScheduler on a simulated clock: N accounts over one day, each post taking
+20-90 s. Compares with every account choosing its own randint(30 min, 3 h) (the poster without
+the scheduler): peak simultaneous posts and the busiest minute. Also reports the scheduler's
+cost per one-second tick and the longest wait of a due account.
+
+Usage:
+  python benchmarks/bench_scheduler.py                       # 100, 1000, 10000 حساب
+  python benchmarks/bench_scheduler.py 5000 --concurrency 4 --min-spacing 10
+"""
+from __future__ import annotations
+import argparse
+import heapq
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from post_scheduler import (CONCURRENCY, MAX_INTERVAL_SECONDS, MIN_INTERVAL_SECONDS,  # noqa: E402
+                            MIN_SPACING, PostScheduler)
+
+DAY = 24 * 3600
+
+
+def unscheduled(n, rng):
+    """Each account on its own: all start at t=0, then randint(MIN, MAX) after each post."""
+    starts = []
+    for _ in range(n):
+        t = 0
+        while t < DAY:
+            starts.append((t, rng.randint(20, 90)))
+            t += rng.randint(MIN_INTERVAL_SECONDS, MAX_INTERVAL_SECONDS)
+    return starts
+
+
+def scheduled(n, rng, concurrency, min_spacing):
+    sched = PostScheduler(0, concurrency, min_spacing, rng=rng)
+    for i in range(n):
+        sched.add_new(f"acc{i}", 0)
+    due_at = dict(sched.due)
+    finishing = []  # (end, account)
+    starts, waits, tick_ns = [], [], []
+    for now in range(1, DAY + 1):
+        while finishing and finishing[0][0] <= now:
+            _, account = heapq.heappop(finishing)
+            sched.finished(account, now)
+            due_at[account] = sched.due[account]
+        t0 = time.perf_counter_ns()
+        started = sched.tick(now)
+        tick_ns.append(time.perf_counter_ns() - t0)
+        for account in started:
+            duration = rng.randint(20, 90)
+            starts.append((now, duration))
+            waits.append(now - due_at[account])
+            heapq.heappush(finishing, (now + duration, account))
+    return starts, waits, tick_ns, len(sched.ready)
+
+
+def load_profile(starts):
+    """(peak simultaneous posts, most starts in one minute)."""
+    events = Counter()
+    for t, d in starts:
+        events[t] += 1
+        events[t + d] -= 1
+    running = peak = 0
+    for t in sorted(events):
+        running += events[t]
+        peak = max(peak, running)
+    per_minute = Counter(t // 60 for t, _ in starts)
+    return peak, max(per_minute.values()) if per_minute else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=[100, 1000, 10_000])
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--min-spacing", type=int, default=MIN_SPACING)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"concurrency {args.concurrency}, min spacing {args.min_spacing}s, one simulated day")
+    for n in args.sizes:
+        rng = random.Random(args.seed)
+        peak_u, minute_u = load_profile(unscheduled(n, rng))
+        starts, waits, tick_ns, backlog = scheduled(n, rng, args.concurrency, args.min_spacing)
+        peak_s, minute_s = load_profile(starts)
+        tick_ns.sort()
+        print(f"--- accounts={n:,}")
+        print(f"  without scheduler: peak {peak_u} simultaneous, busiest minute {minute_u} starts")
+        print(f"  with scheduler:    peak {peak_s} simultaneous, busiest minute {minute_s} starts, "
+              f"{len(starts):,} posts, waiting at end of day {backlog:,}")
+        print(f"  due->start wait: max {max(waits) if waits else 0}s; "
+              f"tick: mean {sum(tick_ns) / len(tick_ns) / 1000:.1f}µs, p99 {tick_ns[len(tick_ns) * 99 // 100] / 1000:.1f}µs, "
+              f"max {tick_ns[-1] / 1000:.0f}µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Per-edit latency: JSON TweetStore vs SqliteTweetStore.
+
+Each edit is what one `manage_tweets.py --edit` does: open the library, update one tweet,
+save. Backups are disabled for the JSON run so only the library write is measured.
+
+Usage:
+  python benchmarks/bench_storage.py                   # 10k, 100k, 1M
+  python benchmarks/bench_storage.py 10000 --edits 20
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlite_store import SqliteTweetStore  # noqa: E402
+from tweet_models import Tweet  # noqa: E402
+from tweet_store import TweetStore  # noqa: E402
+
+
+def make_tweets(n):
+    return [Tweet(id=f"t{i}", text=f"نص تغريدة تجريبي رقم {i}\n\nفقرة ثانية", hashtags=["#a", f"#h{i % 50}"])
+            for i in range(1, n + 1)]
+
+
+def bench(open_store, n, edits):
+    times = []
+    for _ in range(edits):
+        tid = f"t{random.randint(1, n)}"
+        t0 = time.perf_counter()
+        store = open_store()
+        store.update(tid, text="نص معدل", enabled=False)
+        store.save()
+        if hasattr(store, "close"):
+            store.close()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), max(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("sizes", nargs="*", type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--edits", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        for n in args.sizes:
+            tweets = make_tweets(n)
+            json_path = os.path.join(d, f"tweets_{n}.json")
+            js = TweetStore(tweets, path=json_path)
+            js.backup = lambda: None
+            js.save()
+            db_path = os.path.join(d, f"tweets_{n}.db")
+            db = SqliteTweetStore(db_path)
+            for t in tweets:
+                db.insert(t)
+            db.save()
+            db.close()
+
+            def open_json():
+                s = TweetStore.load(json_path)
+                s.backup = lambda: None
+                return s
+
+            j_med, j_max = bench(open_json, n, args.edits)
+            s_med, s_max = bench(lambda: SqliteTweetStore(db_path), n, args.edits)
+            print(f"n={n:>9,}  json: median {j_med * 1000:9.1f} ms (max {j_max * 1000:9.1f})"
+                  f"   sqlite: median {s_med * 1000:7.2f} ms (max {s_max * 1000:7.2f})")
+
+
+if __name__ == "__main__":
+    main()
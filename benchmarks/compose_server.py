@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the compose page, so the posting path can be driven without an account.
+
+GET /compose/tweet serves the parts post_tweets.py touches: a contenteditable textbox
+(tweetTextarea_0, aria-label "Tweet text"), the tweet button, the thread "add" button, the file
+input and attachments area. Ctrl+Enter or the button sends every part to
+POST /i/api/graphql/CreateTweet, which answers after `latency_ms` (± `jitter_ms`) and fails
+with 503 at `fail_rate`. With `page_fail_rate` the compose page is an error page without a
+textbox, which is what makes post_with_retries() retry. GET /stats returns the counters.
+
+Usage:
+  python benchmarks/compose_server.py --port 8765 --latency 300 --fail-rate 0.1
+  $env:COMPOSE_URL="http://127.0.0.1:8765/compose/tweet"; python post_tweets.py
+"""
+from __future__ import annotations
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+COMPOSE_PATH = "/compose/tweet"
+CREATE_PATH = "/i/api/graphql/CreateTweet"
+
+COMPOSE_HTML = """<!doctype html>
+<html dir="auto"><head><meta charset="utf-8"><title>Compose</title></head>
+<body>
+<div data-testid="composer">
+  <div id="parts">
+    <div role="textbox" contenteditable="true" aria-label="Tweet text" data-testid="tweetTextarea_0"></div>
+  </div>
+  <input type="file" data-testid="fileInput" multiple>
+  <div id="attachments-slot"></div>
+  <div role="button" data-testid="addButton">+</div>
+  <div role="button" data-testid="tweetButton" aria-disabled="true">Post</div>
+</div>
+<div id="toasts"></div>
+<script>
+const btn = document.querySelector("[data-testid='tweetButton']");
+const boxes = () => [...document.querySelectorAll("[data-testid^='tweetTextarea_']")];
+const refresh = () => btn.setAttribute("aria-disabled", boxes()[0].innerText.trim() ? "false" : "true");
+document.addEventListener("input", refresh);
+document.querySelector("[data-testid='addButton']").addEventListener("click", () => {
+  const box = document.createElement("div");
+  box.setAttribute("role", "textbox");
+  box.setAttribute("contenteditable", "true");
+  box.setAttribute("data-testid", "tweetTextarea_" + boxes().length);
+  document.getElementById("parts").appendChild(box);
+});
+document.querySelector("[data-testid='fileInput']").addEventListener("change", (e) => {
+  const slot = document.getElementById("attachments-slot");
+  slot.innerHTML = '<div data-testid="attachments">' + e.target.files.length + '</div>';
+});
+function toast(text) {
+  const el = document.createElement("div");
+  el.setAttribute("data-testid", "toast");
+  el.textContent = text;
+  document.getElementById("toasts").appendChild(el);
+}
+async function send() {
+  const parts = boxes().map(b => b.innerText);
+  if (!parts[0].trim()) return;
+  btn.setAttribute("aria-disabled", "true");
+  try {
+    const r = await fetch("%(create)s", {method: "POST", headers: {"Content-Type": "application/json"},
+                                         body: JSON.stringify({parts})});
+    if (r.ok) {
+      boxes().forEach((b, i) => i ? b.remove() : (b.innerText = ""));
+      toast("Your post was sent.");
+    } else {
+      toast("Something went wrong, but don't fret - let's give it another shot.");
+    }
+  } catch (e) {
+    toast("Network error");
+  }
+  refresh();
+}
+btn.addEventListener("click", send);
+document.addEventListener("keydown", (e) => {
+  if ((e.ctrlKey || e.metaKey) && e.key === "Enter") { e.preventDefault(); send(); }
+});
+</script>
+</body></html>
+""" % {"create": CREATE_PATH}
+
+ERROR_HTML = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Error</title></head>
+<body><div>Something went wrong. Try reloading.</div></body></html>
+"""
+
+
+class ComposeServer:
+    def __init__(self, port: int = 0, latency_ms: int = 200, jitter_ms: int = 50, fail_rate: float = 0.0,
+                 page_fail_rate: float = 0.0, page_latency_ms: int = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.page_fail_rate = page_fail_rate
+        self.page_latency_ms = page_latency_ms
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        # every CreateTweet call: {"parts", "received", "answered", "ok"} (perf_counter times)
+        self.creates: List[Dict] = []
+        self.pages = 0
+        self.page_errors = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}{COMPOSE_PATH}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            ok = sum(1 for c in self.creates if c["ok"])
+            return {"pages": self.pages, "page_errors": self.page_errors, "creates": len(self.creates),
+                    "created": ok, "create_errors": len(self.creates) - ok}
+
+    def _roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.rng.random() < rate
+
+    def _delay(self) -> float:
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code: int, body: bytes, ctype: str):
+                self.send_response(code)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == COMPOSE_PATH:
+                    if server.page_latency_ms:
+                        time.sleep(server.page_latency_ms / 1000)
+                    failed = server._roll(server.page_fail_rate)
+                    with server.lock:
+                        server.pages += 1
+                        server.page_errors += failed
+                    self._send(200, (ERROR_HTML if failed else COMPOSE_HTML).encode("utf-8"), "text/html; charset=utf-8")
+                elif path == "/stats":
+                    self._send(200, json.dumps(server.stats()).encode("utf-8"), "application/json")
+                else:
+                    self._send(404, b"not found", "text/plain")
+
+            def do_POST(self):
+                if self.path.split("?", 1)[0] != CREATE_PATH:
+                    self._send(404, b"not found", "text/plain")
+                    return
+                received = time.perf_counter()
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    parts = json.loads(self.rfile.read(length).decode("utf-8")).get("parts") or []
+                except ValueError:
+                    parts = []
+                time.sleep(server._delay())
+                ok = bool(parts) and not server._roll(server.fail_rate)
+                with server.lock:
+                    server.creates.append({"parts": parts, "received": received,
+                                           "answered": time.perf_counter(), "ok": ok})
+                if ok:
+                    self._send(200, json.dumps({"data": {"create_tweet": {"ok": True}}}).encode("utf-8"), "application/json")
+                else:
+                    self._send(503, json.dumps({"errors": [{"message": "Over capacity"}]}).encode("utf-8"), "application/json")
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=int, default=200, help="CreateTweet latency (ms)")
+    parser.add_argument("--jitter", type=int, default=50, help="± ms")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of CreateTweet calls answered 503")
+    parser.add_argument("--page-fail-rate", type=float, default=0.0, help="share of compose loads without a textbox")
+    parser.add_argument("--page-latency", type=int, default=0, help="compose page latency (ms)")
+    args = parser.parse_args()
+    server = ComposeServer(args.port, args.latency, args.jitter, args.fail_rate, args.page_fail_rate, args.page_latency)
+    print(f"Compose stand-in at {server.url}  (stats: /stats, Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(json.dumps(server.stats()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming readers/writers for bulk import/export of the tweet library.
+
+Formats:
+  jsonl — one object per line: {"text": ..., "hashtags": [...] or "a,b", "enabled": true,
+          "media": [...], "thread": true}; --export writes the same keys, so it round-trips
+  csv   — header with at least `text`; optional `hashtags` and `media` (comma separated),
+          `enabled` and `thread`
+  txt   — tweets separated by blank lines; a last line made only of #tags becomes the hashtags.
+          A blank line always starts a new tweet, so multi-paragraph tweets do not round-trip
+          through this format (use jsonl for those).
+
+Readers yield (line_no, record) where record is a dict with raw `text`, `hashtags`, `enabled`,
+`media`, `thread` (or an "error" key); validation and normalisation are done by the caller.
+"""
+from __future__ import annotations
+import csv
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, TextIO, Tuple
+
+from tweet_models import Tweet
+
+FORMATS = ("jsonl", "csv", "txt")
+_EXT = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".txt": "txt"}
+_TRUE = ("1", "true", "yes", "y", "نعم")
+
+Record = Tuple[int, Dict[str, Any]]
+
+
+def detect_format(path: str) -> str:
+    return _EXT.get(os.path.splitext(path)[1].lower(), "txt")
+
+
+def _parse_enabled(v, default: bool = True) -> bool:
+    if v is None or v == "":
+        return default
+    if isinstance(v, bool):
+        return v
+    return str(v).strip().lower() in _TRUE
+
+
+def iter_jsonl(f: TextIO) -> Iterator[Record]:
+    for n, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            yield n, {"error": f"JSON غير صالح: {e}"}
+            continue
+        if not isinstance(obj, dict):
+            yield n, {"error": "السطر ليس كائن JSON"}
+            continue
+        yield n, {"text": obj.get("text"), "hashtags": obj.get("hashtags"), "enabled": _parse_enabled(obj.get("enabled")),
+                  "media": obj.get("media"), "thread": _parse_enabled(obj.get("thread"), False)}
+
+
+def iter_csv(f: TextIO) -> Iterator[Record]:
+    reader = csv.DictReader(f)
+    if not reader.fieldnames or "text" not in reader.fieldnames:
+        yield 1, {"error": "ملف CSV يجب أن يحتوي عموداً باسم text"}
+        return
+    for row in reader:
+        yield reader.line_num, {"text": row.get("text"), "hashtags": row.get("hashtags"),
+                                "enabled": _parse_enabled(row.get("enabled")), "media": row.get("media"),
+                                "thread": _parse_enabled(row.get("thread"), False)}
+
+
+def _is_tag_line(line: str) -> bool:
+    parts = line.split()
+    return bool(parts) and all(p.startswith("#") and len(p) > 1 for p in parts)
+
+
+def iter_text(f: TextIO) -> Iterator[Record]:
+    block, start = [], 0
+    for n, line in enumerate(f, 1):
+        line = line.rstrip("\r\n")
+        if line.strip():
+            if not block:
+                start = n
+            block.append(line)
+            continue
+        if block:
+            yield start, _text_block(block)
+            block = []
+    if block:
+        yield start, _text_block(block)
+
+
+def _text_block(lines) -> Dict[str, Any]:
+    hashtags = []
+    if len(lines) > 1 and _is_tag_line(lines[-1]):
+        hashtags = lines[-1].split()
+        lines = lines[:-1]
+    return {"text": "\n".join(lines).strip(), "hashtags": hashtags, "enabled": True, "media": None, "thread": False}
+
+
+READERS = {"jsonl": iter_jsonl, "csv": iter_csv, "txt": iter_text}
+
+
+def write_jsonl(f: TextIO, tweets: Iterable[Tweet]) -> int:
+    n = 0
+    for t in tweets:
+        f.write(json.dumps(t.to_dict(), ensure_ascii=False))
+        f.write("\n")
+        n += 1
+    return n
+
+
+def write_csv(f: TextIO, tweets: Iterable[Tweet]) -> int:
+    w = csv.writer(f)
+    w.writerow(["id", "text", "hashtags", "enabled", "media", "thread"])
+    n = 0
+    for t in tweets:
+        w.writerow([t.id, t.text, ",".join(t.hashtags), "true" if t.enabled else "false", ",".join(t.media),
+                    "true" if t.thread else "false"])
+        n += 1
+    return n
+
+
+def write_text(f: TextIO, tweets: Iterable[Tweet]) -> int:
+    n = 0
+    for t in tweets:
+        if n:
+            f.write("\n")
+        # paragraphs are joined with single newlines: a blank line separates tweets here
+        f.write("\n".join(p for p in t.text.splitlines() if p.strip()))
+        f.write("\n")
+        if t.hashtags:
+            f.write(" ".join(t.hashtags) + "\n")
+        n += 1
+    return n
+
+
+WRITERS = {"jsonl": write_jsonl, "csv": write_csv, "txt": write_text}
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Durable posting queue (SQLite) between tweet management and posting workers.
+
+`manage_tweets.py --enqueue` and the GUI add jobs (a tweet, an optional time slot and an
+optional account); `post_tweets.py` workers claim due jobs with a lease (visibility timeout).
+
+At-most-once posting: a worker must call `begin_posting()` right before submitting. That
+succeeds only while its lease is still valid, and a job that expires in the "posting" state is
+marked "abandoned" instead of being handed to another worker (it may already be on the timeline).
+
+Journal mode: WAL by default. WAL needs shared memory between processes, so for a queue on a
+network share used from several machines set JOB_QUEUE_JOURNAL=DELETE.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import socket
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+QUEUE_DB = os.getenv("JOB_QUEUE_DB") or os.path.join(ROOT, "jobs.db")
+DEFAULT_VISIBILITY_SECONDS = 15 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idem_key TEXT NOT NULL UNIQUE,
+    tweet_id TEXT NOT NULL,
+    text_hash TEXT NOT NULL,
+    account TEXT,
+    not_before INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    lease_owner TEXT,
+    lease_expires INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at INTEGER NOT NULL,
+    updated_at INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_due ON jobs(status, not_before);
+"""
+
+# queued -> leased -> posting -> done|failed ; leased (expired) -> queued ; posting (expired) -> abandoned
+ACTIVE_STATUSES = ("queued", "leased", "posting")
+
+
+def canonical_hash(text: str) -> str:
+    # sha256 of the exact text: post history, post_plan.json and job idempotency keys
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_idem_key(text: str, account: Optional[str], not_before: int) -> str:
+    """Same text + account + hour slot = same job; enqueueing it twice is a no-op."""
+    slot = int(not_before) // 3600
+    return f"{canonical_hash(text)}:{account or '*'}:{slot}"
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    def __init__(self, path: str = QUEUE_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        journal = os.getenv("JOB_QUEUE_JOURNAL", "WAL")
+        self.conn.execute(f"PRAGMA journal_mode={journal}")
+        self.conn.execute("PRAGMA synchronous=NORMAL" if journal.upper() == "WAL" else "PRAGMA synchronous=FULL")
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def open_if_exists(cls, path: str = QUEUE_DB) -> Optional["JobQueue"]:
+        """Workers use this so that runs without a queue don't create jobs.db."""
+        return cls(path) if os.path.exists(path) else None
+
+    def close(self):
+        self.conn.close()
+
+    def _tx(self):
+        # BEGIN IMMEDIATE takes the write lock up front: claims never race each other
+        self.conn.execute("BEGIN IMMEDIATE")
+
+    # --- producers ---
+    def enqueue(self, tweet_id: str, text: str, account: Optional[str] = None,
+                not_before: Optional[int] = None, idem_key: Optional[str] = None) -> Dict[str, Any]:
+        """Add a job; returns {"id": ..., "created": bool}. Duplicates (same idem_key) are not re-added."""
+        now = int(time.time())
+        not_before = int(not_before or now)
+        key = idem_key or make_idem_key(text, account, not_before)
+        self._tx()
+        try:
+            row = self.conn.execute("SELECT id FROM jobs WHERE idem_key = ?", (key,)).fetchone()
+            if row:
+                self.conn.execute("COMMIT")
+                return {"id": row["id"], "created": False}
+            cur = self.conn.execute(
+                "INSERT INTO jobs (idem_key, tweet_id, text_hash, account, not_before, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, tweet_id, canonical_hash(text), account, not_before, now, now),
+            )
+            self.conn.execute("COMMIT")
+            return {"id": cur.lastrowid, "created": True}
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def cancel(self, job_id: int) -> bool:
+        cur = self.conn.execute(
+            "UPDATE jobs SET status = 'cancelled', updated_at = ? WHERE id = ? AND status = 'queued'",
+            (int(time.time()), job_id),
+        )
+        return cur.rowcount == 1
+
+    def list(self, statuses: Optional[List[str]] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        if statuses:
+            marks = ",".join("?" for _ in statuses)
+            rows = self.conn.execute(
+                f"SELECT * FROM jobs WHERE status IN ({marks}) ORDER BY not_before, id LIMIT ?", (*statuses, limit)
+            )
+        else:
+            rows = self.conn.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,))
+        return [dict(r) for r in rows]
+
+    # --- consumers ---
+    def _reap_expired(self, now: int):
+        self.conn.execute(
+            "UPDATE jobs SET status = 'queued', lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE status = 'leased' AND lease_expires < ?",
+            (now, now),
+        )
+        self.conn.execute(
+            "UPDATE jobs SET status = 'abandoned', error = 'lease expired while posting', updated_at = ?"
+            " WHERE status = 'posting' AND lease_expires < ?",
+            (now, now),
+        )
+
+    def claim(self, owner: Optional[str] = None, account: Optional[str] = None,
+              visibility: int = DEFAULT_VISIBILITY_SECONDS) -> Optional[Dict[str, Any]]:
+        """Lease the oldest due job for `account` (or with no account). Returns the job row or None."""
+        owner = owner or default_owner()
+        now = int(time.time())
+        self._tx()
+        try:
+            self._reap_expired(now)
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND not_before <= ?"
+                " AND (account IS NULL OR account = ?) ORDER BY not_before, id LIMIT 1",
+                (now, account),
+            ).fetchone()
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+            self.conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?,"
+                " attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (owner, now + visibility, now, row["id"]),
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        job = dict(row)
+        job.update(status="leased", lease_owner=owner, lease_expires=now + visibility)
+        return job
+
+    def has_due(self, account: Optional[str] = None, any_account: bool = False) -> bool:
+        """Whether claim() would find a job now (read-only; expired leases count as queued)."""
+        now = int(time.time())
+        row = self.conn.execute(
+            "SELECT 1 FROM jobs WHERE not_before <= ?"
+            " AND (status = 'queued' OR (status = 'leased' AND lease_expires < ?))"
+            " AND (? OR account IS NULL OR account = ?) LIMIT 1",
+            (now, now, int(any_account), account),
+        ).fetchone()
+        return row is not None
+
+    def begin_posting(self, job: Dict[str, Any], visibility: int = DEFAULT_VISIBILITY_SECONDS) -> bool:
+        """Fence before submitting: False means the lease was lost and the job must NOT be posted."""
+        now = int(time.time())
+        cur = self.conn.execute(
+            "UPDATE jobs SET status = 'posting', lease_expires = ?, updated_at = ?"
+            " WHERE id = ? AND status = 'leased' AND lease_owner = ? AND lease_expires >= ?",
+            (now + visibility, now, job["id"], job["lease_owner"], now),
+        )
+        return cur.rowcount == 1
+
+    def complete(self, job: Dict[str, Any], ok: bool, error: Optional[str] = None):
+        # لا إعادة تلقائية بعد محاولة النشر (at-most-once) — أعد الإضافة يدوياً عند الحاجة
+        # only a job this worker still holds: not one the reaper already requeued or abandoned
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE id = ? AND status IN ('leased', 'posting') AND lease_owner = ?",
+            ("done" if ok else "failed", error, int(time.time()), job["id"], job["lease_owner"]),
+        )
+
+    def release(self, job: Dict[str, Any]):
+        """Give a leased job back untouched (e.g. cap reached before posting)."""
+        self.conn.execute(
+            "UPDATE jobs SET status = 'queued', lease_owner = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (int(time.time()), job["id"], job["lease_owner"]),
+        )
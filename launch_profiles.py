@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Named Chromium launch presets for the poster, chosen with LAUNCH_PROFILE=<name>.
+
+- default: Playwright's defaults, headless only under CI (the behaviour before profiles).
+- minimal-ci: headless shell, no GPU/extensions/background services, fixed small viewport.
+- low-memory: minimal-ci plus one renderer process, no site isolation, a capped V8 heap and
+  no service workers.
+- debug-headed: a visible maximised window with DevTools open and slowed-down actions.
+
+A profile is a dict of Chromium args, disabled features, viewport and whether to use the
+headless shell (Chromium's old, lighter headless build) or full Chrome's `--headless=new`.
+`benchmarks/bench_launch.py` measures launch time, time-to-textbox and peak RSS per profile.
+"""
+from __future__ import annotations
+import os
+from typing import Any, Dict, Optional
+
+DEFAULT_COMPOSE_URL = "https://twitter.com/compose/tweet"
+COMPOSE_TEXTBOX = "div[role='textbox'], textarea, div[aria-label='Tweet text']"
+
+_QUIET_ARGS = [
+    "--no-first-run",
+    "--no-default-browser-check",
+    "--disable-extensions",
+    "--disable-component-update",
+    "--disable-background-networking",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--mute-audio",
+]
+_QUIET_FEATURES = ["Translate", "MediaRouter", "OptimizationHints", "AutofillServerCommunication",
+                   "InterestFeedContentSuggestions", "CalculateNativeWinOcclusion"]
+
+
+def compose_url() -> str:
+    """COMPOSE_URL=http://127.0.0.1:<port>/compose/tweet points the poster at
+    benchmarks/compose_server.py; read on every call so a benchmark can set it after importing."""
+    return os.getenv("COMPOSE_URL") or DEFAULT_COMPOSE_URL
+
+
+PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {
+        "headless": None,  # CI env var decides
+        "headless_shell": True,
+        "args": [],
+        "disable_features": [],
+        "viewport": None,
+    },
+    "minimal-ci": {
+        "headless": True,
+        "headless_shell": True,
+        "args": _QUIET_ARGS,
+        "disable_features": _QUIET_FEATURES,
+        "viewport": {"width": 1024, "height": 768},
+    },
+    "low-memory": {
+        "headless": True,
+        "headless_shell": True,
+        "args": _QUIET_ARGS + [
+            "--renderer-process-limit=1",
+            "--process-per-site",
+            "--disable-site-isolation-trials",
+            "--js-flags=--max-old-space-size=256",
+        ],
+        "disable_features": _QUIET_FEATURES + ["IsolateOrigins", "site-per-process", "BackForwardCache"],
+        "viewport": {"width": 800, "height": 600},
+        "context": {"service_workers": "block"},
+    },
+    "debug-headed": {
+        "headless": False,
+        "headless_shell": False,
+        "args": ["--start-maximized", "--auto-open-devtools-for-tabs"],
+        "disable_features": [],
+        "viewport": None,  # the window size
+        "slow_mo": 100,
+    },
+}
+
+
+def get_profile(name: Optional[str] = None) -> Dict[str, Any]:
+    name = name or os.getenv("LAUNCH_PROFILE") or "default"
+    if name not in PROFILES:
+        raise ValueError(f"ملف تشغيل غير معروف: {name} (المتاح: {', '.join(PROFILES)})")
+    return dict(PROFILES[name], name=name)
+
+
+def launch_kwargs(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Keyword arguments for `chromium.launch()`."""
+    headless = profile["headless"]
+    if headless is None:
+        headless = bool(os.getenv("CI"))
+    args = list(profile["args"])
+    if profile["disable_features"]:
+        args.append("--disable-features=" + ",".join(profile["disable_features"]))
+    if headless and not profile["headless_shell"]:
+        args.append("--headless=new")
+    kwargs: Dict[str, Any] = {"headless": headless, "args": args}
+    if profile.get("slow_mo"):
+        kwargs["slow_mo"] = profile["slow_mo"]
+    return kwargs
+
+
+def context_kwargs(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Keyword arguments for `browser.new_context()` (besides storage_state)."""
+    kwargs = dict(profile.get("context") or {})
+    if profile["viewport"]:
+        kwargs["viewport"] = profile["viewport"]
+    elif profile["headless"] is False:
+        kwargs["no_viewport"] = True
+    return kwargs
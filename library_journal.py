@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Cross-process writes of tweets.json: an advisory write lock, versions and a change journal.
+
+manage_tweets.py, the GUI and migrate_tweets.py may write the library while another of them (or
+the poster) has it loaded. Every TweetStore write happens under `LibraryLock` (tweets.json.lock:
+flock on POSIX, msvcrt.locking on Windows; released by the OS if the writer dies, so there is no
+stale-lock guessing as with session_pool.PoolLock) and appends one line to tweets.json.journal:
+
+  {"v": 7, "ts": 1760000000, "writer": "manage_tweets.py:4242", "hash": "<sha256 of the file>",
+   "put": [records added or edited], "del": [ids deleted]}
+
+`v` counts writes; a reader knows its version from the entry whose hash is the file's. Readers
+(the continuous poster) apply the entries since their version instead of loading and diffing
+the whole library. Writers do not rely on the journal to detect conflicts: a store whose file
+changed underneath it merges its edits with a three-way check against the tweets as it loaded
+them (TweetStore._merge), which also works after full entries and hand edits.
+
+An entry is {"full": true} — "re-read the file" — when the writer does not know its delta
+(migrate_tweets.py --to-json, manage_tweets.py --restore, a library edited by hand since the
+last entry) or the delta has more than FULL_ENTRY_OVER tweets. The journal is compacted to its newest
+entries past MAX_BYTES; a reader further behind re-reads the file.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_TIMEOUT = float(os.getenv("LIBRARY_LOCK_TIMEOUT", "30"))
+MAX_BYTES = 2 * 1024 * 1024
+FULL_ENTRY_OVER = 500
+
+
+class LibraryConflict(RuntimeError):
+    """Another process changed or deleted some of the tweets this store edited since loading them."""
+
+    def __init__(self, ids: Iterable[str]):
+        self.ids = sorted(ids)
+        shown = ", ".join(self.ids[:10]) + ("…" if len(self.ids) > 10 else "")
+        super().__init__(f"عُدّلت التغريدات نفسها ({shown}) من أداة أخرى منذ التحميل؛ أعد التحميل ثم كرر التعديل.")
+
+
+class LibraryLock:
+    """Exclusive advisory lock on <library>.lock, held for the whole read-merge-write-journal step."""
+
+    def __init__(self, path: str, timeout: float = LOCK_TIMEOUT):
+        self.path = path + ".lock"
+        self.timeout = timeout
+        self._f = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+    def __enter__(self):
+        self._f = open(self.path, "a+b")
+        deadline = time.time() + self.timeout
+        while not self._try_lock():
+            if time.time() > deadline:
+                self._f.close()
+                raise TimeoutError(f"تعذر الحصول على قفل الكتابة على المكتبة: {self.path}")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+            else:
+                self._f.seek(0)
+                msvcrt.locking(self._f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._f.close()
+
+
+def journal_path(path: str) -> str:
+    return path + ".journal"
+
+
+def digest_of(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def file_digest(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return digest_of(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def read_entries(path: str) -> List[Dict]:
+    """The journal of library `path`, oldest first."""
+    try:
+        with open(journal_path(path), "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in raw.splitlines():
+        try:
+            e = json.loads(line)
+        except ValueError:
+            continue  # a line being appended right now
+        if isinstance(e, dict) and isinstance(e.get("v"), int):
+            entries.append(e)
+    return entries
+
+
+def version_for(entries: List[Dict], digest: Optional[str]) -> Optional[int]:
+    """Version of the library contents with this sha256, or None if no entry wrote them."""
+    if digest is None:
+        return None
+    for e in reversed(entries):
+        if e.get("hash") == digest:
+            return e["v"]
+    return None
+
+
+def changes_since(entries: List[Dict], version: Optional[int]) -> Optional[List[Dict]]:
+    """Entries after `version`, oldest first; None when they cannot bring a reader at `version` up
+    to date (unknown version, compacted away, journal reset, or a full rewrite among them)."""
+    if version is None or not entries or entries[-1]["v"] < version:
+        return None
+    newer = [e for e in entries if e["v"] > version]
+    if newer and (newer[0]["v"] != version + 1 or any(e.get("full") for e in newer)):
+        return None
+    return newer
+
+
+def append(path: str, entries: List[Dict], digest: str, put: Optional[List[Dict]] = None,
+           dels: Optional[List[str]] = None, full: bool = False) -> int:
+    """Record one write of the library (call with LibraryLock held); returns its version."""
+    put, dels = put or [], dels or []
+    entry = {"v": (entries[-1]["v"] if entries else 0) + 1, "ts": int(time.time()),
+             "writer": f"{os.path.basename(sys.argv[0]) or 'python'}:{os.getpid()}", "hash": digest}
+    if full or len(put) + len(dels) > FULL_ENTRY_OVER:
+        entry["full"] = True
+    else:
+        entry["put"] = put
+        entry["del"] = dels
+    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+    jpath = journal_path(path)
+    with open(jpath, "ab") as f:
+        f.write(line)
+        size = f.tell()
+    if size > MAX_BYTES:
+        _compact(jpath, entries + [entry])
+    return entry["v"]
+
+
+def _compact(jpath: str, entries: List[Dict]):
+    # keep the newest entries, about half the limit, so compaction stays rare
+    kept, total = [], 0
+    for e in reversed(entries):
+        line = (json.dumps(e, ensure_ascii=False) + "\n").encode("utf-8")
+        if kept and total + len(line) > MAX_BYTES // 2:
+            break
+        kept.append(line)
+        total += len(line)
+    tmp = jpath + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(b"".join(reversed(kept)))
+    os.replace(tmp, jpath)
+
+
+def record_rewrite(path: str):
+    """Journal a write made without TweetStore (e.g. a restored backup; call with the lock held)."""
+    digest = file_digest(path)
+    if digest is not None:
+        append(path, read_entries(path), digest, full=True)
+
+
+def merge_records(current: List[Dict], put: List[Dict], dels: Iterable[str]) -> List[Dict]:
+    """`current` with records replaced or appended from `put` and ids in `dels` removed, in order."""
+    dels = set(dels)
+    pending = {r["id"]: r for r in put}
+    out = []
+    for r in current:
+        rid = r.get("id")
+        if rid in dels:
+            continue
+        out.append(pending.pop(rid, r))
+    out.extend(pending.values())
+    return out
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Hot reload of the tweet library for the continuous poster.
+
+`LibraryWatcher` reports whether the library file changed since the last check. On Linux it
+uses inotify (through ctypes, no extra dependency) on the containing directory, so atomic
+replaces by manage_tweets.py / the GUI are seen; elsewhere — or with LIBRARY_WATCH=poll — it
+compares (mtime, size, inode). Both are non-blocking and cheap enough to call before every post.
+
+`CandidateSet` is the poster's in-memory view of enabled tweets plus a text-hash index. `apply()`
+diffs a freshly loaded library against it and only touches added/removed/disabled/edited entries;
+`apply_changes()` takes just a delta (the change journal's entries, see library_journal.py).
+Entries whose cached worst-case weighted length exceeds 280 are kept out (see tweet_length.py).
+"""
+from __future__ import annotations
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from job_queue import canonical_hash
+from tweet_length import fits, worst_case_length
+from tweet_models import Tweet
+
+# inotify(7)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def _signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class _Inotify:
+    def __init__(self, folder: str, names: Set[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), _MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, "inotify_add_watch failed")
+        self.names = {os.fsencode(n) for n in names}
+
+    def poll(self) -> bool:
+        hit = False
+        while True:
+            try:
+                buf = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return hit
+            if not buf:
+                return hit
+            i = 0
+            while i + _EVENT.size <= len(buf):
+                _wd, _mask, _cookie, length = _EVENT.unpack_from(buf, i)
+                name = buf[i + _EVENT.size:i + _EVENT.size + length].rstrip(b"\0")
+                if name in self.names:
+                    hit = True
+                i += _EVENT.size + length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class LibraryWatcher:
+    def __init__(self, paths: Iterable[str], mode: Optional[str] = None):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.mode = (mode or os.getenv("LIBRARY_WATCH", "auto")).lower()
+        self._inotify = None
+        if self.mode in ("auto", "inotify") and sys.platform.startswith("linux"):
+            folders = {os.path.dirname(p) for p in self.paths}
+            try:
+                if len(folders) != 1:
+                    raise OSError("watched files must share a folder")
+                self._inotify = _Inotify(folders.pop(), {os.path.basename(p) for p in self.paths})
+                self.mode = "inotify"
+            except (OSError, AttributeError) as e:
+                logging.info("inotify unavailable (%s); polling the tweet library instead.", e)
+        if self._inotify is None and self.mode != "off":
+            self.mode = "poll"
+        self._sigs = [_signature(p) for p in self.paths]
+        self._pending = False
+
+    def changed(self) -> bool:
+        if self.mode == "off":
+            return False
+        if self._inotify is not None and not self._inotify.poll() and not self._pending:
+            return False
+        self._pending = False
+        # inotify also fires for writes that end with identical contents; confirm with stat
+        sigs = [_signature(p) for p in self.paths]
+        if sigs == self._sigs:
+            return False
+        self._sigs = sigs
+        return True
+
+    def reset(self):
+        """Forget the last seen state so the next check reports a change (retry a failed reload)."""
+        self._sigs = [None] * len(self.paths)
+        self._pending = True
+
+    def close(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+class CandidateSet:
+    """Enabled tweets by id plus text-hash -> ids, updated by deltas."""
+
+    def __init__(self, tweets: Iterable[Tweet] = ()):
+        self._by_id: Dict[str, Tweet] = {}
+        self._hash_of: Dict[str, str] = {}
+        self._by_hash: Dict[str, Set[str]] = {}
+        # enabled but too long to post
+        self.too_long: Set[str] = set()
+        # journal version and sha256 of the library contents this set reflects (None: unknown)
+        self.version: Optional[int] = None
+        self.digest: Optional[str] = None
+        for t in tweets:
+            if t.enabled and self._eligible(t):
+                self._put(t)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[Tweet]:
+        return iter(self._by_id.values())
+
+    def get(self, tid: str) -> Optional[Tweet]:
+        return self._by_id.get(tid)
+
+    def _eligible(self, t: Tweet) -> bool:
+        n = t.weighted_length
+        if n is None:
+            # record saved before lengths were cached: compute once
+            n = t.weighted_length = worst_case_length(t.text, t.hashtags, t.thread)
+        if fits(n):
+            self.too_long.discard(t.id)
+            return True
+        self.too_long.add(t.id)
+        return False
+
+    def _put(self, t: Tweet):
+        h = canonical_hash(t.text)
+        self._by_id[t.id] = t
+        self._hash_of[t.id] = h
+        self._by_hash.setdefault(h, set()).add(t.id)
+
+    def _drop(self, tid: str):
+        self._by_id.pop(tid, None)
+        h = self._hash_of.pop(tid, None)
+        ids = self._by_hash.get(h)
+        if ids is not None:
+            ids.discard(tid)
+            if not ids:
+                del self._by_hash[h]
+
+    def _sync(self, t: Tweet, delta: Dict[str, int]):
+        cur = self._by_id.get(t.id)
+        if not t.enabled:
+            self.too_long.discard(t.id)
+            if cur is not None:
+                self._drop(t.id)
+                delta["disabled"] += 1
+        elif cur is None:
+            if self._eligible(t):
+                self._put(t)
+                delta["added"] += 1
+        elif cur.text != t.text or cur.hashtags != t.hashtags or cur.media != t.media or cur.thread != t.thread:
+            self._drop(t.id)
+            if self._eligible(t):
+                self._put(t)
+            delta["edited"] += 1
+
+    def apply(self, library: Iterable[Tweet]) -> Dict[str, int]:
+        """Sync with the full library (enabled and disabled tweets); returns delta counts."""
+        delta = {"added": 0, "removed": 0, "disabled": 0, "edited": 0}
+        seen = set()
+        for t in library:
+            seen.add(t.id)
+            self._sync(t, delta)
+        for tid in [tid for tid in self._by_id if tid not in seen]:
+            self._drop(tid)
+            delta["removed"] += 1
+        self.too_long &= seen
+        return delta
+
+    def apply_changes(self, changed: Iterable[Tweet], removed: Iterable[str]) -> Dict[str, int]:
+        """Apply a delta: tweets added or edited (enabled or not) and ids deleted; same counts as apply()."""
+        delta = {"added": 0, "removed": 0, "disabled": 0, "edited": 0}
+        for t in changed:
+            self._sync(t, delta)
+        for tid in removed:
+            self.too_long.discard(tid)
+            if tid in self._by_id:
+                self._drop(tid)
+                delta["removed"] += 1
+        return delta
+
+    def fresh(self, recent_hashes: Set[str]) -> List[Tweet]:
+        """Tweets whose text was not posted recently (set difference on the hash index)."""
+        return [self._by_id[tid] for h in self._by_hash.keys() - recent_hashes for tid in self._by_hash[h]]
@@ -1,7 +1,13 @@
+import argparse
 import asyncio
+import datetime
+import json
 from playwright.async_api import async_playwright
 
-async def main():
+from session_pool import SessionPool, generate_key
+
+
+async def capture():
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=False)
         context = await browser.new_context()
@@ -9,10 +15,58 @@ async def main():
         await page.goto("https://twitter.com/login")
         print("سجل الدخول يدويًا، ثم اضغط Enter هنا لحفظ الجلسة...")
         input()
-        await context.storage_state(path="storage_state.json")
-        print("تم حفظ حالة الجلسة في storage_state.json")
+        state = await context.storage_state()
         await browser.close()
+        return state
+
+
+def print_pool(pool):
+    sessions = pool.list()
+    if not sessions:
+        print("لا توجد جلسات في المجمع")
+        return
+    now = datetime.datetime.now().timestamp()
+    for s in sessions:
+        last = datetime.datetime.fromtimestamp(s["last_used"]).isoformat(sep=" ") if s.get("last_used") else "---"
+        lease = s.get("lease") or {}
+        leased = lease.get("owner") if lease.get("expires_at", 0) > now else "-"
+        enc = "مشفرة" if s.get("encrypted") else "-"
+        print(f"{s['name']}: health={s.get('health')} last_used={last} lease={leased} {enc}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="حفظ جلسات الدخول (ملف واحد أو مجمع جلسات بأسماء)")
+    parser.add_argument("--name", help="اسم الحساب لحفظ الجلسة في المجمع sessions/ بدل storage_state.json")
+    parser.add_argument("--encrypt", action="store_true", help="تشفير الجلسة في المجمع (يتطلب cryptography و SESSION_POOL_KEY)")
+    parser.add_argument("--list", action="store_true", help="عرض جلسات المجمع وحالتها")
+    parser.add_argument("--remove", metavar="NAME", help="حذف جلسة من المجمع")
+    parser.add_argument("--mark-ok", metavar="NAME", help="إعادة تعيين حالة جلسة إلى ok بعد إصلاحها")
+    parser.add_argument("--gen-key", action="store_true", help="توليد مفتاح تشفير جديد لـ SESSION_POOL_KEY")
+    args = parser.parse_args()
+
+    pool = SessionPool()
+    if args.gen_key:
+        print(generate_key())
+        return
+    if args.list:
+        print_pool(pool)
+        return
+    if args.remove:
+        print("تم الحذف" if pool.remove(args.remove) else "لم يتم العثور على الجلسة")
+        return
+    if args.mark_ok:
+        print(f"حالة الجلسة '{args.mark_ok}' الآن ok" if pool.mark_health(args.mark_ok, "ok") else "لم يتم العثور على الجلسة")
+        return
+
+    state = await capture()
+    raw = json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8")
+    if args.name:
+        entry = pool.add(args.name, raw, encrypt=args.encrypt)
+        print(f"تم حفظ الجلسة '{args.name}' في المجمع (health={entry['health']})")
+    else:
+        with open("storage_state.json", "wb") as f:
+            f.write(raw)
+        print("تم حفظ حالة الجلسة في storage_state.json")
 
 if __name__ == "__main__":
     asyncio.run(main())
-
@@ -5,83 +5,95 @@ Simple tweet manager for tweets.json
 
 Usage examples:
   python manage_tweets.py --list
+  python manage_tweets.py --search "مدرسة"
   python manage_tweets.py --add --text "نص التغريدة" --hashtags "#tag1,#tag2"
+  python manage_tweets.py --add --text "نص" --media "images/a.jpg,images/b.png"
+  python manage_tweets.py --add --thread --text "نص طويل..."
+  python manage_tweets.py --prepare-media
   python manage_tweets.py --interactive
-
-This script reads/writes `tweets.json` in the same folder. It creates a timestamped backup
-before any write.
+  python manage_tweets.py --enqueue --id t1 --at "2025-08-16 14:00" --account acc1
+  python manage_tweets.py --queue
+  python manage_tweets.py --import tweets.jsonl        # أو .csv أو .txt
+  python manage_tweets.py --export library.csv
+
+This script reads/writes `tweets.json` in the same folder. Before any write the previous
+contents are snapshotted into `backups/` (deduplicated, compressed, with retention):
+  python manage_tweets.py --backups
+  python manage_tweets.py --restore 2
 """
 from __future__ import annotations
 import argparse
+import hashlib
 import json
 import os
-import shutil
+import time
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Optional
+
+import bulk_io
+import library_journal
+from backup_store import BackupStore
+from job_queue import JobQueue, canonical_hash
+from library_journal import LibraryConflict, LibraryLock
+from media_cache import MediaCache, check_media
+from tweet_length import MAX_WEIGHTED_LENGTH, fits, split_thread
+from search_index import file_signature
+from tweet_models import Tweet, tweets_to_json
+from tweet_store import TweetStore, TWEETS_FILE, open_store, sqlite_backend
 
 ROOT = os.path.dirname(os.path.abspath(__file__))
-TWEETS_FILE = os.path.join(ROOT, "tweets.json")
-
 
-def load_tweets() -> List[Dict[str, Any]]:
-    if not os.path.exists(TWEETS_FILE):
-        return []
-    with open(TWEETS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
 
+def load_store():
+    # JSON by default; TWEETS_BACKEND=sqlite selects tweets.db (see migrate_tweets.py)
+    return open_store(TWEETS_FILE)
 
-def backup_tweets():
-    if not os.path.exists(TWEETS_FILE):
-        return None
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    dest = os.path.join(ROOT, f"tweets.json.bak.{ts}")
-    shutil.copy2(TWEETS_FILE, dest)
-    return dest
 
-
-def save_tweets(tweets: List[Dict[str, Any]]):
-    backup = backup_tweets()
-    tmp = TWEETS_FILE + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(tweets, f, ensure_ascii=False, indent=2)
-        f.write("\n")
-    os.replace(tmp, TWEETS_FILE)
-    return backup
+def print_tweet(t: Tweet):
+    print(f'id: {t.id}')
+    print("enabled:", t.enabled)
+    print("hashtags:", ", ".join(t.hashtags))
+    if t.media:
+        print("media:", ", ".join(t.media))
+    if t.thread:
+        print(f"thread: {len(split_thread(t.text, t.hashtags))} parts")
+    if t.weighted_length is not None:
+        print(f"length: {t.weighted_length}/{MAX_WEIGHTED_LENGTH}" + ("" if fits(t.weighted_length) else "  (أطول من المسموح — سيتخطاها الناشر)"))
+    print("text:")
+    print(t.text)
+    print("-" * 40)
 
 
-def next_id(tweets: List[Dict[str, Any]]) -> str:
-    # ids look like t1, t2... produce next numeric suffix
-    maxn = 0
-    for t in tweets:
-        tid = t.get("id", "")
-        if isinstance(tid, str) and tid.startswith("t"):
-            try:
-                n = int(tid[1:])
-                if n > maxn:
-                    maxn = n
-            except Exception:
-                continue
-    return f"t{maxn + 1}"
+def warn_length(t: Tweet):
+    if t.weighted_length is not None and not fits(t.weighted_length):
+        print(f"تنبيه: الطول الموزون لـ {t.id} مع الهاشتاغات قد يصل إلى {t.weighted_length} (الحد {MAX_WEIGHTED_LENGTH})؛ لن تُنشر حتى تُختصر" + ("." if t.thread else " أو تُجعل سلسلة (--thread)."))
 
 
-def print_tweet(t: Dict[str, Any]):
-    print(f'id: {t.get("id")}')
-    print("enabled:", t.get("enabled", True))
-    print("hashtags:", ", ".join(t.get("hashtags", [])))
-    print("text:")
-    print(t.get("text", ""))
-    print("-" * 40)
+def parse_media(s: str) -> List[str]:
+    return [p.strip() for p in s.split(",") if p.strip()]
 
 
 def cmd_list(args):
-    tweets = load_tweets()
-    if not tweets:
+    store = load_store()
+    if not len(store):
         print("لا توجد تغريدات في ملف tweets.json")
         return
+    tag = getattr(args, "hashtag", None)
+    tweets = store.by_hashtag(tag) if tag else store
     for t in tweets:
         print_tweet(t)
 
 
+def cmd_search(args):
+    store = load_store()
+    start = time.perf_counter()
+    found = store.search(args.search)
+    elapsed = (time.perf_counter() - start) * 1000
+    for t in found:
+        print_tweet(t)
+    print(f"{len(found)} نتيجة ({elapsed:.2f} ms)")
+
+
 def normalize_hashtags(s: str) -> List[str]:
     if not s:
         return []
@@ -95,122 +107,445 @@ def normalize_hashtags(s: str) -> List[str]:
 
 
 def cmd_add(args):
-    tweets = load_tweets()
-    tid = next_id(tweets)
     hashtags = normalize_hashtags(args.hashtags or "")
     text = args.text or ""
     if not text:
         print("لا يوجد نص للتغريدة. استخدم --text أو --interactive")
         return
-    new = {"id": tid, "text": text, "hashtags": hashtags, "enabled": True}
-    tweets.append(new)
-    backup = save_tweets(tweets)
-    print(f"أضيفت التغريدة id={tid}")
+    media = parse_media(args.media or "")
+    err = check_media(media)
+    if err:
+        print(err)
+        return
+    store = load_store()
+    new = store.add(text, hashtags, enabled=True, media=media, thread=bool(args.thread))
+    backup = store.save()
+    print(f"أضيفت التغريدة id={new.id}")
+    warn_length(new)
     if backup:
         print(f"تم حفظ نسخة احتياطية: {os.path.basename(backup)}")
 
 
-def find_index(tweets: List[Dict[str, Any]], tid: str):
-    for i, t in enumerate(tweets):
-        if t.get("id") == tid:
-            return i
-    return None
-
-
 def cmd_delete(args):
-    tweets = load_tweets()
-    idx = find_index(tweets, args.id)
-    if idx is None:
+    store = load_store()
+    removed = store.delete(args.id)
+    if removed is None:
         print("لم يتم العثور على id")
         return
-    removed = tweets.pop(idx)
-    backup = save_tweets(tweets)
-    print(f"حذفت التغريدة {removed.get('id')}")
+    backup = store.save()
+    print(f"حذفت التغريدة {removed.id}")
     if backup:
         print(f"نسخة احتياطية: {os.path.basename(backup)}")
 
 
 def cmd_edit(args):
-    tweets = load_tweets()
-    idx = find_index(tweets, args.id)
-    if idx is None:
+    store = load_store()
+    if args.id not in store:
         print("لم يتم العثور على id")
         return
-    t = tweets[idx]
-    changed = False
-    if args.text is not None:
-        t["text"] = args.text
-        changed = True
-    if args.hashtags is not None:
-        t["hashtags"] = normalize_hashtags(args.hashtags)
-        changed = True
-    if args.enabled is not None:
-        t["enabled"] = args.enabled
-        changed = True
+    changed = any(v is not None for v in (args.text, args.hashtags, args.enabled, args.media, args.thread))
     if changed:
-        backup = save_tweets(tweets)
-        print(f"تم تعديل التغريدة {t.get('id')}")
+        media = parse_media(args.media) if args.media is not None else None
+        err = check_media(media)
+        if err:
+            print(err)
+            return
+        t = store.update(
+            args.id,
+            text=args.text,
+            hashtags=normalize_hashtags(args.hashtags) if args.hashtags is not None else None,
+            enabled=args.enabled,
+            media=media,
+            thread=args.thread,
+        )
+        backup = store.save()
+        print(f"تم تعديل التغريدة {t.id}")
+        warn_length(t)
         if backup:
             print(f"نسخة احتياطية: {os.path.basename(backup)}")
     else:
-        print("لم يتم تمرير أي تغيير. استخدم --text أو --hashtags أو --enabled/--disabled")
+        print("لم يتم تمرير أي تغيير. استخدم --text أو --hashtags أو --media أو --thread/--no-thread أو --enabled/--disabled")
+
+
+def cmd_enqueue(args):
+    t = load_store().get(args.id)
+    if t is None:
+        print("لم يتم العثور على id")
+        return
+    not_before = None
+    if args.at:
+        try:
+            not_before = int(datetime.fromisoformat(args.at).timestamp())
+        except ValueError:
+            print("صيغة --at غير صحيحة. مثال: 2025-08-16 14:00")
+            return
+    queue = JobQueue()
+    res = queue.enqueue(t.id, t.text, account=args.account, not_before=not_before)
+    queue.close()
+    if res["created"]:
+        print(f"أضيفت المهمة #{res['id']} إلى طابور النشر")
+    else:
+        print(f"المهمة موجودة مسبقاً في الطابور (#{res['id']})")
+
+
+def cmd_queue(args):
+    queue = JobQueue.open_if_exists()
+    if queue is None:
+        print("طابور النشر فارغ")
+        return
+    jobs = queue.list(["queued", "leased", "posting"])
+    queue.close()
+    if not jobs:
+        print("لا توجد مهام معلقة في طابور النشر")
+        return
+    for j in jobs:
+        when = datetime.fromtimestamp(j["not_before"]).isoformat(sep=" ", timespec="minutes")
+        print(f"#{j['id']} {j['tweet_id']} at={when} account={j['account'] or '*'} status={j['status']}")
+
+
+MAX_REPORTED_ERRORS = 20
+
+
+def cmd_import(args):
+    fmt = args.format or bulk_io.detect_format(args.import_path)
+    store = load_store()
+    # incoming texts are stripped before they are stored: compare stripped texts on both sides
+    seen = {canonical_hash(t.text.strip()) for t in store}
+    added = duplicates = too_long = 0
+    errors = []
+    with open(args.import_path, "r", encoding="utf-8-sig", newline="") as f:
+        for line_no, rec in bulk_io.READERS[fmt](f):
+            if "error" in rec:
+                errors.append((line_no, rec["error"]))
+                continue
+            text = rec.get("text")
+            if not isinstance(text, str) or not text.strip():
+                errors.append((line_no, "نص فارغ"))
+                continue
+            tags = rec.get("hashtags") or ""
+            if isinstance(tags, list) and all(isinstance(x, (str, int)) and not isinstance(x, bool) for x in tags):
+                tags = ",".join(str(x) for x in tags)
+            elif not isinstance(tags, str):
+                errors.append((line_no, "hashtags يجب أن تكون نصاً أو قائمة نصوص"))
+                continue
+            media = rec.get("media") or []
+            if isinstance(media, str):
+                media = parse_media(media)
+            elif not (isinstance(media, list) and all(isinstance(x, str) for x in media)):
+                errors.append((line_no, "media يجب أن تكون نصاً أو قائمة مسارات"))
+                continue
+            text = text.strip()
+            h = canonical_hash(text)
+            if h in seen:
+                duplicates += 1
+                continue
+            seen.add(h)
+            t = store.add(text, normalize_hashtags(tags.replace(" ", ",")), enabled=rec.get("enabled", True),
+                          media=media, thread=bool(rec.get("thread")))
+            added += 1
+            if not fits(t.weighted_length):
+                too_long += 1
+    if added:
+        store.save()  # one write (one transaction for SQLite) for the whole import
+    print(f"أضيفت {added} تغريدة، تُجوهلت {duplicates} مكررة، {len(errors)} سطر غير صالح")
+    if too_long:
+        print(f"  {too_long} منها أطول من {MAX_WEIGHTED_LENGTH} (مع الهاشتاغات) ولن تُنشر — راجع: --check-length")
+    for line_no, msg in errors[:MAX_REPORTED_ERRORS]:
+        print(f"  سطر {line_no}: {msg}")
+    if len(errors) > MAX_REPORTED_ERRORS:
+        print(f"  ... و{len(errors) - MAX_REPORTED_ERRORS} أخرى")
+
+
+def cmd_check_length(args):
+    """Recompute every cached length (e.g. after editing tweets.json by hand) and list the invalid ones."""
+    store = load_store()
+    updated = store.refresh_lengths()
+    if updated:
+        store.save()
+    invalid = [t for t in store if not fits(t.weighted_length)]
+    for t in invalid:
+        print(f"{t.id}: {t.weighted_length}/{MAX_WEIGHTED_LENGTH}{'' if t.enabled else ' (معطلة)'}")
+    print(f"{len(invalid)} تغريدة أطول من المسموح، وحُدّث الطول المخزن لـ {updated}")
+
+
+def cmd_prepare_media(args):
+    """Resize/recompress the media of enabled tweets into media_cache/ ahead of posting."""
+    paths = sorted({p for t in load_store().enabled() for p in t.media})
+    start = time.perf_counter()
+    errors = MediaCache().prepare(paths)
+    for p, e in errors.items():
+        print(f"{p}: {e}")
+    print(f"{len(paths)} ملف وسائط، فشل {len(errors)} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+
+
+def cmd_export(args):
+    fmt = args.format or bulk_io.detect_format(args.export_path)
+    store = load_store()
+    tmp = args.export_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        n = bulk_io.WRITERS[fmt](f, store)
+    os.replace(tmp, args.export_path)
+    print(f"صُدّرت {n} تغريدة إلى {args.export_path} ({fmt})")
+
+
+def cmd_backups(args):
+    store = BackupStore(TWEETS_FILE)
+    entries = store.list()
+    if not entries:
+        print("لا توجد نسخ احتياطية")
+        return
+    for i, e in enumerate(entries, 1):
+        when = datetime.fromtimestamp(e["ts"]).isoformat(sep=" ", timespec="seconds")
+        print(f"{i:>3}) {when}  {e['hash'][:12]}  {e['size']} bytes")
+
+
+def cmd_restore(args):
+    with LibraryLock(TWEETS_FILE):
+        entry = BackupStore(TWEETS_FILE).restore(args.restore)
+        if entry is not None:
+            library_journal.record_rewrite(TWEETS_FILE)
+    if entry is None:
+        print("لم يتم العثور على النسخة. استخدم --backups لعرض النسخ المتاحة")
+        return
+    when = datetime.fromtimestamp(entry["ts"]).isoformat(sep=" ", timespec="seconds")
+    print(f"تمت استعادة النسخة {entry['hash'][:12]} ({when}). حُفظت النسخة الحالية قبل الاستبدال.")
+
+
+def cmd_import_legacy_backups(args):
+    n = BackupStore(TWEETS_FILE).import_legacy()
+    print(f"نُقلت {n} نسخة قديمة (tweets.json.bak.*) إلى مجلد backups/")
+
+
+class EditSession:
+    """
+    The library for one --interactive session: loaded once, edited in memory, written once.
+
+    Edits are staged as operations on top of the loaded snapshot, so undo drops the last one and
+    rebuilds the view from the snapshot. Before every action the file is checked (stat, then a
+    hash if the stat changed); when another tool changed it, the staged operations are replayed
+    on the new contents. commit() writes all of them with one save (one backup).
+    """
+
+    def __init__(self):
+        self.ops: List[tuple] = []  # (kind, id, fields), kind: add / edit / delete
+        self.load()
+
+    def _files(self) -> List[str]:
+        if sqlite_backend():
+            from sqlite_store import TWEETS_DB
+            return [TWEETS_DB, TWEETS_DB + "-wal"]
+        return [TWEETS_FILE]
+
+    def _read(self):
+        """(snapshot as JSON records, sha256 of tweets.json or None for SQLite)."""
+        if sqlite_backend():
+            store = open_store()
+            try:
+                return tweets_to_json(store.all()), None
+            finally:
+                store.close()
+        try:
+            with open(TWEETS_FILE, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return [], None
+        return json.loads(raw.decode("utf-8")), hashlib.sha256(raw).hexdigest()
+
+    def load(self):
+        self.sigs = [file_signature(p) for p in self._files()]
+        self.base, self.digest = self._read()
+        self._rebuild()
+
+    @staticmethod
+    def _apply(store, op, ids) -> Optional[tuple]:
+        """Apply one staged operation; returns it with the ids it got now, or None if it no longer applies."""
+        kind, tid, fields = op
+        if kind == "add":
+            t = store.add(**fields)
+            ids[tid] = t.id
+            return kind, t.id, fields
+        tid = ids.get(tid, tid)
+        if kind == "edit":
+            return (kind, tid, fields) if store.update(tid, **fields) is not None else None
+        return (kind, tid, fields) if store.delete(tid) is not None else None
+
+    def _rebuild(self) -> List[tuple]:
+        """view = snapshot + staged operations; returns the operations that had to be dropped."""
+        # the stat taken before reading: a write that slipped in between makes save() merge
+        self.view = TweetStore.from_snapshot(self.base, TWEETS_FILE, self.sigs[0], self.digest)
+        kept, dropped, ids = [], [], {}
+        for op in self.ops:
+            applied = self._apply(self.view, op, ids)
+            if applied is None:
+                dropped.append(op)
+            else:
+                kept.append(applied)
+        self.ops = kept
+        return dropped
+
+    def check_external(self) -> bool:
+        """Rebase the staged edits if another tool changed the library; True when it did."""
+        sigs = [file_signature(p) for p in self._files()]
+        if sigs == self.sigs:
+            return False
+        self.sigs = sigs
+        base, digest = self._read()
+        if digest is not None and digest == self.digest:
+            return False  # touched, same contents
+        self.base, self.digest = base, digest
+        dropped = self._rebuild()
+        print("تغيّرت المكتبة من أداة أخرى؛ أُعيد تحميلها وطُبّقت تعديلاتك المعلقة عليها.")
+        for op in dropped:
+            print(f"  لم يعد ممكناً تطبيق: {describe_op(op)}")
+        return True
+
+    # --- staged edits ---
+    def add(self, text: str, hashtags: List[str]) -> Tweet:
+        fields = {"text": text, "hashtags": hashtags}
+        t = self.view.add(**fields)
+        self.ops.append(("add", t.id, fields))
+        return t
+
+    def edit(self, tid: str, **fields) -> Optional[Tweet]:
+        fields = {k: v for k, v in fields.items() if v is not None}
+        t = self.view.update(tid, **fields)
+        if t is not None and fields:
+            self.ops.append(("edit", tid, fields))
+        return t
+
+    def delete(self, tid: str) -> Optional[Tweet]:
+        t = self.view.delete(tid)
+        if t is not None:
+            self.ops.append(("delete", tid, {}))
+        return t
+
+    def undo(self) -> Optional[tuple]:
+        if not self.ops:
+            return None
+        op = self.ops.pop()
+        self._rebuild()
+        return op
+
+    def commit(self) -> Optional[str]:
+        """Write the staged edits (one save); returns the backup path if any."""
+        if not self.ops:
+            return None
+        self.check_external()
+        if sqlite_backend():
+            store = open_store()
+            try:
+                ids = {}
+                for op in self.ops:
+                    self._apply(store, op, ids)
+                backup = store.save()
+            finally:
+                store.close()
+        else:
+            for attempt in range(3):
+                try:
+                    backup = self.view.save()
+                    break
+                except LibraryConflict:
+                    # written by another tool since the check: replay the operations on its contents
+                    if attempt == 2 or not self.check_external():
+                        raise
+        self.ops = []
+        self.load()
+        return backup
+
+
+def describe_op(op) -> str:
+    kind, tid, fields = op
+    if kind == "add":
+        return f"إضافة {tid}"
+    if kind == "edit":
+        return f"تعديل {tid} ({', '.join(fields)})"
+    return f"حذف {tid}"
+
+
+def commit_session(session: EditSession):
+    n = len(session.ops)
+    if not n:
+        return
+    backup = session.commit()
+    print(f"حُفظت {n} تعديلات.")
+    if backup:
+        print(f"نسخة احتياطية: {os.path.basename(backup)}")
 
 
 def cmd_interactive(args):
-    print("وضع تفاعلي لإدارة التغريدات")
+    session = EditSession()
+    print("وضع تفاعلي لإدارة التغريدات (التعديلات تُحفظ مرة واحدة عند الحفظ أو الخروج)")
     print("1) إضافة تغريدة")
     print("2) تعديل تغريدة")
     print("3) حذف تغريدة")
     print("4) قائمة التغريدات")
-    print("5) خروج")
+    print("5) تراجع عن آخر تعديل")
+    print("6) التعديلات المعلقة")
+    print("7) حفظ")
+    print("8) حفظ وخروج")
+    print("9) خروج دون حفظ")
     while True:
         try:
-            opt = input("اختر خيار (1-5): ").strip()
-        except EOFError:
+            opt = input(f"اختر خيار (1-9) [{len(session.ops)} معلق]: ").strip()
+            session.check_external()
+            if opt == "1":
+                text = input("نص التغريدة (نص جديد):\n")
+                if not text:
+                    print("لا يوجد نص للتغريدة.")
+                    continue
+                tags = input("الهاشتاغات (مفصولة بفواصل, اختياري): ")
+                t = session.add(text, normalize_hashtags(tags))
+                print(f"أضيفت التغريدة id={t.id} (لم تُحفظ بعد)")
+                warn_length(t)
+            elif opt == "2":
+                tid = input("id التغريدة المراد تعديلها: ").strip()
+                t = session.view.get(tid)
+                if t is None:
+                    print("لم يتم العثور على id")
+                    continue
+                print_tweet(t)
+                newtext = input("نص جديد (اتركه فارغاً لعدم التغيير):\n")
+                newtags = input("هاشتاغات جديدة (مفصولة بفواصل, اترك فارغاً لعدم التغيير): ")
+                t = session.edit(tid, text=newtext or None, hashtags=normalize_hashtags(newtags) if newtags else None)
+                print(f"تم تعديل التغريدة {t.id} (لم تُحفظ بعد)")
+                warn_length(t)
+            elif opt == "3":
+                tid = input("id للحذف: ").strip()
+                removed = session.delete(tid)
+                print(f"حذفت التغريدة {removed.id} (لم تُحفظ بعد)" if removed else "لم يتم العثور على id")
+            elif opt == "4":
+                if not len(session.view):
+                    print("لا توجد تغريدات")
+                for t in session.view:
+                    print_tweet(t)
+            elif opt == "5":
+                op = session.undo()
+                print(f"تم التراجع عن: {describe_op(op)}" if op else "لا توجد تعديلات للتراجع عنها")
+            elif opt == "6":
+                if not session.ops:
+                    print("لا توجد تعديلات معلقة")
+                for i, op in enumerate(session.ops, 1):
+                    print(f"{i}) {describe_op(op)}")
+            elif opt == "7":
+                if session.ops:
+                    commit_session(session)
+                else:
+                    print("لا توجد تعديلات للحفظ")
+            elif opt == "8":
+                commit_session(session)
+                break
+            elif opt == "9":
+                if session.ops and input(f"تجاهل {len(session.ops)} تعديلات؟ (y/n): ").strip().lower() not in ("y", "yes", "نعم"):
+                    continue
+                break
+            else:
+                print("خيار غير صالح")
+        except (EOFError, KeyboardInterrupt):
+            # Ctrl+C / Ctrl+D at any prompt (not only the menu) keeps the staged edits
+            print()
+            commit_session(session)
             break
-        if opt == "1":
-            text = input("نص التغريدة (نص جديد):\n")
-            tags = input("الهاشتاغات (مفصولة بفواصل, اختياري): ")
-            class A:
-                pass
-            a = A()
-            a.text = text
-            a.hashtags = tags
-            cmd_add(a)
-        elif opt == "2":
-            tid = input("id التغريدة المراد تعديلها: ").strip()
-            tweets = load_tweets()
-            idx = find_index(tweets, tid)
-            if idx is None:
-                print("لم يتم العثور على id")
-                continue
-            print_tweet(tweets[idx])
-            newtext = input("نص جديد (اتركه فارغاً لعدم التغيير):\n")
-            newtags = input("هاشتاغات جديدة (مفصولة بفواصل, اترك فارغاً لعدم التغيير): ")
-            class B:
-                pass
-            b = B()
-            b.id = tid
-            b.text = newtext if newtext != "" else None
-            b.hashtags = newtags if newtags != "" else None
-            b.enabled = None
-            cmd_edit(b)
-        elif opt == "3":
-            tid = input("id للحذف: ").strip()
-            class C:
-                pass
-            c = C()
-            c.id = tid
-            cmd_delete(c)
-        elif opt == "4":
-            class D:
-                pass
-            d = D()
-            cmd_list(d)
-        elif opt == "5":
-            break
-        else:
-            print("خيار غير صالح")
 
 
 def main():
@@ -218,12 +553,29 @@ def main():
     sub = parser.add_mutually_exclusive_group()
     sub.add_argument("--list", action="store_true", help="عرض جميع التغريدات")
     sub.add_argument("--interactive", action="store_true", help="وضع تفاعلي")
+    sub.add_argument("--search", metavar="QUERY", help="بحث في نص التغريدات والهاشتاغات (يتجاهل التشكيل وأشكال الألف والياء والتاء المربوطة)")
     parser.add_argument("--add", action="store_true", help="إضافة تغريدة (مع --text)")
     parser.add_argument("--delete", dest="delete", action="store_true", help="حذف تغريدة (مع --id)")
     parser.add_argument("--edit", dest="edit", action="store_true", help="تعديل تغريدة (مع --id)")
+    parser.add_argument("--enqueue", action="store_true", help="إضافة تغريدة إلى طابور النشر (مع --id)")
+    parser.add_argument("--queue", action="store_true", help="عرض المهام المعلقة في طابور النشر")
+    parser.add_argument("--import", dest="import_path", metavar="FILE", help="استيراد تغريدات من ملف jsonl/csv/txt")
+    parser.add_argument("--export", dest="export_path", metavar="FILE", help="تصدير المكتبة إلى ملف jsonl/csv/txt")
+    parser.add_argument("--format", choices=bulk_io.FORMATS, help="صيغة الملف (افتراضياً حسب الامتداد)")
+    parser.add_argument("--check-length", action="store_true", help="إعادة حساب الطول الموزون لكل التغريدات وعرض ما يتجاوز 280")
+    parser.add_argument("--prepare-media", action="store_true", help="تجهيز صور التغريدات المفعلة مسبقاً (تصغير وضغط) في media_cache/")
+    parser.add_argument("--backups", action="store_true", help="عرض النسخ الاحتياطية")
+    parser.add_argument("--restore", metavar="REF", help="استعادة نسخة احتياطية (رقمها من --backups أو بداية البصمة)")
+    parser.add_argument("--import-legacy-backups", action="store_true", help="نقل ملفات tweets.json.bak.* القديمة إلى backups/")
+    parser.add_argument("--at", help="موعد النشر للمهمة (مثال: 2025-08-16 14:00)")
+    parser.add_argument("--account", help="اسم الحساب (جلسة من المجمع) للمهمة")
     parser.add_argument("--id", help="معرف التغريدة (مثل t1)")
     parser.add_argument("--text", help="نص التغريدة")
+    parser.add_argument("--hashtag", help="مع --list: عرض التغريدات التي تحمل هذا الهاشتاغ فقط")
     parser.add_argument("--hashtags", help="قائمة الهاشتاغات مفصولة بفواصل (مثال: #a,#b أو a,b)")
+    parser.add_argument("--media", help="مسارات الصور/الفيديو مفصولة بفواصل (حتى 4 صور، أو GIF/فيديو واحد؛ \"\" لإزالتها)")
+    parser.add_argument("--thread", action="store_true", default=None, help="انشر النص سلسلة (تقسيم تلقائي حسب الطول، أو عند سطر ---)")
+    parser.add_argument("--no-thread", dest="thread", action="store_false", help="مع --edit: إلغاء وضع السلسلة")
     parser.add_argument("--enabled", type=lambda v: v.lower() in ("1","true","نعم","y","yes"), nargs='?', const=True, help="اجعل التغريدة مفعلة")
     parser.add_argument("--disabled", dest="disabled", action="store_true", help="اجعل التغريدة معطلة")
     args = parser.parse_args()
@@ -238,6 +590,9 @@ def main():
     if args.interactive:
         cmd_interactive(args)
         return
+    if args.search:
+        cmd_search(args)
+        return
     if args.add:
         cmd_add(args)
         return
@@ -253,6 +608,36 @@ def main():
             return
         cmd_edit(args)
         return
+    if args.enqueue:
+        if not args.id:
+            print("--id مطلوب للإضافة إلى الطابور")
+            return
+        cmd_enqueue(args)
+        return
+    if args.queue:
+        cmd_queue(args)
+        return
+    if args.import_path:
+        cmd_import(args)
+        return
+    if args.export_path:
+        cmd_export(args)
+        return
+    if args.check_length:
+        cmd_check_length(args)
+        return
+    if args.prepare_media:
+        cmd_prepare_media(args)
+        return
+    if args.backups:
+        cmd_backups(args)
+        return
+    if args.restore:
+        cmd_restore(args)
+        return
+    if args.import_legacy_backups:
+        cmd_import_legacy_backups(args)
+        return
 
     parser.print_help()
 
@@ -5,99 +5,342 @@ Simple desktop GUI (Tkinter) to manage tweets.json locally.
 Usage:
   python manage_tweets_gui.py
 
-This GUI reuses helper functions from `manage_tweets.py` (load_tweets/save_tweets/next_id/normalize_hashtags).
+This GUI shares the indexed `TweetStore` with `manage_tweets.py` and the poster: the library is loaded
+once and edits are applied in memory before a single save. The list is a `VirtualTreeview`: only the
+rows that fit on screen exist as Treeview items, so 100k tweets cost the same to show as 30.
+
+Disk I/O (loading, backups, writing tweets.json) runs on an `IOWorker` thread; results come back to
+the Tk thread through an `after()` poll. Saves requested in quick succession are coalesced into one
+write, and the status bar shows progress and errors.
 """
 from __future__ import annotations
+import json
 import os
+import queue
+import threading
+import time
 import tkinter as tk
+import tkinter.font as tkfont
+from datetime import datetime
 from tkinter import ttk, messagebox
 from tkinter.scrolledtext import ScrolledText
 
-# try to import helpers from manage_tweets.py in the same folder
-try:
-    from manage_tweets import load_tweets, save_tweets, next_id, normalize_hashtags
-except Exception:
-    # fallback: minimal local implementations if import fails
-    import json
-    from datetime import datetime
-    import shutil
-
-    ROOT = os.path.dirname(os.path.abspath(__file__))
-    TWEETS_FILE = os.path.join(ROOT, "tweets.json")
-
-    def load_tweets():
-        if not os.path.exists(TWEETS_FILE):
-            return []
-        with open(TWEETS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-
-    def backup_tweets():
-        if not os.path.exists(TWEETS_FILE):
+from library_journal import LibraryConflict
+from library_watch import CandidateSet
+from manage_tweets import normalize_hashtags, parse_media, TWEETS_FILE
+from media_cache import check_media
+from post_plan import PLAN_FILE, PostPlan
+from runner_monitor import LogTailer, MtimeWatch, RunnerStats
+from tweet_models import PostHistory, Tweet
+from tweet_store import TweetStore, open_store, sqlite_backend
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# تجميع طلبات الحفظ المتقاربة في كتابة واحدة
+SAVE_DEBOUNCE_MS = 300
+DASHBOARD_POLL_MS = 3000
+
+
+def _fmt_ts(ts) -> str:
+    return datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class VirtualTreeview(ttk.Frame):
+    """A ttk.Treeview over a Python list that materialises only the visible window of rows.
+
+    `items` is the view (already filtered and sorted by the caller); `row_values(item)` gives
+    the column values. Scrolling rewrites the values of the existing rows instead of creating
+    one Treeview item per element. `_pos` maps each element (by identity) to its position, rebuilt
+    when the view is replaced (load, filter, sort) or an element is removed.
+    """
+
+    def __init__(self, parent, columns, row_values, on_select=None, on_sort=None):
+        super().__init__(parent)
+        self.row_values = row_values
+        self.on_select = on_select
+        self.items = []
+        self._pos = {}
+        self.offset = 0
+        self.visible = 1
+        self.selected_index = None
+        self.row_height = tkfont.nametofont("TkDefaultFont").metrics("linespace") + 6
+        ttk.Style(self).configure("Virtual.Treeview", rowheight=self.row_height)
+
+        keys = [c[0] for c in columns]
+        self.tree = ttk.Treeview(self, columns=keys, show="headings", selectmode="browse", style="Virtual.Treeview")
+        for key, title, width in columns:
+            self.tree.heading(key, text=title, command=(lambda k=key: on_sort(k)) if on_sort else "")
+            self.tree.column(key, width=width, stretch=(key == keys[-1]))
+        self.vsb = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.vsb.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.rows = []
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.tree.bind(seq, self._on_wheel)
+        for seq, delta in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"),
+                           ("<Home>", "home"), ("<End>", "end")):
+            self.tree.bind(seq, lambda e, d=delta: self._on_key(d))
+
+    # --- model ---
+    def set_items(self, items, keep_selection=True):
+        sel = self.selected() if keep_selection else None
+        self.items = items
+        self._reindex()
+        self.selected_index = None
+        if sel is not None:
+            self.selected_index = self.index_of(sel)
+        self.offset = min(self.offset, max(0, len(items) - self.visible))
+        self.render()
+
+    def _reindex(self):
+        # by identity: a tweet keeps its object while its id may change (renumbered on save)
+        self._pos = {id(it): i for i, it in enumerate(self.items)}
+
+    def index_of(self, item):
+        i = self._pos.get(id(item))
+        return i if i is not None and self.items[i] is item else None
+
+    def selected(self):
+        if self.selected_index is None or self.selected_index >= len(self.items):
             return None
-        ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-        dest = os.path.join(ROOT, f"tweets.json.bak.{ts}")
-        shutil.copy2(TWEETS_FILE, dest)
-        return dest
-
-    def save_tweets(tweets):
-        backup = backup_tweets()
-        tmp = TWEETS_FILE + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as f:
-            json.dump(tweets, f, ensure_ascii=False, indent=2)
-            f.write("\n")
-        os.replace(tmp, TWEETS_FILE)
-        return backup
-
-    def next_id(tweets):
-        maxn = 0
-        for t in tweets:
-            tid = t.get("id", "")
-            if isinstance(tid, str) and tid.startswith("t"):
-                try:
-                    n = int(tid[1:])
-                    if n > maxn:
-                        maxn = n
-                except Exception:
-                    continue
-        return f"t{maxn + 1}"
-
-    def normalize_hashtags(s: str):
-        if not s:
-            return []
-        parts = [p.strip() for p in s.split(",") if p.strip()]
-        out = []
-        for p in parts:
-            if not p.startswith("#"):
-                p = "#" + p
-            out.append(p)
-        return out
+        return self.items[self.selected_index]
+
+    def select(self, index):
+        self.selected_index = index
+        self.see(index)
+        if self.on_select:
+            self.on_select(self.selected())
+
+    def see(self, index):
+        if index < self.offset:
+            self.offset = index
+        elif index >= self.offset + self.visible:
+            self.offset = index - self.visible + 1
+        self.render()
+
+    def replace(self, old, new):
+        """Swap one element after an edit and re-render only its row (if it is on screen)."""
+        i = self.index_of(old)
+        if i is None:
+            return
+        self.items[i] = new
+        del self._pos[id(old)]
+        self._pos[id(new)] = i
+        if self.offset <= i < self.offset + len(self.rows):
+            self.tree.item(self.rows[i - self.offset], values=self.row_values(new))
+
+    def append(self, item):
+        self.items.append(item)
+        self._pos[id(item)] = len(self.items) - 1
+        self.select(len(self.items) - 1)
+
+    def remove(self, item):
+        i = self.index_of(item)
+        if i is None:
+            return
+        del self.items[i]
+        self._reindex()
+        if self.selected_index is not None:
+            if self.selected_index == i:
+                self.selected_index = None
+            elif self.selected_index > i:
+                self.selected_index -= 1
+        self.offset = min(self.offset, max(0, len(self.items) - self.visible))
+        self.render()
+
+    # --- view ---
+    def render(self):
+        n = max(0, min(self.visible, len(self.items) - self.offset))
+        while len(self.rows) < n:
+            self.rows.append(self.tree.insert("", tk.END))
+        while len(self.rows) > n:
+            self.tree.delete(self.rows.pop())
+        for i, iid in enumerate(self.rows):
+            self.tree.item(iid, values=self.row_values(self.items[self.offset + i]))
+        sel = self.selected_index
+        if sel is not None and self.offset <= sel < self.offset + n:
+            self.tree.selection_set(self.rows[sel - self.offset])
+        else:
+            self.tree.selection_set(())
+        total = len(self.items)
+        if total <= self.visible:
+            self.vsb.set(0.0, 1.0)
+        else:
+            self.vsb.set(self.offset / total, (self.offset + n) / total)
+
+    def scroll_to(self, offset):
+        self.offset = max(0, min(int(offset), len(self.items) - self.visible))
+        self.render()
+
+    def _on_resize(self, event):
+        # the heading takes about one row
+        visible = max(1, (event.height - self.row_height - 4) // self.row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.offset)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * len(self.items))
+        else:
+            step = self.visible if unit == "pages" else 1
+            self.scroll_to(self.offset + int(amount) * step)
+
+    def _on_wheel(self, event):
+        if event.num == 4:
+            delta = -3
+        elif event.num == 5:
+            delta = 3
+        else:
+            delta = -3 if event.delta > 0 else 3
+        self.scroll_to(self.offset + delta)
+        return "break"
+
+    def _on_key(self, delta):
+        if not self.items:
+            return "break"
+        cur = self.selected_index if self.selected_index is not None else self.offset
+        if delta == "home":
+            target = 0
+        elif delta == "end":
+            target = len(self.items) - 1
+        else:
+            step = self.visible if delta in ("page", "-page") else 1
+            target = cur + (-step if delta in (-1, "-page") else step)
+        self.select(max(0, min(target, len(self.items) - 1)))
+        return "break"
+
+    def _on_tree_select(self, evt=None):
+        sel = self.tree.selection()
+        if not sel or sel[0] not in self.rows:
+            # selection cleared because the selected element scrolled out of view
+            return
+        index = self.offset + self.rows.index(sel[0])
+        if index != self.selected_index:
+            self.selected_index = index
+            if self.on_select:
+                self.on_select(self.selected())
+
+
+class IOWorker:
+    """One background thread for disk I/O. Jobs run in submission order; their callbacks run on
+    the Tk thread (polled with after()), so callbacks may touch widgets freely."""
+
+    POLL_MS = 50
+
+    def __init__(self, root: tk.Misc):
+        self.root = root
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.pending = 0  # Tk thread only
+        self.thread = threading.Thread(target=self._run, name="gui-io", daemon=True)
+        self.thread.start()
+        root.after(self.POLL_MS, self._poll)
+
+    @property
+    def busy(self) -> bool:
+        return self.pending > 0
+
+    def submit(self, fn, on_done=None, on_error=None):
+        self.pending += 1
+        self.jobs.put((fn, on_done, on_error))
+
+    def _run(self):
+        while True:
+            fn, on_done, on_error = self.jobs.get()
+            try:
+                self.results.put((on_done, fn()))
+            except Exception as e:
+                self.results.put((on_error, e))
+            finally:
+                self.jobs.task_done()
+
+    def _deliver(self):
+        while True:
+            try:
+                callback, value = self.results.get_nowait()
+            except queue.Empty:
+                return
+            self.pending -= 1
+            if callback:
+                callback(value)
+
+    def _poll(self):
+        self._deliver()
+        self.root.after(self.POLL_MS, self._poll)
+
+    def drain(self):
+        """Wait for every queued job and run its callback (used when closing the window)."""
+        self.jobs.join()
+        self._deliver()
+
+
+TREE_COLUMNS = (("id", "id", 70), ("enabled", "مفعلة", 60), ("hashtags", "الهاشتاغات", 150), ("text", "النص", 320))
+SORT_KEYS = {
+    "id": lambda t: (len(t.id), t.id),  # t2 before t10
+    "enabled": lambda t: t.enabled,
+    "hashtags": lambda t: " ".join(t.hashtags).lower(),
+    "text": lambda t: t.text,
+}
+
+
+def tweet_row(t: Tweet):
+    lines = t.text.splitlines()
+    first = lines[0] if lines else ""
+    return (t.id, "نعم" if t.enabled else "لا", " ".join(t.hashtags), first[:120])
 
 
 class TweetManagerGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("إدارة التغريدات")
-        self.geometry("900x560")
+        self.geometry("1150x600")
         self.resizable(True, True)
 
-        self.tweets = []
+        self.store = TweetStore(path=TWEETS_FILE)
+        # ترتيب العرض: None = ترتيب المكتبة
+        self.sort_key = None
+        self.sort_reverse = False
+
+        self.io = IOWorker(self)
+        self._save_scheduled = False  # debounce timer running
+        self._save_running = False    # a write is on the worker
+        self._save_again = False      # edits arrived during that write
 
         self._build_ui()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.refresh_list()
 
     def _build_ui(self):
+        # شريط الحالة: التحميل/الحفظ في الخلفية والأخطاء
+        status = ttk.Frame(self, padding=(8, 0, 8, 6))
+        status.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_var = tk.StringVar()
+        ttk.Style(self).configure("Error.TLabel", foreground="#b00020")
+        self.status_label = ttk.Label(status, textvariable=self.status_var)
+        self.status_label.pack(side=tk.LEFT)
+        self.progress = ttk.Progressbar(status, mode="indeterminate", length=140)
+
         main = ttk.Frame(self, padding=8)
         main.pack(fill=tk.BOTH, expand=True)
 
         left = ttk.Frame(main)
-        left.pack(side=tk.LEFT, fill=tk.Y)
+        left.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         lbl = ttk.Label(left, text="قائمة التغريدات")
         lbl.pack(anchor=tk.W)
 
-        self.listbox = tk.Listbox(left, width=40, activestyle='none')
-        self.listbox.pack(fill=tk.Y, expand=True, pady=6)
-        self.listbox.bind("<<ListboxSelect>>", self.on_select)
+        # بحث فوري: يُطبَّق مع كل ضغطة مفتاح عبر الفهرس (search_index.py)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *a: self._render_list())
+        ttk.Entry(left, textvariable=self.filter_var).pack(fill=tk.X, pady=(6, 0))
+
+        self.list_view = VirtualTreeview(left, TREE_COLUMNS, tweet_row, on_select=self.on_select, on_sort=self.sort_by)
+        self.list_view.pack(fill=tk.BOTH, expand=True, pady=6)
+        self.count_var = tk.StringVar()
+        ttk.Label(left, textvariable=self.count_var).pack(anchor=tk.W)
 
         btn_frame = ttk.Frame(left)
         btn_frame.pack(fill=tk.X, pady=6)
@@ -106,6 +349,7 @@ class TweetManagerGUI(tk.Tk):
         ttk.Button(btn_frame, text="تعديل", command=self.edit_selected).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_frame, text="حذف", command=self.delete_selected).pack(side=tk.LEFT, padx=2)
         ttk.Button(btn_frame, text="تبديل الحالة", command=self.toggle_enabled_selected).pack(side=tk.LEFT, padx=2)
+        ttk.Button(btn_frame, text="إلى الطابور", command=self.enqueue_selected).pack(side=tk.LEFT, padx=2)
 
         right = ttk.Frame(main)
         right.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(12,0))
@@ -133,44 +377,182 @@ class TweetManagerGUI(tk.Tk):
         bottom.pack(fill=tk.X, pady=6)
         ttk.Button(bottom, text="حفظ" , command=self.save_all).pack(side=tk.RIGHT)
 
-        # --- Scheduler panel ---
-        sched = ttk.Labelframe(right, text="جدولة النشر")
-        sched.pack(fill=tk.X, pady=(8,0))
-        self.interval_var = tk.StringVar(value="3600")
-        ttk.Label(sched, text="فاصل النشر (ثواني):").grid(row=0, column=0, sticky=tk.W, padx=6, pady=6)
-        ttk.Entry(sched, textvariable=self.interval_var, width=12).grid(row=0, column=1, sticky=tk.W)
-        ttk.Button(sched, text="حفظ الفاصل", command=self.save_interval).grid(row=0, column=2, padx=6)
-
-        ttk.Label(sched, text="آخر نشر:").grid(row=1, column=0, sticky=tk.W, padx=6)
-        self.last_post_var = tk.StringVar(value="---")
-        ttk.Label(sched, textvariable=self.last_post_var).grid(row=1, column=1, sticky=tk.W)
-
-        ttk.Label(sched, text="الزمن المتبقي:" ).grid(row=2, column=0, sticky=tk.W, padx=6)
-        self.countdown_var = tk.StringVar(value="--:--:--")
-        ttk.Label(sched, textvariable=self.countdown_var).grid(row=2, column=1, sticky=tk.W)
-
-        ttk.Button(sched, text="تم النشر الآن (تعيين آخر وقت)", command=self.mark_posted_now).grid(row=3, column=0, columnspan=2, pady=6)
-        ttk.Button(sched, text="صيغة النشر للتغريدة التالية", command=self.show_next_publish_text).grid(row=3, column=2, padx=6)
-
-        # scheduler internal state
-        self.last_post_ts = None
-        self.interval_seconds = int(self.interval_var.get()) if self.interval_var.get().isdigit() else 3600
-        self._load_last_post_from_state()
+        # --- Runner dashboard ---
+        # يقرأ runner.log وpost_history.json وrunner_state.json التي يكتبها post_tweets.py
+        dash = ttk.Labelframe(right, text="لوحة التشغيل")
+        dash.pack(fill=tk.X, pady=(8,0))
+        self.dash_vars = {}
+        rows = (("last", "آخر نشر:"), ("next", "النشر التالي:"), ("countdown", "الزمن المتبقي:"),
+                ("count", "خلال 24 ساعة:"), ("latency", "زمن النشر:"), ("failures", "الإخفاقات:"),
+                ("activity", "آخر نشاط:"))
+        for i, (key, title) in enumerate(rows):
+            ttk.Label(dash, text=title).grid(row=i, column=0, sticky=tk.NW, padx=6)
+            self.dash_vars[key] = tk.StringVar(value="---")
+            ttk.Label(dash, textvariable=self.dash_vars[key], wraplength=420).grid(row=i, column=1, sticky=tk.W)
+        ttk.Button(dash, text="المنشورات التالية (كما ستُنشر)", command=self.show_next_publish_text).grid(row=len(rows), column=0, columnspan=2, pady=6)
+
+        self.log_tailer = LogTailer(os.path.join(ROOT, "runner.log"))
+        self.history_watch = MtimeWatch(os.path.join(ROOT, "post_history.json"))
+        self.state_watch = MtimeWatch(os.path.join(ROOT, "runner_state.json"))
+        self.runner_stats = RunnerStats()
+        self.history = PostHistory()
+        self.next_post_at = None
+        self._poll_runner()
         self._tick_countdown()
 
     def refresh_list(self):
-        try:
-            self.tweets = load_tweets() or []
-        except Exception as e:
-            messagebox.showerror("خطأ", f"فشل في قراءة tweets.json:\n{e}")
-            self.tweets = []
-        self.listbox.delete(0, tk.END)
-        for t in self.tweets:
-            preview = t.get("text", "").splitlines()
-            first = preview[0] if preview else ""
-            label = f"{t.get('id')} - {first[:60]}"
-            self.listbox.insert(tk.END, label)
-        self.clear_details()
+        # reload from disk (button "تحديث" / startup)
+        if self._save_scheduled or self._save_running:
+            # let pending edits reach the disk first, then reload
+            self.after(200, self.refresh_list)
+            return
+        if self.store.dirty and not messagebox.askyesno("تأكيد", "توجد تعديلات لم تُحفظ وستُفقد بإعادة التحميل. متابعة؟"):
+            return
+        if sqlite_backend():
+            # sqlite3 connections belong to the thread that opened them; commits are cheap anyway
+            try:
+                self._loaded(open_store(TWEETS_FILE))
+            except Exception as e:
+                self._load_failed(e)
+            return
+        self._set_status("جارٍ تحميل tweets.json…", busy=True)
+        self.io.submit(lambda: open_store(TWEETS_FILE), on_done=self._loaded, on_error=self._load_failed)
+
+    def _loaded(self, store):
+        self.store = store
+        self._render_list()
+        self._set_status(f"تم التحميل ({len(store)} تغريدة)")
+
+    def _load_failed(self, e):
+        messagebox.showerror("خطأ", f"فشل في قراءة tweets.json:\n{e}")
+        self.store = TweetStore(path=TWEETS_FILE)
+        self._render_list()
+        self._set_status(f"فشل التحميل: {e}", error=True)
+
+    # --- background saving ---
+    def _set_status(self, text, busy=None, error=False):
+        self.status_var.set(text)
+        self.status_label.configure(style="Error.TLabel" if error else "TLabel")
+        busy = self.io.busy if busy is None else busy
+        if busy:
+            if not self.progress.winfo_ismapped():
+                self.progress.pack(side=tk.RIGHT)
+                self.progress.start(12)
+        elif self.progress.winfo_ismapped():
+            self.progress.stop()
+            self.progress.pack_forget()
+
+    def request_save(self):
+        """Schedule a write of the library; edits made within SAVE_DEBOUNCE_MS share it."""
+        self._set_status("تعديلات غير محفوظة…")
+        if not self._save_scheduled:
+            self._save_scheduled = True
+            self.after(SAVE_DEBOUNCE_MS, self._start_save)
+
+    def _start_save(self, force=False):
+        self._save_scheduled = False
+        if not (self.store.dirty or force):
+            return
+        if self._save_running:
+            # one follow-up write covers everything edited meanwhile
+            self._save_again = True
+            return
+        if not hasattr(self.store, "prepare_save"):
+            # SQLite: a commit on this thread
+            try:
+                self.store.save()
+                self._set_status(f"تم الحفظ {time.strftime('%H:%M:%S')}")
+            except Exception as e:
+                self._set_status(f"فشل الحفظ: {e}", error=True)
+            return
+        store = self.store
+        prepared = store.prepare_save()
+        self._save_running = True
+        self._set_status("جارٍ الحفظ…", busy=True)
+        self.io.submit(lambda: store.write_prepared(prepared), on_done=self._save_done, on_error=self._save_failed)
+
+    def _save_finished(self):
+        self._save_running = False
+        if self._save_again:
+            self._save_again = False
+            self._start_save()
+            return True
+        return False
+
+    def _save_done(self, backup):
+        # new tweets whose id another tool took meanwhile were renumbered in the file
+        if self.store.finish_save():
+            self._render_list()
+        if not self._save_finished():
+            self._set_status(f"تم الحفظ {time.strftime('%H:%M:%S')}")
+            if self.store.behind() and not self.store.dirty and not self._save_scheduled:
+                # the write merged another tool's changes: show the file as it is now
+                store = self.store
+                self.io.submit(lambda: open_store(TWEETS_FILE), on_done=lambda fresh: self._reloaded(store, fresh))
+
+    def _reloaded(self, old, fresh):
+        if self.store is not old or old.dirty or self._save_scheduled or self._save_running:
+            return  # edited meanwhile: keep those edits; the next write merges again
+        sel = self.list_view.selected()
+        self.store = fresh
+        self._render_list()
+        t = fresh.get(sel.id) if sel is not None else None
+        if t is not None:
+            i = self.list_view.index_of(t)
+            if i is not None:
+                self.list_view.select(i)
+
+    def _save_failed(self, e):
+        # keep the edits marked unsaved so "حفظ" (or the next edit) retries
+        self.store.dirty = True
+        if isinstance(e, LibraryConflict):
+            # a follow-up write would hit the same ids: another tool changed these tweets
+            self._save_again = False
+            self._save_finished()
+            self._set_status(f"تعارض: {e}", error=True)
+            messagebox.showerror("تعارض في الحفظ", str(e))
+            return
+        if not self._save_finished():
+            self._set_status(f"فشل الحفظ: {e} — اضغط حفظ لإعادة المحاولة", error=True)
+
+    def on_close(self):
+        self._start_save()
+        while self.io.busy:
+            # a finished write may queue the follow-up one
+            self.io.drain()
+        if self.store.dirty:
+            # the background write failed: last try on this thread before the window goes away
+            try:
+                self.store.save()
+            except Exception as e:
+                if not messagebox.askyesno("خطأ", f"فشل حفظ التعديلات:\n{e}\n\nالخروج على أي حال؟"):
+                    return
+        self.destroy()
+
+    def _render_list(self):
+        # full view rebuild: only on load, filter and sort (edits update single rows)
+        query = self.filter_var.get()
+        view = self.store.search(query) if query.strip() else self.store.all()
+        if self.sort_key:
+            view.sort(key=SORT_KEYS[self.sort_key], reverse=self.sort_reverse)
+        self.list_view.set_items(view)
+        self._update_count()
+        self.on_select(self.list_view.selected())
+
+    def _update_count(self):
+        shown = len(self.list_view.items)
+        total = len(self.store)
+        self.count_var.set(f"{shown} من {total}" if shown != total else f"{total} تغريدة")
+
+    def sort_by(self, key):
+        if self.sort_key == key:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_key, self.sort_reverse = key, False
+        for k, title, _ in TREE_COLUMNS:
+            arrow = (" ▼" if self.sort_reverse else " ▲") if k == key else ""
+            self.list_view.tree.heading(k, text=title + arrow)
+        self._render_list()
 
     def clear_details(self):
         self.id_var.set("")
@@ -180,228 +562,211 @@ class TweetManagerGUI(tk.Tk):
         self.text_widget.delete("1.0", tk.END)
         self.text_widget.configure(state=tk.DISABLED)
 
-    def on_select(self, evt=None):
-        sel = self.listbox.curselection()
-        if not sel:
+    def on_select(self, t=None):
+        if t is None:
             self.clear_details()
             return
-        idx = sel[0]
-        t = self.tweets[idx]
-        self.id_var.set(t.get("id"))
-        self.enabled_var.set(str(t.get("enabled", True)))
-        self.tags_var.set(", ".join(t.get("hashtags", [])))
+        self.id_var.set(t.id)
+        self.enabled_var.set(str(t.enabled))
+        self.tags_var.set(", ".join(t.hashtags))
         self.text_widget.configure(state=tk.NORMAL)
         self.text_widget.delete("1.0", tk.END)
-        self.text_widget.insert(tk.END, t.get("text", ""))
+        self.text_widget.insert(tk.END, t.text)
         self.text_widget.configure(state=tk.DISABLED)
 
+    def _selected(self, message="اختر تغريدة أولاً"):
+        t = self.list_view.selected()
+        if t is None:
+            messagebox.showinfo("تنبيه", message)
+        return t
+
     def add_tweet_dialog(self):
         Dialog(self, on_save=self._add_tweet)
 
-    def _add_tweet(self, text, hashtags, enabled):
+    def _add_tweet(self, text, hashtags, enabled, media, thread):
         try:
-            tweets = load_tweets() or []
-            tid = next_id(tweets)
-            tags = normalize_hashtags(hashtags or "")
-            new = {"id": tid, "text": text or "", "hashtags": tags, "enabled": bool(enabled)}
-            tweets.append(new)
-            save_tweets(tweets)
-            self.refresh_list()
-            messagebox.showinfo("تم", f"أضيفت التغريدة {tid}")
+            new = self.store.add(text or "", normalize_hashtags(hashtags or ""), enabled=bool(enabled), media=media,
+                                 thread=thread)
+            self.request_save()
+            self.list_view.append(new)
+            self._update_count()
+            messagebox.showinfo("تم", f"أضيفت التغريدة {new.id}")
         except Exception as e:
             messagebox.showerror("خطأ", str(e))
 
     def edit_selected(self):
-        sel = self.listbox.curselection()
-        if not sel:
-            messagebox.showinfo("تنبيه", "اختر تغريدة أولاً")
+        t = self._selected()
+        if t is None:
             return
-        idx = sel[0]
-        t = self.tweets[idx]
-        Dialog(self, initial=t, on_save=lambda text, hashtags, enabled: self._edit_tweet(t.get('id'), text, hashtags, enabled))
+        Dialog(self, initial=t, on_save=lambda *values: self._edit_tweet(t, *values))
 
-    def _edit_tweet(self, tid, text, hashtags, enabled):
+    def _edit_tweet(self, old, text, hashtags, enabled, media, thread):
+        tid = old.id
         try:
-            tweets = load_tweets() or []
-            for t in tweets:
-                if t.get('id') == tid:
-                    t['text'] = text or ""
-                    t['hashtags'] = normalize_hashtags(hashtags or "")
-                    t['enabled'] = bool(enabled)
-                    break
-            else:
+            t = self.store.update(tid, text=text or "", hashtags=normalize_hashtags(hashtags or ""), enabled=bool(enabled),
+                                  media=media, thread=thread)
+            if t is None:
                 messagebox.showerror("خطأ", "لم يتم العثور على التغريدة")
                 return
-            save_tweets(tweets)
-            self.refresh_list()
+            self.request_save()
+            # the row keeps its place even if it no longer matches the filter/sort
+            self._row_changed(old, t)
             messagebox.showinfo("تم", f"تم تعديل {tid}")
         except Exception as e:
             messagebox.showerror("خطأ", str(e))
 
+    def _row_changed(self, old: Tweet, new: Tweet):
+        # JSON store edits in place (old is new); the SQLite store returns a fresh object
+        self.list_view.replace(old, new)
+        if self.list_view.selected() is new:
+            self.on_select(new)
+
     def delete_selected(self):
-        sel = self.listbox.curselection()
-        if not sel:
-            messagebox.showinfo("تنبيه", "اختر تغريدة للحذف")
+        t = self._selected("اختر تغريدة للحذف")
+        if t is None:
             return
-        idx = sel[0]
-        t = self.tweets[idx]
-        if not messagebox.askyesno("تأكيد", f"هل تريد حذف {t.get('id')}؟"):
+        if not messagebox.askyesno("تأكيد", f"هل تريد حذف {t.id}؟"):
             return
         try:
-            tweets = load_tweets() or []
-            tweets = [x for x in tweets if x.get('id') != t.get('id')]
-            save_tweets(tweets)
-            self.refresh_list()
+            self.store.delete(t.id)
+            self.request_save()
+            self.list_view.remove(t)
+            self._update_count()
+            self.on_select(self.list_view.selected())
         except Exception as e:
             messagebox.showerror("خطأ", str(e))
 
     def toggle_enabled_selected(self):
-        sel = self.listbox.curselection()
-        if not sel:
-            messagebox.showinfo("تنبيه", "اختر تغريدة أولاً")
+        t = self._selected()
+        if t is None:
             return
-        idx = sel[0]
-        t = self.tweets[idx]
         try:
-            tweets = load_tweets() or []
-            for x in tweets:
-                if x.get('id') == t.get('id'):
-                    x['enabled'] = not bool(x.get('enabled', True))
-                    break
-            save_tweets(tweets)
-            self.refresh_list()
+            new = self.store.update(t.id, enabled=not t.enabled)
+            self.request_save()
+            self._row_changed(t, new)
         except Exception as e:
             messagebox.showerror("خطأ", str(e))
 
-    def save_all(self):
-        # simply reload and save to ensure formatting/backup; mainly placeholder
+    def enqueue_selected(self):
+        t = self._selected()
+        if t is None:
+            return
         try:
-            tweets = load_tweets() or []
-            save_tweets(tweets)
-            messagebox.showinfo("تم", "تم الحفظ (تم إنشاء نسخة احتياطية إذا لزم)")
+            from job_queue import JobQueue
+            queue = JobQueue()
+            res = queue.enqueue(t.id, t.text)
+            queue.close()
+            if res["created"]:
+                messagebox.showinfo("تم", f"أضيفت {t.id} إلى طابور النشر (#{res['id']})")
+            else:
+                messagebox.showinfo("معلومة", f"{t.id} موجودة مسبقاً في الطابور")
         except Exception as e:
             messagebox.showerror("خطأ", str(e))
 
-    # --- Scheduler helpers ---
-    def _load_last_post_from_state(self):
-        # try to read storage_state.json for a last posted timestamp if present
-        try:
-            import json
-            root = os.path.dirname(os.path.abspath(__file__))
-            state_file = os.path.join(root, "storage_state.json")
-            if os.path.exists(state_file):
-                with open(state_file, "r", encoding="utf-8") as f:
-                    st = json.load(f)
-                # heuristic: look for a top-level field 'last_post_ts' or similar
-                # if not present, leave None
-                lp = st.get("last_post_ts") if isinstance(st, dict) else None
-                if lp:
-                    try:
-                        # assume seconds since epoch
-                        import datetime
-                        self.last_post_ts = float(lp)
-                        self.last_post_var.set(datetime.datetime.fromtimestamp(self.last_post_ts).isoformat(sep=' '))
-                        return
-                    except Exception:
-                        pass
-        except Exception:
-            pass
-        # fallback: not set
-        self.last_post_var.set("---")
-
-    def save_interval(self):
-        v = self.interval_var.get().strip()
-        try:
-            s = int(v)
-            if s <= 0:
-                raise ValueError()
-            self.interval_seconds = s
-            messagebox.showinfo("تم", f"تم تعيين الفاصل إلى {s} ثانية")
-        except Exception:
-            messagebox.showerror("خطأ", "أدخل رقماً صحيحاً للفاصل بالثواني")
-
-    def mark_posted_now(self):
-        import time, json
-        ts = time.time()
-        self.last_post_ts = ts
-        import datetime
-        self.last_post_var.set(datetime.datetime.fromtimestamp(ts).isoformat(sep=' '))
-        # persist to storage_state.json (best-effort)
+    def save_all(self):
+        # write the in-memory library now (formatting + backup), on the worker thread
+        self._start_save(force=True)
+
+    # --- Runner dashboard ---
+    def _poll_runner(self):
+        # stat() per file each time; content is read only when it changed (log: only new bytes)
         try:
-            root = os.path.dirname(os.path.abspath(__file__))
-            state_file = os.path.join(root, "storage_state.json")
-            data = {}
-            if os.path.exists(state_file):
-                with open(state_file, "r", encoding="utf-8") as f:
-                    try:
-                        data = json.load(f)
-                    except Exception:
-                        data = {}
-            data["last_post_ts"] = ts
-            with open(state_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            messagebox.showinfo("تم", "تعيين آخر وقت النشر إلى الآن وتم الحفظ في storage_state.json")
+            lines = self.log_tailer.read_new()
+            if lines:
+                self.runner_stats.feed(lines)
+            if self.history_watch.changed():
+                self.history = self._read_json(self.history_watch.path, PostHistory.from_json, PostHistory())
+            if self.state_watch.changed():
+                state = self._read_json(self.state_watch.path, dict, {})
+                self.next_post_at = state.get("next_post_at") or None
         except Exception as e:
-            messagebox.showwarning("تحذير", f"تم التعيين محلياً لكن لم يتم الحفظ:\n{e}")
+            self.dash_vars["activity"].set(f"تعذرت قراءة ملفات التشغيل: {e}")
+        self._render_dashboard()
+        self.after(DASHBOARD_POLL_MS, self._poll_runner)
+
+    @staticmethod
+    def _read_json(path, convert, default):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return convert(json.load(f))
+        except (OSError, ValueError):
+            return default
+
+    def _render_dashboard(self):
+        v = self.dash_vars
+        now = time.time()
+        h = self.history
+        v["last"].set(_fmt_ts(h.timestamps[-1]) if len(h) else "---")
+        v["next"].set(_fmt_ts(self.next_post_at) if self.next_post_at else "---")
+        v["count"].set(str(h.count_since(int(now) - 24 * 3600)))
+        st = self.runner_stats
+        lat = st.latency_summary()
+        v["latency"].set(f"آخر {lat[0]:.1f}ث، الوسيط {lat[1]:.1f}ث، الأقصى {lat[2]:.1f}ث (آخر {len(st.latencies)})" if lat else "---")
+        fails = f"{st.failed} منشور فشل، {st.retries} إعادة محاولة"
+        v["failures"].set(fails + (f"\n{st.last_error}" if st.last_error else ""))
+        if st.last_line:
+            v["activity"].set(st.last_line[:200])
 
     def _tick_countdown(self):
-        import time, datetime
-        if self.last_post_ts is None:
-            self.countdown_var.set("--:--:--")
+        if not self.next_post_at:
+            self.dash_vars["countdown"].set("--:--:--")
         else:
-            elapsed = time.time() - float(self.last_post_ts)
-            remaining = int(self.interval_seconds - elapsed)
+            remaining = int(float(self.next_post_at) - time.time())
             if remaining <= 0:
-                self.countdown_var.set("جاهز للنشر")
+                self.dash_vars["countdown"].set("مستحق (ينتظر تشغيل الناشر)")
             else:
-                hrs = remaining // 3600
-                mins = (remaining % 3600) // 60
-                secs = remaining % 60
-                self.countdown_var.set(f"{hrs:02d}:{mins:02d}:{secs:02d}")
-        # schedule next tick
+                hrs, rest = divmod(remaining, 3600)
+                mins, secs = divmod(rest, 60)
+                self.dash_vars["countdown"].set(f"{hrs:02d}:{mins:02d}:{secs:02d}")
+        # schedule next tick (no I/O here)
         self.after(1000, self._tick_countdown)
 
     def show_next_publish_text(self):
-        # determine next enabled tweet and show formatted publish text
-        tweets = [t for t in (load_tweets() or []) if t.get('enabled', True)]
-        if not tweets:
-            messagebox.showinfo("معلومة", "لا توجد تغريدات مفعلة")
+        # the next posts exactly as the poster will publish them: post_plan.json, topped up in memory
+        # the same way post_tweets.py does (only the poster writes the file)
+        candidates = CandidateSet(self.store.all())
+        if not len(candidates):
+            messagebox.showinfo("معلومة", "لا توجد تغريدات مفعلة صالحة للنشر")
             return
-        # use first tweet in list as next
-        nxt = tweets[0]
-        full_text = self._format_publish_text(nxt)
+        cutoff = int(time.time()) - 24 * 3600
+        recent = {h for h, ts in self.history if ts >= cutoff}
+        plan = PostPlan(os.path.join(ROOT, PLAN_FILE))
+        provisional = plan.seed is None
+        plan.refill(candidates, recent, save=False)
+        items = plan.items
+        full_text = "\n\n".join(items[0]["parts"])
+        blocks = []
+        for n, it in enumerate(items, 1):
+            kind = "جديدة" if it["fresh"] else "تكرار بكلمات مخلوطة"
+            if len(it["parts"]) > 1:
+                kind += f"، سلسلة من {len(it['parts'])} أجزاء"
+                body = "\n".join(f"— {i}/{len(it['parts'])} —\n{p}" for i, p in enumerate(it["parts"], 1))
+            else:
+                body = it["parts"][0]
+            blocks.append(f"{n}. [id: {it['tweet_id']}] ({kind})\n{body}")
+        if self.store.dirty:
+            blocks.insert(0, "تنبيه: توجد تعديلات غير محفوظة؛ الناشر يتخطى المنشورات المبنية عليها حتى تُحفظ.")
+        if provisional:
+            blocks.insert(0, "تنبيه: لم ينشئ الناشر خطة النشر بعد؛ هذه معاينة تقريبية وقد يختار الناشر غيرها.")
         # show in a dialog with option to copy to clipboard
         dlg = tk.Toplevel(self)
-        dlg.title("صيغة النشر")
-        txt = ScrolledText(dlg, height=12, width=80, wrap=tk.WORD)
+        dlg.title("المنشورات التالية")
+        txt = ScrolledText(dlg, height=20, width=80, wrap=tk.WORD)
         txt.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
-        txt.insert(tk.END, full_text)
+        txt.insert(tk.END, "\n\n———\n\n".join(blocks))
         txt.configure(state=tk.DISABLED)
         def _copy():
             try:
                 self.clipboard_clear()
                 self.clipboard_append(full_text)
-                messagebox.showinfo("تم", "نسخ النص إلى الحافظة")
+                messagebox.showinfo("تم", "نسخ نص المنشور التالي إلى الحافظة")
             except Exception as e:
                 messagebox.showerror("خطأ", str(e))
         btns = ttk.Frame(dlg)
         btns.pack(fill=tk.X, padx=8, pady=6)
-        ttk.Button(btns, text="نسخ إلى الحافظة", command=_copy).pack(side=tk.RIGHT, padx=6)
+        ttk.Button(btns, text="نسخ التالي إلى الحافظة", command=_copy).pack(side=tk.RIGHT, padx=6)
         ttk.Button(btns, text="إغلاق", command=dlg.destroy).pack(side=tk.RIGHT)
 
-    def _format_publish_text(self, tweet: dict) -> str:
-        # Compose a friendly publish string including hashtags and separators
-        text = tweet.get('text', '').strip()
-        tags = " ".join(tweet.get('hashtags', []))
-        lines = []
-        lines.append(text)
-        if tags:
-            lines.append("")
-            lines.append(tags)
-        lines.append("")
-        lines.append(f"[id: {tweet.get('id')}]")
-        return "\n".join(lines)
-
 
 class Dialog(tk.Toplevel):
     def __init__(self, parent, initial=None, on_save=None):
@@ -409,23 +774,29 @@ class Dialog(tk.Toplevel):
         self.title("إضافة/تعديل تغريدة")
         self.transient(parent)
         self.on_save = on_save
-        self.initial = initial or {}
+        self.initial = initial or Tweet(id="")
 
         ttk.Label(self, text="النص:").pack(anchor=tk.W, padx=8, pady=(8,0))
         self.text = ScrolledText(self, height=10, wrap=tk.WORD)
         self.text.pack(fill=tk.BOTH, expand=True, padx=8, pady=4)
-        self.text.insert(tk.END, self.initial.get('text',''))
+        self.text.insert(tk.END, self.initial.text)
 
         frm = ttk.Frame(self)
         frm.pack(fill=tk.X, padx=8, pady=4)
         ttk.Label(frm, text="الهاشتاغات (مفصولة بفواصل):").grid(row=0, column=0, sticky=tk.W)
         self.tags_ent = ttk.Entry(frm)
         self.tags_ent.grid(row=0, column=1, sticky=tk.EW, padx=(6,0))
-        self.tags_ent.insert(0, ", ".join(self.initial.get('hashtags', [])))
+        self.tags_ent.insert(0, ", ".join(self.initial.hashtags))
+        ttk.Label(frm, text="الوسائط (مسارات مفصولة بفواصل):").grid(row=1, column=0, sticky=tk.W, pady=(4,0))
+        self.media_ent = ttk.Entry(frm)
+        self.media_ent.grid(row=1, column=1, sticky=tk.EW, padx=(6,0), pady=(4,0))
+        self.media_ent.insert(0, ", ".join(self.initial.media))
         frm.columnconfigure(1, weight=1)
 
-        self.enabled_var = tk.BooleanVar(value=bool(self.initial.get('enabled', True)))
+        self.enabled_var = tk.BooleanVar(value=bool(self.initial.enabled))
         ttk.Checkbutton(self, text="مفعلة", variable=self.enabled_var).pack(anchor=tk.W, padx=8)
+        self.thread_var = tk.BooleanVar(value=bool(self.initial.thread))
+        ttk.Checkbutton(self, text="سلسلة (تُقسم تلقائياً، أو عند سطر ---)", variable=self.thread_var).pack(anchor=tk.W, padx=8)
 
         btns = ttk.Frame(self)
         btns.pack(fill=tk.X, pady=8, padx=8)
@@ -433,15 +804,20 @@ class Dialog(tk.Toplevel):
         ttk.Button(btns, text="حفظ", command=self._do_save).pack(side=tk.RIGHT)
 
         self.grab_set()
-        self.geometry("700x420")
+        self.geometry("700x450")
         self.focus()
 
     def _do_save(self):
         text = self.text.get("1.0", tk.END).rstrip('\n')
         tags = self.tags_ent.get()
         enabled = self.enabled_var.get()
+        media = parse_media(self.media_ent.get())
+        err = check_media(media)
+        if err:
+            messagebox.showerror("خطأ", err, parent=self)
+            return
         if self.on_save:
-            self.on_save(text, tags, enabled)
+            self.on_save(text, tags, enabled, media, self.thread_var.get())
         self.destroy()
 
 
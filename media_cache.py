@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Media attachments: validation, ahead-of-time preprocessing and a content-addressed cache.
+
+A tweet's `media` is a list of file paths (relative paths are relative to this folder): up to
+4 images, or one GIF or video. Images are resized so the longer side is at most 2048 px and
+re-encoded (JPEG, or PNG when they have transparency) under the 5 MB upload limit; GIFs and
+videos are copied as they are after a size check.
+
+Processed files live in media_cache/ named after sha256(source bytes + settings), so the same
+picture used by several tweets is processed once and changing a setting produces new files.
+media_cache/index.json remembers source path -> (mtime, size, cached file), so finding the
+ready-made file at post time is a stat() and no hashing or image work.
+
+`MediaCache.prepare()` runs the missing conversions in a process pool (Pillow is CPU bound);
+the poster calls it at startup and after library reloads.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR") or os.path.join(ROOT, "media_cache")
+INDEX_NAME = "index.json"
+
+MAX_IMAGES = 4
+MAX_IMAGE_SIDE = 2048
+MAX_IMAGE_BYTES = 5 * 1024 * 1024
+JPEG_QUALITY = 85
+MIN_JPEG_QUALITY = 50
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".webp")
+# copied without re-encoding, with the platform's size limit
+PASSTHROUGH_LIMITS = {".gif": 15 * 1024 * 1024, ".mp4": 512 * 1024 * 1024, ".mov": 512 * 1024 * 1024}
+# part of every cache key: changing a limit re-processes everything
+SETTINGS = f"v1:{MAX_IMAGE_SIDE}:{MAX_IMAGE_BYTES}:{JPEG_QUALITY}:{MIN_JPEG_QUALITY}"
+
+
+def source_path(path: str) -> str:
+    return os.path.abspath(os.path.join(ROOT, os.path.expanduser(path)))
+
+
+def check_media(paths: List[str]) -> Optional[str]:
+    """Error message for an invalid media list, or None."""
+    if not paths:
+        return None
+    exts = [os.path.splitext(p)[1].lower() for p in paths]
+    for p, ext in zip(paths, exts):
+        if ext not in IMAGE_EXTS and ext not in PASSTHROUGH_LIMITS:
+            return f"نوع ملف غير مدعوم: {p}"
+        if not os.path.isfile(source_path(p)):
+            return f"الملف غير موجود: {p}"
+    if any(ext in PASSTHROUGH_LIMITS for ext in exts) and len(paths) > 1:
+        return "ملف GIF أو فيديو يُرفق وحده دون ملفات أخرى"
+    if len(paths) > MAX_IMAGES:
+        return f"الحد الأقصى {MAX_IMAGES} صور للتغريدة"
+    return None
+
+
+def _signature(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _encode_image(src: str, tmp: str) -> str:
+    """Resize and re-encode one image into tmp; returns the output extension."""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as im:
+        im = ImageOps.exif_transpose(im)
+        im.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE), Image.LANCZOS)
+        alpha = im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info)
+        if alpha:
+            im.save(tmp, "PNG", optimize=True)
+            if os.path.getsize(tmp) <= MAX_IMAGE_BYTES:
+                return ".png"
+            # too big as PNG: flatten onto white and fall through to JPEG
+            bg = Image.new("RGB", im.size, (255, 255, 255))
+            bg.paste(im.convert("RGBA"), mask=im.convert("RGBA").split()[-1])
+            im = bg
+        im = im.convert("RGB")
+        quality = JPEG_QUALITY
+        while True:
+            im.save(tmp, "JPEG", quality=quality, optimize=True, progressive=True)
+            if os.path.getsize(tmp) <= MAX_IMAGE_BYTES or quality <= MIN_JPEG_QUALITY:
+                return ".jpg"
+            quality -= 10
+
+
+def _prepare_one(src: str, cache_dir: str) -> Tuple[str, List[int], str]:
+    """Worker: (source, signature, cached file name). Runs in a child process."""
+    sig = _signature(src)
+    ext = os.path.splitext(src)[1].lower()
+    key = hashlib.sha256(f"{_file_hash(src)}:{SETTINGS}".encode("ascii")).hexdigest()
+    for out_ext in (".jpg", ".png", ext):
+        if os.path.exists(os.path.join(cache_dir, key + out_ext)):
+            # same content already processed (another path, or an index that was lost)
+            return src, sig, key + out_ext
+    tmp = os.path.join(cache_dir, f"{key}.{os.getpid()}.tmp")
+    try:
+        if ext in PASSTHROUGH_LIMITS:
+            if sig[1] > PASSTHROUGH_LIMITS[ext]:
+                raise ValueError(f"{os.path.basename(src)} أكبر من الحد المسموح ({PASSTHROUGH_LIMITS[ext] // (1024 * 1024)} MB)")
+            shutil.copyfile(src, tmp)
+            out_ext = ext
+        else:
+            out_ext = _encode_image(src, tmp)
+        os.replace(tmp, os.path.join(cache_dir, key + out_ext))
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return src, sig, key + out_ext
+
+
+class MediaCache:
+    def __init__(self, cache_dir: str = MEDIA_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.index_path = os.path.join(cache_dir, INDEX_NAME)
+        self.index: Dict[str, Dict] = {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable media cache index: %s", e)
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.index_path)
+
+    def lookup(self, path: str) -> Optional[str]:
+        """Ready-made file for a media path if the source did not change since it was processed."""
+        src = source_path(path)
+        entry = self.index.get(src)
+        if entry is None or entry["sig"] != _signature(src):
+            return None
+        cached = os.path.join(self.cache_dir, entry["file"])
+        return cached if os.path.exists(cached) else None
+
+    def prepare(self, paths: Iterable[str], workers: Optional[int] = None) -> Dict[str, str]:
+        """Process every path not in the cache yet; returns {path: error} for the failures."""
+        todo = sorted({source_path(p) for p in paths if self.lookup(p) is None})
+        if not todo:
+            return {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        errors = {}
+        results = []
+        if len(todo) == 1:
+            try:
+                results.append(_prepare_one(todo[0], self.cache_dir))
+            except Exception as e:
+                errors[todo[0]] = str(e)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {src: pool.submit(_prepare_one, src, self.cache_dir) for src in todo}
+                for src, fut in futures.items():
+                    try:
+                        results.append(fut.result())
+                    except Exception as e:
+                        errors[src] = str(e)
+        for src, sig, name in results:
+            self.index[src] = {"sig": sig, "file": name}
+        if results:
+            self._save_index()
+        logging.info("Prepared %d media file(s) (%d failed).", len(results), len(errors))
+        return errors
+
+    def resolve(self, paths: List[str]) -> List[str]:
+        """Cached files to upload, in order; a source that was not prepared is processed now."""
+        missing = [p for p in paths if self.lookup(p) is None]
+        if missing:
+            logging.warning("Media not prepared ahead of time, processing now: %s", ", ".join(missing))
+            errors = self.prepare(missing)
+            if errors:
+                raise RuntimeError("تعذر تجهيز الوسائط: " + "; ".join(f"{p}: {e}" for p, e in errors.items()))
+        return [self.lookup(p) for p in paths]
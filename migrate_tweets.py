@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Migrate the tweet library between tweets.json and the SQLite backend (tweets.db).
+
+Usage:
+  python migrate_tweets.py --to-sqlite            # tweets.json -> tweets.db
+  python migrate_tweets.py --to-json              # tweets.db -> tweets.json (with backup)
+  python migrate_tweets.py --to-sqlite --db other.db --json other.json
+
+After --to-sqlite set TWEETS_BACKEND=sqlite so manage_tweets.py, the GUI and the poster use it.
+"""
+from __future__ import annotations
+import argparse
+import os
+
+from sqlite_store import SqliteTweetStore, TWEETS_DB
+from tweet_store import TweetStore, TWEETS_FILE
+
+
+def _remove_db(path: str):
+    """Remove a SQLite database and its -wal/-shm files; a stale WAL would replay into a new file."""
+    for p in (path, path + "-wal", path + "-shm"):
+        if os.path.exists(p):
+            os.unlink(p)
+
+
+def to_sqlite(json_path: str, db_path: str, replace: bool = False) -> int:
+    src = TweetStore.load(json_path)
+    if os.path.exists(db_path) and not replace:
+        dst = SqliteTweetStore(db_path)
+        n = len(dst)
+        dst.close()
+        if n:
+            raise SystemExit(f"{db_path} ليس فارغاً. استخدم --replace للكتابة فوقه.")
+    # build next to the target and swap it in whole: a failed migration leaves the old database
+    tmp = db_path + ".tmp"
+    _remove_db(tmp)
+    dst = SqliteTweetStore(tmp)
+    try:
+        for t in src:
+            dst.insert(t)
+        dst.save()  # one transaction for the whole library
+        n = len(dst)
+        # fold the WAL into the file so the single file is the whole database
+        dst.conn.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        dst.close()
+    _remove_db(db_path)
+    os.replace(tmp, db_path)
+    return n
+
+
+def to_json(db_path: str, json_path: str) -> int:
+    src = SqliteTweetStore(db_path)
+    dst = TweetStore(src.all(), path=json_path)
+    src.close()
+    dst.save()
+    return len(dst)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ترحيل مكتبة التغريدات بين JSON و SQLite")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--to-sqlite", action="store_true", help="tweets.json -> tweets.db")
+    mode.add_argument("--to-json", action="store_true", help="tweets.db -> tweets.json")
+    parser.add_argument("--json", default=TWEETS_FILE, help="مسار ملف JSON")
+    parser.add_argument("--db", default=TWEETS_DB, help="مسار قاعدة SQLite")
+    parser.add_argument("--replace", action="store_true", help="استبدال قاعدة بيانات موجودة")
+    args = parser.parse_args()
+
+    if args.to_sqlite:
+        n = to_sqlite(args.json, args.db, replace=args.replace)
+        print(f"نُقلت {n} تغريدة إلى {args.db}. عيّن TWEETS_BACKEND=sqlite لاستخدامها.")
+    else:
+        n = to_json(args.db, args.json)
+        print(f"كُتبت {n} تغريدة إلى {args.json}")
+
+
+if __name__ == "__main__":
+    main()
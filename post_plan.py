@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+The next N posts, decided ahead of time and shared by the poster and the GUI preview.
+
+Each entry records the chosen tweet, its final parts (one text, or the parts of a thread, with
+the paragraph/word shuffle and hashtag side already applied) and the assumptions it was built
+on. Entry i is built with `random.Random(f"{seed}:{i}")`, so the plan is reproducible from the
+seed and only grows at the tail: refilling never changes what the preview already showed. While planning, every planned
+text counts as posted, the same way post history does at post time.
+
+The poster takes the head right before posting and drops it after a successful post, then tops
+the plan up while it waits. An entry is skipped when its tweet was removed, disabled, edited or
+became too long, or when it was planned as a first post but its text has been posted since
+(e.g. by a queued job).
+
+Stored in post_plan.json: {"version", "seed", "next_index", "items": [...]}.
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+import random
+from typing import Dict, List, Optional, Set
+
+from job_queue import canonical_hash
+from post_text import build_post_parts, select_tweet
+
+PLAN_FILE = "post_plan.json"
+PLAN_VERSION = 2
+PLAN_SIZE = int(os.getenv("POST_PLAN_SIZE", "10"))
+
+
+class PostPlan:
+    def __init__(self, path: str = PLAN_FILE):
+        self.path = path
+        self.seed: Optional[int] = None
+        self.next_index = 0
+        self.items: List[Dict] = []
+        self.load()
+
+    # --- persistence ---
+    def load(self):
+        """Re-read the file (the GUI and the poster both write it)."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logging.warning("Ignoring unreadable %s: %s", self.path, e)
+            return
+        if data.get("version") != PLAN_VERSION:
+            return
+        self.seed = data.get("seed")
+        self.next_index = int(data.get("next_index", 0))
+        self.items = list(data.get("items", []))
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": PLAN_VERSION, "seed": self.seed, "next_index": self.next_index,
+                       "items": self.items}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    # --- planning ---
+    @staticmethod
+    def valid(item: Dict, candidates, recent_hashes: Set[str]) -> bool:
+        t = candidates.get(item["tweet_id"])
+        if (t is None or canonical_hash(t.text) != item["source_hash"] or list(t.hashtags) != item["hashtags"]
+                or t.thread != item["thread"]):
+            return False
+        # planned as the first post of this text, but it went out since then
+        return not (item["fresh"] and item["source_hash"] in recent_hashes)
+
+    def refill(self, candidates, recent_hashes: Set[str], size: int = PLAN_SIZE, save: bool = True) -> int:
+        """Drop stale entries and append new ones up to `size`; returns how many were added.
+        save=False only builds the result in memory (the GUI preview: only the poster writes)."""
+        self.load()
+        kept = [it for it in self.items if self.valid(it, candidates, recent_hashes)]
+        changed = len(kept) != len(self.items)
+        self.items = kept
+        if self.seed is None:
+            env_seed = os.getenv("POST_PLAN_SEED")
+            self.seed = int(env_seed) if env_seed else random.getrandbits(32)
+            changed = True
+        planned = set(recent_hashes) | {it["source_hash"] for it in self.items}
+        added = 0
+        while len(self.items) < size and len(candidates):
+            rng = random.Random(f"{self.seed}:{self.next_index}")
+            t = select_tweet(candidates, planned, rng)
+            h = canonical_hash(t.text)
+            self.items.append({
+                "index": self.next_index,
+                "tweet_id": t.id,
+                "source_hash": h,
+                "hashtags": list(t.hashtags),
+                "thread": t.thread,
+                "fresh": h not in planned,
+                "parts": build_post_parts(t, planned, rng),
+            })
+            planned.add(h)
+            self.next_index += 1
+            added += 1
+        if save and (changed or added):
+            self.save()
+        return added
+
+    # --- consuming ---
+    def head(self, candidates, recent_hashes: Set[str]) -> Optional[Dict]:
+        """The next entry to post; stale entries in front of it are dropped."""
+        self.load()
+        dropped = 0
+        while self.items and not self.valid(self.items[0], candidates, recent_hashes):
+            logging.info("Skipping planned post #%s (tweet %s changed or was posted).",
+                         self.items[0]["index"], self.items[0]["tweet_id"])
+            self.items.pop(0)
+            dropped += 1
+        if dropped:
+            self.save()
+        return self.items[0] if self.items else None
+
+    def done(self, item: Dict):
+        """Remove a posted entry."""
+        self.load()
+        if self.items and self.items[0].get("index") == item.get("index"):
+            self.items.pop(0)
+            self.save()
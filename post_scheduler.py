@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Host-wide posting scheduler for many accounts (the sessions in sessions/pool.json).
+
+Without it every account's run picks its own next time with randint(30 min, 3 h) and several
+accounts on one host can start Chromium at the same moment. Here one process keeps every
+account's next-due time in a hierarchical timer wheel and starts `post_tweets.py` for an
+account (SESSION_NAME=<account>, POST_NOW=1) only when
+- the account is due,
+- fewer than SCHEDULER_CONCURRENCY posts are running on this host, and
+- at least SCHEDULER_MIN_SPACING seconds passed since the last start.
+Due accounts that have to wait stay in FIFO order. An account over its rate limits is
+pushed back to when the limiter allows the next post, without starting a browser.
+
+Posters started here run with SESSION_NAME, so each account keeps its own post history, post
+plan and log (post_history.<account>.json, post_plan.<account>.json, runner.<account>.log,
+see post_tweets.account_file()); the library, jobs.db and rate_limits.db are shared safely.
+
+The wheel has 4 levels of 64 one-second slots (about 194 days; later times wait in an
+overflow set): adding or cancelling a timer is O(1) and a tick costs O(timers due in that
+slot) plus the occasional cascade, independent of the number of accounts.
+
+Next-due times are kept in scheduler_state.json so a restart keeps the spread; new accounts
+start at a random point in the first interval. Accounts that were running are saved with
+their start time; after a crash or restart they count as a failed run and are due again
+RETRY_AFTER_FAILURE seconds after that start.
+
+Usage:
+  python post_scheduler.py                      # تشغيل المجدول
+  python post_scheduler.py --status             # الموعد التالي لكل حساب
+  python post_scheduler.py --concurrency 3 --min-spacing 120
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(ROOT, "scheduler_state.json")
+POSTER = os.path.join(ROOT, "post_tweets.py")
+
+CONCURRENCY = int(os.getenv("SCHEDULER_CONCURRENCY", "2"))
+MIN_SPACING = int(os.getenv("SCHEDULER_MIN_SPACING", "60"))
+# same range as post_tweets.py
+MIN_INTERVAL_SECONDS = 30 * 60
+MAX_INTERVAL_SECONDS = 3 * 60 * 60
+RETRY_AFTER_FAILURE = 15 * 60
+DISPATCH_TIMEOUT = 15 * 60
+REFRESH_SECONDS = 60
+TICK_SECONDS = 1.0
+
+
+class TimerWheel:
+    """Hierarchical timing wheel with 1-second ticks; keys fire once, at their due second."""
+
+    def __init__(self, now: float, bits: int = 6, levels: int = 4):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.levels = levels
+        self.now = int(now)
+        self.slots = [[set() for _ in range(1 << bits)] for _ in range(levels)]
+        self.overflow: set = set()
+        self.where: Dict[str, set] = {}
+        self.when: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self.when)
+
+    def _place(self, key, due: int):
+        for level in range(self.levels):
+            # the first level whose block (all higher digits) `due` shares with `now`
+            if due >> (self.bits * (level + 1)) == self.now >> (self.bits * (level + 1)):
+                bucket = self.slots[level][(due >> (self.bits * level)) & self.mask]
+                break
+        else:
+            bucket = self.overflow
+        bucket.add(key)
+        self.where[key] = bucket
+
+    def add(self, key, due: float):
+        self.cancel(key)
+        due = max(int(due), self.now + 1)
+        self.when[key] = due
+        self._place(key, due)
+
+    def cancel(self, key):
+        bucket = self.where.pop(key, None)
+        if bucket is not None:
+            bucket.discard(key)
+            del self.when[key]
+
+    def _cascade(self, bucket: set):
+        keys = list(bucket)
+        bucket.clear()
+        for key in keys:
+            self._place(key, self.when[key])
+
+    def advance(self, to: float) -> List:
+        """Move the clock to `to`; returns the keys that came due, in due order."""
+        fired = []
+        to = int(to)
+        while self.now < to:
+            self.now += 1
+            t = self.now
+            if t & ((1 << (self.bits * self.levels)) - 1) == 0:
+                self._cascade(self.overflow)
+            # higher levels first so a timer can drop through several levels in one tick
+            for level in range(self.levels - 1, 0, -1):
+                if t & ((1 << (self.bits * level)) - 1) == 0:
+                    self._cascade(self.slots[level][(t >> (self.bits * level)) & self.mask])
+            bucket = self.slots[0][t & self.mask]
+            if bucket:
+                for key in sorted(bucket):
+                    del self.where[key]
+                    del self.when[key]
+                    fired.append(key)
+                bucket.clear()
+        return fired
+
+
+class PostScheduler:
+    """
+    Which accounts to start on each tick. `gate(account, now)` may return a later due time to
+    push an account back instead of starting it (the rate limiter check).
+    """
+
+    def __init__(self, now: float, concurrency: int = CONCURRENCY, min_spacing: int = MIN_SPACING,
+                 rng: Optional[random.Random] = None,
+                 gate: Optional[Callable[[str, float], Optional[float]]] = None):
+        self.wheel = TimerWheel(now)
+        self.concurrency = max(1, concurrency)
+        self.min_spacing = min_spacing
+        self.rng = rng or random.Random()
+        self.gate = gate
+        self.due: Dict[str, int] = {}
+        self.ready: deque = deque()
+        self.running: Dict[str, int] = {}  # account -> start time
+        self.last_start: Optional[float] = None
+
+    def schedule(self, account: str, due: float):
+        self.due[account] = int(due)
+        self.wheel.add(account, due)
+
+    def add_new(self, account: str, now: float):
+        """A newly seen account: first post at a random point of one interval, not all at once."""
+        self.schedule(account, now + self.rng.randint(0, MIN_INTERVAL_SECONDS))
+
+    def remove(self, account: str):
+        self.due.pop(account, None)
+        self.wheel.cancel(account)
+
+    def known(self, account: str) -> bool:
+        return account in self.due or account in self.running
+
+    def tick(self, now: float) -> List[str]:
+        """Advance to `now` and return the accounts to start."""
+        self.ready.extend(self.wheel.advance(now))
+        started = []
+        while self.ready and len(self.running) < self.concurrency:
+            if self.last_start is not None and now - self.last_start < self.min_spacing:
+                break
+            account = self.ready.popleft()
+            # removed, or rescheduled later since it became due
+            if self.due.get(account, now + 1) > now or account in self.running:
+                continue
+            if self.gate is not None:
+                later = self.gate(account, now)
+                if later is not None:
+                    self.schedule(account, later)
+                    continue
+            del self.due[account]
+            self.running[account] = int(now)
+            self.last_start = now
+            started.append(account)
+        return started
+
+    def finished(self, account: str, now: float, ok: bool = True, next_due: Optional[float] = None):
+        self.running.pop(account, None)
+        if next_due is None:
+            next_due = now + (self.rng.randint(MIN_INTERVAL_SECONDS, MAX_INTERVAL_SECONDS) if ok else RETRY_AFTER_FAILURE)
+        self.schedule(account, next_due)
+
+    # --- persistence ---
+    def save(self, path: str = STATE_FILE):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"due": self.due, "running": self.running}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+
+def load_due(path: str = STATE_FILE) -> Dict[str, int]:
+    """Saved next-due times; a run that never finished is retried as if it had failed."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        due = {k: int(v) for k, v in state.get("due", {}).items()}
+        for account, started in state.get("running", {}).items():
+            due[account] = int(started) + RETRY_AFTER_FAILURE
+        return due
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning("Ignoring unreadable %s: %s", path, e)
+        return {}
+
+
+def pool_accounts() -> List[str]:
+    from session_pool import SessionPool
+
+    return [s["name"] for s in SessionPool().list() if s.get("health") in ("ok", "unknown")]
+
+
+def sync_accounts(sched: PostScheduler, accounts: Iterable[str], now: float, saved: Dict[str, int]):
+    accounts = set(accounts)
+    for account in sorted(accounts):
+        if not sched.known(account):
+            if account in saved:
+                sched.schedule(account, saved[account])
+            else:
+                sched.add_new(account, now)
+    for account in [a for a in sched.due if a not in accounts]:
+        logging.info("Account '%s' left the pool; unscheduled.", account)
+        sched.remove(account)
+
+
+async def dispatch(account: str) -> bool:
+    """One single-post run of the poster for `account`; True when it exited cleanly."""
+    env = dict(os.environ, SESSION_NAME=account, POST_NOW="1")
+    env.pop("LOCAL_CONTINUOUS", None)
+    env.pop("SESSION_POOL", None)
+    proc = await asyncio.create_subprocess_exec(sys.executable, POSTER, cwd=ROOT, env=env)
+    try:
+        code = await asyncio.wait_for(proc.wait(), DISPATCH_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.error("Posting run for '%s' exceeded %ss; killed.", account, DISPATCH_TIMEOUT)
+        proc.kill()
+        await proc.wait()
+        return False
+    return code == 0
+
+
+async def serve(concurrency: int = CONCURRENCY, min_spacing: int = MIN_SPACING, state_path: str = STATE_FILE):
+    from rate_limiter import RateLimiter, default_rules
+
+    limiter = RateLimiter(default_rules())
+
+    def gate(account, now):
+        verdict = limiter.check(account)
+        if verdict["ok"]:
+            return None
+        logging.info("Account '%s' at rate limit '%s'; due again in %ss.", account, verdict["rule"], verdict["retry_after"])
+        return now + verdict["retry_after"]
+
+    now = time.time()
+    sched = PostScheduler(now, concurrency, min_spacing, gate=gate)
+    saved = load_due(state_path)
+    tasks: Dict[str, asyncio.Task] = {}
+    last_refresh = None
+    logging.info("Scheduler: concurrency %d, min spacing %ss.", sched.concurrency, sched.min_spacing)
+    try:
+        while True:
+            now = time.time()
+            if last_refresh is None or now - last_refresh >= REFRESH_SECONDS:
+                sync_accounts(sched, await asyncio.to_thread(pool_accounts), now, saved)
+                sched.save(state_path)
+                last_refresh = now
+            started = sched.tick(now)
+            for account in started:
+                logging.info("Dispatching '%s' (%d running, %d waiting).", account, len(sched.running), len(sched.ready))
+                tasks[account] = asyncio.create_task(dispatch(account))
+            if started:
+                sched.save(state_path)
+            for account, task in list(tasks.items()):
+                if task.done():
+                    del tasks[account]
+                    ok = not task.cancelled() and task.exception() is None and task.result()
+                    sched.finished(account, time.time(), ok)
+                    logging.info("'%s' %s; next at %s.", account, "posted" if ok else "failed",
+                                 datetime.fromtimestamp(sched.due[account]).strftime("%Y-%m-%d %H:%M:%S"))
+                    sched.save(state_path)
+            await asyncio.sleep(TICK_SECONDS)
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        sched.save(state_path)
+        limiter.close()
+
+
+def print_status(state_path: str = STATE_FILE):
+    due = load_due(state_path)
+    if not due:
+        print("لا توجد حسابات مجدولة.")
+        return
+    now = time.time()
+    for account, ts in sorted(due.items(), key=lambda kv: kv[1]):
+        when = datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{account:<24} {when}  (بعد {max(0, int(ts - now)) // 60} دقيقة)")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(message)s')
+    parser = argparse.ArgumentParser(description="مجدول النشر لعدة حسابات على جهاز واحد")
+    parser.add_argument("--status", action="store_true", help="عرض الموعد التالي لكل حساب")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="أقصى عدد منشورات متزامنة")
+    parser.add_argument("--min-spacing", type=int, default=MIN_SPACING, help="أقل فاصل (ثوان) بين بدء منشورين")
+    args = parser.parse_args()
+    if args.status:
+        print_status()
+        return
+    try:
+        asyncio.run(serve(args.concurrency, args.min_spacing))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
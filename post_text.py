@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+How the poster turns a library entry into the text it posts (no Playwright import, so the GUI
+and the posting plan can use it too).
+
+A tweet not posted in the last 24h gets its paragraphs shuffled; a repeat gets its words
+shuffled with every (...) group kept as one unit. The hashtags go before or after the text.
+A thread keeps its order: it is split into parts (tweet_length.split_thread) and only the
+hashtags move, before or after the first part.
+Every function takes the random source as `rng`, so a seeded `random.Random` reproduces the
+same choices (see post_plan.py).
+"""
+from __future__ import annotations
+import random
+import re
+from typing import List
+
+from job_queue import canonical_hash
+from tweet_length import split_thread
+
+PARENTHESES_PLACEHOLDER = "__PAREN_PH_%d__"
+
+
+def shuffle_paragraphs(text: str, rng=random) -> str:
+    paragraphs = [p for p in text.strip().split("\n\n") if p.strip()]
+    if len(paragraphs) <= 1:
+        return text
+    rng.shuffle(paragraphs)
+    return "\n\n".join(paragraphs)
+
+
+def shuffle_hashtags(hashtags, rng=random):
+    if not hashtags:
+        return ""
+    if rng.choice([True, False]):
+        return " ".join(hashtags) + " "
+    else:
+        return " " + " ".join(hashtags)
+
+
+def shuffle_words_preserve_parentheses(text: str, rng=random) -> str:
+    """
+    إذا كانت التغريدة فقرة واحدة -> نقوم بعشوائية الكلمات،
+    مع مراعاة أن أي نص داخل قوسين (...) يبقى وحدة واحدة.
+    إذا كانت هناك فقرات متعددة، نرتب الفقرات.
+    """
+    paragraphs = [p for p in text.strip().split("\n\n") if p.strip()]
+    if len(paragraphs) > 1:
+        rng.shuffle(paragraphs)
+        return "\n\n".join(paragraphs)
+
+    paragraph = paragraphs[0] if paragraphs else text
+    par_matches = re.findall(r'\([^)]*\)', paragraph)
+    placeholders = {}
+    tmp = paragraph
+    for i, m in enumerate(par_matches):
+        key = PARENTHESES_PLACEHOLDER % i
+        placeholders[key] = m
+        tmp = tmp.replace(m, f" {key} ")
+
+    tokens = [t for t in tmp.split() if t.strip()]
+    if len(tokens) <= 1:
+        for k, v in placeholders.items():
+            paragraph = paragraph.replace(k, v)
+        return paragraph
+
+    rng.shuffle(tokens)
+    rebuilt = " ".join(tokens)
+    for k, v in placeholders.items():
+        rebuilt = rebuilt.replace(k, v)
+
+    return rebuilt
+
+
+def select_tweet(candidates, recent_hashes, rng=random):
+    """A tweet not posted recently if there is one, else any candidate (it will be word-shuffled)."""
+    fresh = candidates.fresh(recent_hashes)
+    if fresh:
+        # hash-set order differs between processes; sort so a seed picks the same tweet
+        return rng.choice(sorted(fresh, key=lambda t: t.id))
+    return rng.choice(sorted(candidates, key=lambda t: t.id))
+
+
+def build_post_text(chosen, recent_hashes, rng=random) -> str:
+    text = chosen.text
+    if canonical_hash(text) not in recent_hashes:
+        modified_text = shuffle_paragraphs(text, rng)
+    else:
+        modified_text = shuffle_words_preserve_parentheses(text, rng)
+
+    hashtags_str = shuffle_hashtags(chosen.hashtags, rng)
+    if hashtags_str.strip() and hashtags_str.strip() in modified_text:
+        return modified_text
+    return (modified_text + hashtags_str) if hashtags_str.startswith(" ") else (hashtags_str + modified_text)
+
+
+def build_post_parts(chosen, recent_hashes, rng=random) -> List[str]:
+    """What gets typed into the compose dialog: one text, or the parts of a thread."""
+    if not chosen.thread:
+        return [build_post_text(chosen, recent_hashes, rng)]
+    parts = split_thread(chosen.text, chosen.hashtags)
+    hashtags_str = shuffle_hashtags(chosen.hashtags, rng)
+    if hashtags_str.strip() and hashtags_str.strip() not in chosen.text:
+        parts[0] = (parts[0] + hashtags_str) if hashtags_str.startswith(" ") else (hashtags_str + parts[0])
+    return parts
@@ -1,37 +1,75 @@
+import argparse
 import json
 import random
 import asyncio
 import os
-import re
-import hashlib
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 import logging
 from logging.handlers import RotatingFileHandler
 import base64
+import time
 
 from playwright.async_api import async_playwright, TimeoutError as PWTimeout
 from PIL import Image  # لتحويل PNG إلى JPG
 
+from session_check import check_session, probe_session
+from session_pool import SessionPool, DEFAULT_LEASE_SECONDS
+from job_queue import JobQueue, canonical_hash
+import library_journal
+from launch_profiles import COMPOSE_TEXTBOX, compose_url, context_kwargs, get_profile, launch_kwargs
+from library_watch import CandidateSet, LibraryWatcher
+from media_cache import MediaCache
+from post_plan import PLAN_FILE, PostPlan
+from post_text import build_post_parts
+from tweet_models import PostHistory, Tweet, tweets_from_json
+from tweet_store import open_store, sqlite_backend
+from rate_limiter import RateLimiter, default_rules, DEFAULT_ACCOUNT
+from runner_monitor import format_post_result
+
+
+def account_file(name: str) -> str:
+    """post_history.json -> post_history.<account>.json for SESSION_NAME=<account>: the scheduler
+    runs several accounts' posters at once, and these files are not shared between processes."""
+    account = os.getenv("SESSION_NAME")
+    if not account:
+        return name
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{account}{ext}"
+
+
 # --- إعدادات ---
 TWEETS_FILE = "tweets.json"
 STORAGE = "storage_state.json"
 DEBUG_DIR = Path("debug_outputs")
 DEBUG_DIR.mkdir(exist_ok=True)
 MAX_SCREENSHOTS = 20  # حد أقصى للقطات
-HISTORY_FILE = "post_history.json"
+HISTORY_FILE = account_file("post_history.json")
 MAX_POSTS_PER_24H = 20
-# فواصل بين التغريدات (ثواني) — المتطلب: 30-180 دقيقة
+# post_history.json keeps a week: the 7d rule in rate_limiter.py is seeded from it
+HISTORY_RETENTION_SECONDS = 7 * 24 * 3600
+# فواصل بين التغريدات (ثواني) — المتطلب: 30-180 دقيقة (post_scheduler.py يستخدم النطاق نفسه)
 MIN_INTERVAL_SECONDS = 30 * 60
 MAX_INTERVAL_SECONDS = 3 * 60 * 60
+# الوضع المتواصل بلا تغريدات مفعلة: فاصل إعادة فحص المكتبة
+LIBRARY_IDLE_SECONDS = 60
+# زر "إضافة تغريدة" للسلسلة في نافذة التأليف
+THREAD_ADD_BUTTON = "[data-testid='addButton']"
+THREAD_JOIN = "\n  ⤷ "
+# مهلة ظهور صندوق النص في صفحة التأليف، وانتظار ما بعد الإرسال (يغيّرهما benchmarks/bench_post.py)
+COMPOSE_TIMEOUT_MS = 45000
+POST_SETTLE_SECONDS = 2
 
 # ملف حالة العداء المجدول (لـ GitHub Actions)
 RUNNER_STATE_FILE = "runner_state.json"
+# run_profiler.RunProfiler عند التشغيل بـ --profile، وإلا None
+PROFILER = None
 
 logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(message)s')
 # تدوير السجلات لسهولة تتبع المشاكل عبر عدة تشغيلات
 try:
-    log_file = Path("runner.log")
+    log_file = Path(account_file("runner.log"))
     rfh = RotatingFileHandler(log_file, maxBytes=512_000, backupCount=3, encoding="utf-8")
     rfh.setFormatter(logging.Formatter('[%(asctime)s] %(message)s'))
     logging.getLogger().addHandler(rfh)
@@ -40,49 +78,52 @@ except Exception:
 
 
 # ---------------- Utilities: history ----------------
+def _env_flag(name: str) -> bool:
+    return os.getenv(name) not in (None, "", "0", "false", "False")
+
+
 def _now_ts():
     return int(datetime.now().timestamp())
 
 
-def load_history():
+def load_history() -> PostHistory:
     p = Path(HISTORY_FILE)
     if not p.exists():
-        return []
+        return PostHistory()
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        return PostHistory.from_json(json.loads(p.read_text(encoding="utf-8")))
     except Exception:
-        return []
+        return PostHistory()
 
 
-def save_history(hist):
+def save_history(hist: PostHistory):
     try:
-        Path(HISTORY_FILE).write_text(json.dumps(hist, ensure_ascii=False, indent=2), encoding="utf-8")
+        Path(HISTORY_FILE).write_text(json.dumps(hist.to_json(), ensure_ascii=False, indent=2), encoding="utf-8")
     except Exception as e:
         logging.exception("Failed saving history: %s", e)
 
 
-def clean_history(hist):
-    cutoff = _now_ts() - 24 * 3600
-    filtered = [h for h in hist if h.get("timestamp", 0) >= cutoff]
-    return filtered
+def clean_history(hist: PostHistory) -> PostHistory:
+    # kept for the longest rate-limit window, so a fresh rate_limits.db is seeded with the whole week
+    return hist.prune(_now_ts() - HISTORY_RETENTION_SECONDS)
 
 
-def count_last_24h(hist):
-    hist = clean_history(hist)
-    return len(hist)
+def hashes_last_24h(hist: PostHistory):
+    """Texts posted in the last 24h (not chosen again)."""
+    return hist.hashes_since(_now_ts() - 24 * 3600)
 
 
-def add_history_entry(hist, text_hash):
-    hist.append({"hash": text_hash, "timestamp": _now_ts()})
+def count_last_24h(hist: PostHistory) -> int:
+    return hist.count_since(_now_ts() - 24 * 3600)
+
+
+def add_history_entry(hist: PostHistory, text_hash: str) -> PostHistory:
+    hist.append(text_hash, _now_ts())
     hist = clean_history(hist)
     save_history(hist)
     return hist
 
 
-def canonical_hash(text: str) -> str:
-    return hashlib.sha256(text.encode("utf-8")).hexdigest()
-
-
 # ---------------- Utilities: runner state (for CI single-run mode) ----------------
 def load_state():
     p = Path(RUNNER_STATE_FILE)
@@ -102,64 +143,129 @@ def save_state(state: dict):
 
 
 # ---------------- Utilities: tweets ----------------
-def load_tweets():
-    with open(TWEETS_FILE, "r", encoding="utf-8") as f:
-        return [t for t in json.load(f) if t.get("enabled", True)]
-
-
-def shuffle_paragraphs(text: str) -> str:
-    paragraphs = [p for p in text.strip().split("\n\n") if p.strip()]
-    if len(paragraphs) <= 1:
-        return text
-    random.shuffle(paragraphs)
-    return "\n\n".join(paragraphs)
-
-
-def shuffle_hashtags(hashtags):
-    if not hashtags:
-        return ""
-    if random.choice([True, False]):
-        return " ".join(hashtags) + " "
-    else:
-        return " " + " ".join(hashtags)
-
-
-# ---------------- Utilities: shuffle words but keep (...) as unit ----------------
-PARENTHESES_PLACEHOLDER = "__PAREN_PH_%d__"
-
-
-def shuffle_words_preserve_parentheses(text: str) -> str:
-    """
-    إذا كانت التغريدة فقرة واحدة -> نقوم بعشوائية الكلمات،
-    مع مراعاة أن أي نص داخل قوسين (...) يبقى وحدة واحدة.
-    إذا كانت هناك فقرات متعددة، نرتب الفقرات.
-    """
-    paragraphs = [p for p in text.strip().split("\n\n") if p.strip()]
-    if len(paragraphs) > 1:
-        random.shuffle(paragraphs)
-        return "\n\n".join(paragraphs)
-
-    paragraph = paragraphs[0] if paragraphs else text
-    par_matches = re.findall(r'\([^)]*\)', paragraph)
-    placeholders = {}
-    tmp = paragraph
-    for i, m in enumerate(par_matches):
-        key = PARENTHESES_PLACEHOLDER % i
-        placeholders[key] = m
-        tmp = tmp.replace(m, f" {key} ")
-
-    tokens = [t for t in tmp.split() if t.strip()]
-    if len(tokens) <= 1:
-        for k, v in placeholders.items():
-            paragraph = paragraph.replace(k, v)
-        return paragraph
-
-    random.shuffle(tokens)
-    rebuilt = " ".join(tokens)
-    for k, v in placeholders.items():
-        rebuilt = rebuilt.replace(k, v)
-
-    return rebuilt
+def load_tweets() -> Tuple[List[Tweet], Optional[int], Optional[str]]:
+    """Enabled tweets, plus the journal version and sha256 they were read at (None for SQLite)."""
+    store = open_store(TWEETS_FILE)
+    try:
+        return store.enabled(), getattr(store, "version", None), getattr(store, "digest", None)
+    finally:
+        if hasattr(store, "close"):  # SQLite
+            store.close()
+
+
+def library_paths() -> List[str]:
+    """Files whose changes mean the tweet library changed (for LibraryWatcher)."""
+    if sqlite_backend():
+        from sqlite_store import TWEETS_DB
+        return [TWEETS_DB, TWEETS_DB + "-wal"]
+    return [TWEETS_FILE]
+
+
+def apply_journal(candidates: CandidateSet) -> Optional[Dict[str, int]]:
+    """Catch up from the change journal (library_journal.py) without loading the library;
+    None when it cannot say what changed (unknown version, full rewrite, unjournaled edit)."""
+    if candidates.version is None or sqlite_backend():
+        return None
+    entries = library_journal.changes_since(library_journal.read_entries(TWEETS_FILE), candidates.version)
+    if entries is None:
+        return None
+    digest = library_journal.file_digest(TWEETS_FILE)
+    # the file must be exactly what the last entry wrote (not edited by hand, not mid-write)
+    if digest != (entries[-1]["hash"] if entries else candidates.digest):
+        return None
+    delta = {"added": 0, "removed": 0, "disabled": 0, "edited": 0}
+    for e in entries:
+        for k, n in candidates.apply_changes(tweets_from_json(e["put"]), e["del"]).items():
+            delta[k] += n
+    if entries:
+        candidates.version = entries[-1]["v"]
+    candidates.digest = digest
+    return delta
+
+
+def reload_library(watcher: LibraryWatcher, candidates: CandidateSet) -> bool:
+    """Apply edits made by manage_tweets.py / the GUI since the last post; True if anything was reloaded."""
+    if not watcher.changed():
+        return False
+    try:
+        delta = apply_journal(candidates)
+        how = "from the journal"
+        if delta is None:
+            store = open_store(TWEETS_FILE)
+            try:
+                library = store.all()
+                candidates.version = getattr(store, "version", None)
+                candidates.digest = getattr(store, "digest", None)
+            finally:
+                if hasattr(store, "close"):  # SQLite
+                    store.close()
+            delta = candidates.apply(library)
+            how = "in full"
+    except Exception as e:
+        # a half-written or invalid file: keep the current candidates and retry next time
+        logging.warning("Tweet library reload failed (%s); keeping %d loaded tweets.", e, len(candidates))
+        watcher.reset()
+        return False
+    logging.info("Tweet library reloaded %s: +%d added, -%d removed, %d disabled, %d edited (%d postable, %d too long).",
+                 how, delta["added"], delta["removed"], delta["disabled"], delta["edited"], len(candidates), len(candidates.too_long))
+    return True
+
+
+def prepare_media(media: MediaCache, candidates: CandidateSet):
+    """Resize/recompress attachments of postable tweets now, so posting only uploads cached files."""
+    errors = media.prepare(p for t in candidates for p in t.media)
+    for path, err in errors.items():
+        logging.warning("Media %s could not be prepared: %s", path, err)
+
+
+def next_post(plan: PostPlan, candidates: CandidateSet, recent_hashes):
+    """Head of the posting plan: (tweet, parts to post, plan entry)."""
+    item = plan.head(candidates, recent_hashes)
+    if item is None:
+        # empty or fully stale plan (first run, library replaced): plan now
+        plan.refill(candidates, recent_hashes)
+        item = plan.head(candidates, recent_hashes)
+    logging.info("Posting planned entry #%s (%s).", item["index"],
+                 "not posted in last 24h" if item["fresh"] else "repeat with shuffled words")
+    return candidates.get(item["tweet_id"]), item["parts"], item
+
+
+def claim_queued(queue, candidates: CandidateSet, account=None):
+    """Claim the next due job from the posting queue; returns (job, tweet) or (None, None)."""
+    if queue is None:
+        return None, None
+    while True:
+        job = queue.claim(account=account)
+        if job is None:
+            return None, None
+        chosen = candidates.get(job["tweet_id"])
+        if chosen is not None:
+            logging.info("Claimed queued job #%s (tweet %s).", job["id"], job["tweet_id"])
+            return job, chosen
+        queue.complete(job, False, "tweet not found, disabled or too long")
+        logging.warning("Queued job #%s refers to a missing/disabled/too long tweet %s.", job["id"], job["tweet_id"])
+
+
+async def post_chosen(page, queue, job, chosen, parts, media: MediaCache, navigated=False):
+    """Post one tweet; queued jobs go through the at-most-once fence first. Returns whether it
+    went out, or None when it was not attempted (says nothing about the session)."""
+    try:
+        media_files = media.resolve(chosen.media)
+    except Exception as e:
+        logging.error("Not posting tweet %s: %s", chosen.id, e)
+        if job is not None:
+            queue.complete(job, False, str(e))
+        return None
+    if job is not None and not queue.begin_posting(job):
+        logging.warning("Lost lease on queued job #%s — not posting it.", job["id"])
+        return None
+    start = time.monotonic()
+    ok = await post_with_retries(page, parts, media_files, navigated=navigated)
+    # سطر ثابت الصيغة تقرؤه لوحة التشغيل في الواجهة (runner_monitor.py)
+    logging.info(format_post_result(ok, chosen.id, time.monotonic() - start))
+    if job is not None:
+        queue.complete(job, ok, None if ok else "posting failed")
+    return ok
 
 
 # ---------------- Utilities: debug saving ----------------
@@ -265,7 +371,30 @@ async def try_set_text(page, selector, text):
 
 
 # ---------------- Core: post tweet (Control+Enter مباشرة) ----------------
-async def post_tweet(page, content):
+async def attach_media(page, media_files):
+    """Upload ready-made files from media_cache/ and wait until the post button accepts them."""
+    await page.set_input_files("input[data-testid='fileInput']", media_files)
+    await page.wait_for_selector("div[data-testid='attachments']", timeout=30000)
+    # the button stays disabled while uploads are processed
+    await page.wait_for_selector(
+        "[data-testid='tweetButton']:not([aria-disabled='true']), [data-testid='tweetButtonInline']:not([aria-disabled='true'])",
+        timeout=120000)
+    logging.info("Attached %d media file(s).", len(media_files))
+
+
+async def fill_thread(page, parts):
+    """Add the remaining parts of a thread in the same compose dialog (one navigation for N parts)."""
+    for i, part in enumerate(parts[1:], 1):
+        await page.click(THREAD_ADD_BUTTON, timeout=10000)
+        sel = f"div[data-testid='tweetTextarea_{i}']"
+        if not await try_set_text(page, sel, part):
+            await save_debug(page, "thread_part_not_filled")
+            raise RuntimeError(f"تعذر ملء الجزء {i + 1} من السلسلة")
+    logging.info("Filled a %d-part thread in one compose session.", len(parts))
+
+
+async def open_compose(page):
+    """Navigate to the compose page and wait for the textbox."""
     logging.info("Navigating to compose page...")
     try:
         page.set_default_timeout(60000)
@@ -274,12 +403,12 @@ async def post_tweet(page, content):
         pass
 
     try:
-        await page.goto("https://twitter.com/compose/tweet", timeout=60000)
+        await page.goto(compose_url(), timeout=60000)
     except Exception as e:
         logging.warning("page.goto warning/timeout: %s", e)
 
     try:
-        await page.wait_for_selector("div[role='textbox'], textarea, div[aria-label='Tweet text']", timeout=45000)
+        await page.wait_for_selector(COMPOSE_TEXTBOX, timeout=COMPOSE_TIMEOUT_MS)
     except Exception:
         await save_debug(page, "load_timeout")
         url = page.url
@@ -289,6 +418,15 @@ async def post_tweet(page, content):
         else:
             raise RuntimeError("تعذر تحميل صفحة التأليف أو إيجاد صندوق النص — راجع ملفات debug.")
 
+
+async def post_tweet(page, content, media_files=(), navigated=False):
+    # content: one text, or the ordered parts of a thread
+    parts = [content] if isinstance(content, str) else list(content)
+    content = parts[0]
+    # navigated: the page already shows the compose textbox (opened during startup)
+    if not navigated:
+        await open_compose(page)
+
     text_selectors = [
         "div[aria-label='Tweet text']",
         "div[role='textbox'][data-testid^='tweetTextarea']",
@@ -317,6 +455,16 @@ async def post_tweet(page, content):
         await save_debug(page, "no_textbox_after_load")
         raise RuntimeError("Tweet textbox not found or not fillable.")
 
+    if media_files:
+        try:
+            await attach_media(page, list(media_files))
+        except Exception as e:
+            await save_debug(page, "media_upload_failed")
+            raise RuntimeError(f"تعذر رفع الوسائط: {e}")
+
+    if len(parts) > 1:
+        await fill_thread(page, parts)
+
     await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
 
     # Use Control+Enter مباشرة (ويندوز)
@@ -366,7 +514,7 @@ async def post_tweet(page, content):
             await save_debug(page, "no_tweet_button_after_fill_fallback")
             raise RuntimeError("تعذّر إرسال التغريدة عن طريق الاختصار أو النقر. راجع debug.")
 
-    await asyncio.sleep(2)
+    await asyncio.sleep(POST_SETTLE_SECONDS)
     logging.info("Tweet posted (or click/shortcut attempted).")
 
 
@@ -409,11 +557,11 @@ def generate_intervals_for_posts(n_posts: int, total_seconds: int, min_interval:
     return intervals
 
 
-async def post_with_retries(page, content, retries=3, delay=10):
+async def post_with_retries(page, content, media_files=(), retries=3, delay=10, navigated=False):
     """محاولة نشر التغريدة مع إعادة المحاولة عند الفشل."""
     for i in range(retries):
         try:
-            await post_tweet(page, content)
+            await post_tweet(page, content, media_files, navigated=navigated and i == 0)
             logging.info("Tweet successfully posted.")
             return True
         except Exception as e:
@@ -434,14 +582,19 @@ async def post_with_retries(page, content, retries=3, delay=10):
 
 
 # ---------------- Main flow ----------------
-async def main():
-    if not Path(TWEETS_FILE).exists():
-        raise FileNotFoundError(f"{TWEETS_FILE} not found in working directory.")
-    tweets = load_tweets()
-    if not tweets:
-        logging.info("No enabled tweets found in tweets.json")
-        return
-    random.shuffle(tweets)
+# بدء التشغيل خط متوازٍ: Chromium يُطلق فوراً، وقراءة الملفات وفحص الجلسة واختيار التغريدة تجري
+# أثناء ذلك في خيوط، وتبدأ صفحة التأليف بالتحميل لحظة جاهزية السياق.
+def resolve_session():
+    """(storage_state for new_context, raw state bytes for the pre-check, lease or None)."""
+    # مجمع الجلسات: SESSION_NAME=<حساب> لجلسة محددة، أو SESSION_POOL=1 لأي جلسة متاحة
+    session_name = os.getenv("SESSION_NAME")
+    if session_name or _env_flag("SESSION_POOL"):
+        lease = SessionPool().lease(name=session_name or None)
+        if lease is None:
+            raise RuntimeError("لا توجد جلسة متاحة في المجمع (كلها مؤجرة أو غير صالحة). راجع: python login_helper.py --list")
+        raw_state = lease.pool.read_state(lease.name)
+        logging.info("Leased session '%s' from pool.", lease.name)
+        return json.loads(raw_state.decode("utf-8")), raw_state, lease
 
     # في CI: يمكن تمرير حالة الجلسة كـ base64 عبر متغير سري STORAGE_STATE_B64
     b64 = os.getenv("STORAGE_STATE_B64")
@@ -454,130 +607,312 @@ async def main():
 
     if not Path(STORAGE).exists():
         raise FileNotFoundError(f"{STORAGE} not found. Run 'python login_helper.py' to log in and create it, or provide STORAGE_STATE_B64.")
+    return STORAGE, Path(STORAGE).read_bytes(), None
 
-    # load & clean history
-    history = clean_history(load_history())
-    save_history(history)
-
-    already = count_last_24h(history)
-    logging.info(f"Already posted {already} times in the last 24 hours (limit {MAX_POSTS_PER_24H}).")
-    remaining_to_post = MAX_POSTS_PER_24H - already
-    if remaining_to_post <= 0:
-        logging.info("No remaining posts required in this 24h window. Exiting.")
+
+def check_session_state(raw_state: bytes, lease):
+    # فحص سريع للجلسة (cookies وتاريخ الانتهاء) بدل انتظار مهلة صفحة التأليف
+    if _env_flag("SKIP_SESSION_CHECK"):
+        return
+    verdict = check_session(raw=raw_state)
+    probe_url = os.getenv("SESSION_PROBE_URL")
+    if verdict["ok"] and probe_url:
+        verdict = probe_session(probe_url, raw=raw_state)
+    if not verdict["ok"]:
+        if lease:
+            lease.pool.mark_health(lease.name, verdict["reason"])
+        raise RuntimeError(verdict["message"])
+    logging.info("Session pre-check passed (expires_at=%s).", verdict.get("expires_at"))
+
+
+def not_due_yet(local_continuous: bool) -> bool:
+    """Single-run mode, no queued job due now and next_post_at still ahead: nothing to post, skip the browser."""
+    if local_continuous or _env_flag("POST_NOW"):
+        return False
+    if load_state().get("next_post_at", 0) <= _now_ts():
+        return False
+    queue = JobQueue.open_if_exists()
+    if queue is None:
+        return True
+    try:
+        # SESSION_POOL without SESSION_NAME may lease any account, so any due job counts
+        session_name = os.getenv("SESSION_NAME")
+        return not queue.has_due(session_name, any_account=not session_name and _env_flag("SESSION_POOL"))
+    finally:
+        queue.close()
+
+
+async def launch_browser(p, profile, started: float):
+    browser = await p.chromium.launch(**launch_kwargs(profile))
+    logging.info("Startup: Chromium launched at +%.2fs (profile %s).", time.perf_counter() - started, profile["name"])
+    return browser
+
+
+async def open_compose_page(browser_task, storage_state, profile, started: float):
+    """Context, page and compose navigation as soon as the browser is up; returns (context, page, ready)."""
+    browser = await browser_task
+    context = await browser.new_context(storage_state=storage_state, **context_kwargs(profile))
+    try:
+        context.set_default_timeout(60000)
+        context.set_default_navigation_timeout(60000)
+    except Exception:
+        pass
+    page = await context.new_page()
+    try:
+        await open_compose(page)
+    except Exception as e:
+        # post_tweet() navigates again and reports the failure through its retries/debug files
+        logging.warning("Compose page not ready during startup: %s", e)
+        return context, page, False
+    logging.info("Startup: time-to-textbox %.2fs.", time.perf_counter() - started)
+    return context, page, True
+
+
+async def close_browser(browser_task, compose_task):
+    tasks = [t for t in (compose_task, browser_task) if t is not None]
+    for t in tasks:
+        if not t.done():
+            t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if browser_task.cancelled() or browser_task.exception() is not None:
         return
+    # إغلاق المتصفح يغلق السياق معه
+    try:
+        await browser_task.result().close()
+    except Exception:
+        pass
+
+
+async def main():
+    started = time.perf_counter()
+    if not sqlite_backend() and not Path(TWEETS_FILE).exists():
+        raise FileNotFoundError(f"{TWEETS_FILE} not found in working directory.")
 
     # وضع التشغيل: افتراضيًا "تشغيل مفرد لكل استدعاء" مناسب لـ GitHub Actions.
     # لتشغيل محلي متواصل، عيّن LOCAL_CONTINUOUS=1 في البيئة.
-    local_continuous = os.getenv("LOCAL_CONTINUOUS") not in (None, "", "0", "false", "False")
+    local_continuous = _env_flag("LOCAL_CONTINUOUS")
+    if not_due_yet(local_continuous):
+        logging.info("Not time yet. Next post at ts=%s, now=%s.", load_state().get("next_post_at"), _now_ts())
+        return
 
-    headless = True if os.getenv("CI") else False
+    # LAUNCH_PROFILE: default | minimal-ci | low-memory | debug-headed (launch_profiles.py)
+    profile = get_profile()
 
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=headless)
-        context_kwargs = {"storage_state": STORAGE}
-        context = await browser.new_context(**context_kwargs)
-
+        browser_task = asyncio.create_task(launch_browser(p, profile, started))
+        compose_task = None
+        lease = None
+        # outcome of the last post for the session's health; None when nothing was attempted
+        result = None
+        tweets_task = asyncio.create_task(asyncio.to_thread(load_tweets))
         try:
-            context.set_default_timeout(60000)
-            context.set_default_navigation_timeout(60000)
+            storage_state, raw_state, lease = await asyncio.to_thread(resolve_session)
+            # an expired session fails here, before the compose page starts loading
+            await asyncio.to_thread(check_session_state, raw_state, lease)
+            compose_task = asyncio.create_task(open_compose_page(browser_task, storage_state, profile, started))
+            tweets, version, digest = await tweets_task
+            if not tweets:
+                logging.info("No enabled tweets found in tweets.json")
+                return
+            result = await run_posting(tweets, compose_task, lease, local_continuous, (version, digest))
         except Exception:
-            pass
+            # the library read may still be running (or have failed unobserved) when the session step raised
+            await asyncio.gather(tweets_task, return_exceptions=True)
+            if lease:
+                lease.release(ok=False)
+                lease = None
+            raise
+        finally:
+            if lease:
+                lease.release(ok=result)
+            await close_browser(browser_task, compose_task)
+
+
+async def run_posting(tweets, compose_task, lease=None, local_continuous=False, library_at=(None, None)):
+    """Post one tweet (or keep posting with local_continuous). Returns whether the last post went
+    out, or None when none was attempted (rate limit, not due, nothing to post)."""
+    # load & clean history
+    history = clean_history(await asyncio.to_thread(load_history))
+    await asyncio.to_thread(save_history, history)
 
-        page = await context.new_page()
-
-        if local_continuous:
-            # النمط السابق: انشر عدة مرات حتى نصل للحد (مع فواصل مضمونة ضمن 30-180 دقيقة)
-            # سنُنشئ فواصل عشوائية ضمن [MIN, MAX] دون تجاوز حد 24 ساعة.
-            posts_left = remaining_to_post
-            i = 0
-            while posts_left > 0:
-                # تحديث history والتأكد من السقف
-                history = clean_history(load_history())
-                if count_last_24h(history) >= MAX_POSTS_PER_24H:
+    # حدود النشر لكل حساب عبر عدة نوافذ (ساعة/24 ساعة/أسبوع/دفعة)
+    account = lease.name if lease else None
+    limit_key = account or DEFAULT_ACCOUNT
+    queue = JobQueue.open_if_exists()
+    try:
+        with RateLimiter(default_rules(MAX_POSTS_PER_24H)) as limiter:
+            return await post_within_limits(limiter, queue, limit_key, account, history, tweets, compose_task,
+                                            lease, local_continuous, library_at)
+    finally:
+        if queue is not None:
+            queue.close()
+
+
+async def post_within_limits(limiter, queue, limit_key, account, history, tweets, compose_task, lease,
+                             local_continuous, library_at):
+    limiter.seed(limit_key, history.timestamps)
+    logging.info("Posting usage for '%s': %s", limit_key, limiter.usage(limit_key))
+    verdict = limiter.check(limit_key)
+    if not verdict["ok"]:
+        logging.info("Rate limit '%s' reached; next post allowed in %s seconds. Exiting.", verdict["rule"], verdict["retry_after"])
+        return None
+
+    candidates = await asyncio.to_thread(CandidateSet, tweets)
+    # where the continuous loop's journal catch-up starts
+    candidates.version, candidates.digest = library_at
+    if candidates.too_long:
+        logging.warning("Skipping %d tweet(s) longer than the weighted limit: %s",
+                        len(candidates.too_long), ", ".join(sorted(candidates.too_long)))
+    if not len(candidates) and not local_continuous:
+        logging.info("No enabled tweet fits the length limit. Exiting.")
+        return None
+    # الاختيار والخلط محسوبان مسبقاً في post_plan.json (نفس ما تعرضه معاينة الواجهة)
+    plan = PostPlan(account_file(PLAN_FILE))
+    await asyncio.to_thread(plan.refill, candidates, hashes_last_24h(history))
+    # الصور تُصغَّر وتُضغط الآن (بالتوازي) لا وقت النشر
+    media = MediaCache()
+    await asyncio.to_thread(prepare_media, media, candidates)
+
+    if local_continuous:
+        context, page, warm = await compose_task
+        # النمط السابق: انشر عدة مرات حتى نصل للسقف اليومي (مع فواصل ضمن 30-180 دقيقة)
+        # تعديلات المكتبة (من manage_tweets.py أو الواجهة) تُطبَّق بين المنشورات بلا إعادة تشغيل
+        watcher = LibraryWatcher(library_paths())
+        logging.info("Watching the tweet library for changes (%s).", watcher.mode)
+        last_ok = None
+        while True:
+            if reload_library(watcher, candidates):
+                prepare_media(media, candidates)
+            if not len(candidates):
+                logging.info("No enabled tweets; checking the library again in %s seconds...", LIBRARY_IDLE_SECONDS)
+                if lease:
+                    lease.renew(LIBRARY_IDLE_SECONDS + DEFAULT_LEASE_SECONDS)
+                warm = False
+                await asyncio.sleep(LIBRARY_IDLE_SECONDS)
+                continue
+
+            verdict = limiter.acquire(limit_key)
+            if not verdict["ok"]:
+                if verdict["window"] >= 24 * 3600:
+                    logging.info("Rate limit '%s' reached. Stopping continuous mode.", verdict["rule"])
                     break
+                # حدود النوافذ القصيرة: انتظر حتى يُسمح بالنشر التالي
+                logging.info("Rate limit '%s' reached; waiting %s seconds...", verdict["rule"], verdict["retry_after"])
+                if lease:
+                    lease.renew(verdict["retry_after"] + DEFAULT_LEASE_SECONDS)
+                warm = False
+                await asyncio.sleep(verdict["retry_after"])
+                continue
 
-                recent_hashes = {h["hash"] for h in history}
-                candidates = [t for t in tweets if canonical_hash(t.get("text", "")) not in recent_hashes]
-                if candidates:
-                    chosen = random.choice(candidates)
-                    modified_text = shuffle_paragraphs(chosen.get("text", ""))
-                    logging.info("Selected a tweet not posted in last 24h.")
-                else:
-                    chosen = random.choice(tweets)
-                    modified_text = shuffle_words_preserve_parentheses(chosen.get("text", ""))
-                    logging.info("No new tweet available — repeating an old one with shuffled words (parentheses preserved).")
-
-                hashtags_str = shuffle_hashtags(chosen.get("hashtags", []))
-                if hashtags_str.strip() and hashtags_str.strip() in modified_text:
-                    final_text = modified_text
-                else:
-                    final_text = (modified_text + hashtags_str) if hashtags_str.startswith(" ") else (hashtags_str + modified_text)
-
-                print(f"[{datetime.now()}] Posting tweet: {final_text}")
-                ok = await post_with_retries(page, final_text)
-                if ok:
-                    history = add_history_entry(history, canonical_hash(chosen.get("text", "")))
-                    posts_left -= 1
-                    i += 1
-
-                if posts_left > 0:
-                    wait_sec = random.randint(MIN_INTERVAL_SECONDS, MAX_INTERVAL_SECONDS)
-                    logging.info(f"Waiting {wait_sec} seconds until next post (local continuous mode)...")
-                    await asyncio.sleep(wait_sec)
-
-        else:
-            # النمط الافتراضي: نشر تغريدة واحدة فقط لكل تشغيل (للاستخدام في GitHub Actions)
-            state = load_state()
-            now = _now_ts()
-            if state.get("next_post_at", 0) > now:
-                logging.info(f"Not time yet. Next post at ts={state['next_post_at']}, now={now}.")
-                await context.close()
-                await browser.close()
-                return
-
-            # تحقق من السقف مرة أخرى
             history = clean_history(load_history())
-            if count_last_24h(history) >= MAX_POSTS_PER_24H:
-                logging.info("24h posting cap reached. Exiting.")
-                await context.close()
-                await browser.close()
-                return
-
-            recent_hashes = {h["hash"] for h in history}
-            candidates = [t for t in tweets if canonical_hash(t.get("text", "")) not in recent_hashes]
-            if candidates:
-                chosen = random.choice(candidates)
-                modified_text = shuffle_paragraphs(chosen.get("text", ""))
-                logging.info("Selected a tweet not posted in last 24h.")
+            recent_hashes = hashes_last_24h(history)
+            job, chosen = claim_queued(queue, candidates, account)
+            item = None
+            if chosen is None:
+                chosen, parts, item = next_post(plan, candidates, recent_hashes)
             else:
-                chosen = random.choice(tweets)
-                modified_text = shuffle_words_preserve_parentheses(chosen.get("text", ""))
-                logging.info("No new tweet available — repeating an old one with shuffled words (parentheses preserved).")
-
-            hashtags_str = shuffle_hashtags(chosen.get("hashtags", []))
-            if hashtags_str.strip() and hashtags_str.strip() in modified_text:
-                final_text = modified_text
+                parts = build_post_parts(chosen, recent_hashes)
+
+            print(f"[{datetime.now()}] Posting tweet: {THREAD_JOIN.join(parts)}")
+            # أول منشور يستخدم صفحة التأليف المفتوحة أثناء بدء التشغيل
+            ok = await post_chosen(page, queue, job, chosen, parts, media, navigated=warm)
+            warm = False
+            if ok is not None:
+                last_ok = ok
+            if PROFILER is not None:
+                PROFILER.memory_checkpoint(f"post of {chosen.id}")
+            if ok:
+                history = add_history_entry(history, canonical_hash(chosen.text))
+                if item is not None:
+                    plan.done(item)
             else:
-                final_text = (modified_text + hashtags_str) if hashtags_str.startswith(" ") else (hashtags_str + modified_text)
+                limiter.refund(limit_key)
+            plan.refill(candidates, hashes_last_24h(history))
 
-            print(f"[{datetime.now()}] Posting single tweet (CI mode): {final_text}")
-            ok = await post_with_retries(page, final_text)
-            if ok:
-                add_history_entry(history, canonical_hash(chosen.get("text", "")))
+            verdict = limiter.check(limit_key)
+            if not verdict["ok"] and verdict["window"] >= 24 * 3600:
+                logging.info("Rate limit '%s' reached. Stopping continuous mode.", verdict["rule"])
+                break
+            wait_sec = random.randint(MIN_INTERVAL_SECONDS, MAX_INTERVAL_SECONDS)
+            # الموعد التالي في runner_state.json ليظهر في لوحة التشغيل
+            state = load_state()
+            state["next_post_at"] = _now_ts() + wait_sec
+            save_state(state)
+            if lease:
+                lease.renew(wait_sec + DEFAULT_LEASE_SECONDS)
+            logging.info(f"Waiting {wait_sec} seconds until next post (local continuous mode)...")
+            await asyncio.sleep(wait_sec)
+        watcher.close()
+        return last_ok
+
+    else:
+        # النمط الافتراضي: نشر تغريدة واحدة فقط لكل تشغيل (للاستخدام في GitHub Actions)
+        # مهمة مستحقة في طابور النشر تتقدم على موعد التشغيل العشوائي؛ كل هذا يجري والمتصفح يُحمّل
+        # POST_NOW=1: المجدول (post_scheduler.py) هو من يقرر الموعد، فلا يُقرأ runner_state.json ولا يُكتب
+        post_now = _env_flag("POST_NOW")
+        state = load_state()
+        now = _now_ts()
+        job, chosen = claim_queued(queue, candidates, account)
+        if job is None and not post_now and state.get("next_post_at", 0) > now:
+            logging.info(f"Not time yet. Next post at ts={state['next_post_at']}, now={now}.")
+            return None
+
+        # تحقق من الحدود مرة أخرى (قد يكون عامل آخر نشر في هذه الأثناء)
+        verdict = limiter.acquire(limit_key)
+        if not verdict["ok"]:
+            logging.info("Rate limit '%s' reached. Exiting.", verdict["rule"])
+            if job is not None:
+                queue.release(job)
+            return None
+
+        history = clean_history(load_history())
+        recent_hashes = hashes_last_24h(history)
+        item = None
+        if chosen is None:
+            chosen, parts, item = next_post(plan, candidates, recent_hashes)
+        else:
+            parts = build_post_parts(chosen, recent_hashes)
+
+        try:
+            context, page, warm = await compose_task
+        except Exception:
+            limiter.refund(limit_key)
+            if job is not None:
+                queue.release(job)
+            raise
+        print(f"[{datetime.now()}] Posting single tweet (CI mode): {THREAD_JOIN.join(parts)}")
+        ok = await post_chosen(page, queue, job, chosen, parts, media, navigated=warm)
+        if ok:
+            history = add_history_entry(history, canonical_hash(chosen.text))
+            if item is not None:
+                plan.done(item)
+            plan.refill(candidates, hashes_last_24h(history))
+            if not post_now:
                 # جدولة التالي ضمن [30, 180] دقيقة
                 state["next_post_at"] = _now_ts() + random.randint(MIN_INTERVAL_SECONDS, MAX_INTERVAL_SECONDS)
                 save_state(state)
+        else:
+            limiter.refund(limit_key)
+        return ok
 
-        # إغلاق السياق والمتصفح بأمان
-        try:
-            await context.close()
-        except Exception:
-            pass
-        try:
-            await browser.close()
-        except Exception:
-            pass
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="نشر تغريدة (أو عدة تغريدات مع LOCAL_CONTINUOUS=1)")
+    parser.add_argument("--profile", action="store_true",
+                        help="قياس الأداء: cProfile وعينات المكدس (وtracemalloc في الوضع المتواصل) في profiles/")
+    parser.add_argument("--profile-interval", type=float, default=5.0, help="فاصل أخذ العينات بالمللي ثانية")
+    args, unknown = parser.parse_known_args(argv)
+    if unknown:
+        logging.warning("Ignoring unknown arguments: %s", " ".join(unknown))
+    return args
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    if args.profile:
+        from run_profiler import RunProfiler
+
+        PROFILER = RunProfiler(interval=args.profile_interval / 1000, track_memory=_env_flag("LOCAL_CONTINUOUS"))
+        PROFILER.run(main)
+    else:
+        asyncio.run(main())
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Per-account posting limits over several windows at once (hour / 24h / week / burst).
+
+Every rule is an exact sliding window: the number of this account's post timestamps in the
+last `window` seconds must stay under the limit. The timestamps live in SQLite
+(`rate_limits.db`, one indexed row per post, pruned past the longest window) so concurrent
+workers share them; a check is one index range count per rule. An estimate from fixed-window
+counters would be O(1) too, but it lets almost twice the limit through around a window
+boundary, which is not acceptable for the 24h and 7d caps.
+
+On first use for an account the timestamps are seeded from post_history.json (kept for the
+longest window, see post_tweets.HISTORY_RETENTION_SECONDS), so CI runs without a persisted
+database still respect the caps.
+
+Rules can be overridden with RATE_LIMITS, e.g. "1h=3600:4,24h=86400:20,7d=604800:100,burst=900:1".
+"""
+from __future__ import annotations
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+LIMITS_DB = os.getenv("RATE_LIMITS_DB") or os.path.join(ROOT, "rate_limits.db")
+DEFAULT_ACCOUNT = "default"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    account TEXT NOT NULL,
+    ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_account_ts ON posts (account, ts);
+CREATE TABLE IF NOT EXISTS seeded (
+    account TEXT PRIMARY KEY
+);
+"""
+
+Rule = Tuple[str, int, int]  # (name, window_seconds, max_posts)
+
+
+def default_rules(max_per_24h: int = 20) -> List[Rule]:
+    spec = os.getenv("RATE_LIMITS")
+    if spec:
+        rules = []
+        for part in spec.split(","):
+            name, _, rest = part.strip().partition("=")
+            window, _, limit = rest.partition(":")
+            rules.append((name, int(window), int(limit)))
+        return rules
+    return [
+        ("burst", 15 * 60, 1),
+        ("1h", 3600, 4),
+        ("24h", 24 * 3600, max_per_24h),
+        ("7d", 7 * 24 * 3600, max_per_24h * 5),
+    ]
+
+
+class RateLimiter:
+    def __init__(self, rules: Optional[List[Rule]] = None, path: str = LIMITS_DB):
+        self.rules = rules or default_rules()
+        self.longest = max(window for _, window, _ in self.rules)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _recent(self, account: str, now: int) -> List[int]:
+        """This account's post timestamps within the longest window, oldest first."""
+        rows = self.conn.execute(
+            "SELECT ts FROM posts WHERE account = ? AND ts > ? ORDER BY ts", (account, now - self.longest)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def _evaluate(self, stamps: List[int], now: int) -> Dict[str, Any]:
+        blocked = []
+        for name, window, limit in self.rules:
+            inside = [ts for ts in stamps if ts > now - window]
+            if len(inside) + 1 > limit:
+                if limit <= 0:
+                    retry_after = window
+                else:
+                    # one more fits once the posts over the limit have left the window
+                    retry_after = max(1, inside[len(inside) - limit] + window - now)
+                blocked.append((retry_after, name, window))
+        if not blocked:
+            return {"ok": True, "rule": None, "retry_after": 0}
+        retry_after, name, window = max(blocked)
+        return {"ok": False, "rule": name, "window": window, "retry_after": retry_after}
+
+    def _prune(self, now: int):
+        self.conn.execute("DELETE FROM posts WHERE ts <= ?", (now - self.longest,))
+
+    def seed(self, account: str, timestamps: Iterable[int]):
+        """Initialise an account's post timestamps from past posts (only the first time)."""
+        now = int(time.time())
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            if not self.conn.execute("SELECT 1 FROM seeded WHERE account = ?", (account,)).fetchone():
+                known = set(self._recent(account, now))
+                self.conn.executemany("INSERT INTO posts (account, ts) VALUES (?, ?)",
+                                      [(account, int(ts)) for ts in timestamps
+                                       if int(ts) > now - self.longest and int(ts) not in known])
+                self.conn.execute("INSERT INTO seeded (account) VALUES (?)", (account,))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def check(self, account: str = DEFAULT_ACCOUNT) -> Dict[str, Any]:
+        """Read-only: would one more post be allowed now? {"ok", "rule", "retry_after"}."""
+        now = int(time.time())
+        return self._evaluate(self._recent(account, now), now)
+
+    def acquire(self, account: str = DEFAULT_ACCOUNT) -> Dict[str, Any]:
+        """Atomically check every rule and, if all allow it, record one post."""
+        now = int(time.time())
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            verdict = self._evaluate(self._recent(account, now), now)
+            if verdict["ok"]:
+                self.conn.execute("INSERT INTO posts (account, ts) VALUES (?, ?)", (account, now))
+                self._prune(now)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return verdict
+
+    def refund(self, account: str = DEFAULT_ACCOUNT):
+        """Undo an acquire() whose post did not go out (drops the account's newest post)."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "DELETE FROM posts WHERE rowid = (SELECT rowid FROM posts WHERE account = ? ORDER BY ts DESC, rowid DESC LIMIT 1)",
+                (account,))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def usage(self, account: str = DEFAULT_ACCOUNT) -> Dict[str, int]:
+        """Posts per rule window right now (for logs and the GUI)."""
+        now = int(time.time())
+        stamps = self._recent(account, now)
+        return {name: sum(1 for ts in stamps if ts > now - window) for name, window, _ in self.rules}
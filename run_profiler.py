@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+`python post_tweets.py --profile`: where a run's time and memory went.
+
+Writes into profiles/<timestamp>/:
+- run.pstats: cProfile of the event-loop thread (`python -m pstats run.pstats`, snakeviz...).
+  Time spent awaiting the browser shows up under the loop's select()/_poll(), not under the
+  coroutine that awaits.
+- run.collapsed: sampled stacks in collapsed format ("a;b;c count") for flamegraph.pl,
+  speedscope or inferno. Root frames:
+    [cpu]     the loop thread running Python (selection, shuffling, JSON, Playwright's client)
+    [await]   the loop idle; one sample for every pending task's coroutine chain, ending in
+              what it awaits (e.g. post_tweet;try_set_text;wait_for_selector)
+    [thread]  worker threads (asyncio.to_thread: history, CandidateSet, plan, media)
+- summary.txt: the split between the three, the hottest frames and the top of pstats.
+
+In continuous mode tracemalloc is on, and after every post the largest allocation changes since
+the previous post are logged. Nothing here is imported or started without --profile.
+"""
+from __future__ import annotations
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from typing import Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.path.join(ROOT, "profiles")
+TRACEMALLOC_FRAMES = 10
+TOP_ALLOCATIONS = 10
+# the top Python frame of a thread that is blocked waiting, not running
+_IDLE_FILES = ("selectors.py", "windows_events.py", "threading.py", "queue.py")
+
+
+def _label(code, lineno: int) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno})"
+
+
+def _frame_stack(frame) -> Tuple[str, ...]:
+    stack = []
+    while frame is not None:
+        stack.append(_label(frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def _idle(frame) -> bool:
+    code = frame.f_code
+    name = os.path.basename(code.co_filename)
+    # concurrent.futures workers block in SimpleQueue.get(), which is C code
+    return name in _IDLE_FILES or (name == "thread.py" and code.co_name == "_worker")
+
+
+def _await_chain(task) -> Tuple[str, ...]:
+    """Coroutine chain of a suspended task, outermost first, ending in what it awaits."""
+    chain = []
+    coro = task.get_coro()
+    while coro is not None:
+        code = getattr(coro, "cr_code", None) or getattr(coro, "gi_code", None)
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None)
+        if code is None:
+            break  # a Future: the coroutine above is the one waiting
+        chain.append(_label(code, frame.f_lineno if frame is not None else code.co_firstlineno))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None)
+    return tuple(chain)
+
+
+class StackSampler(threading.Thread):
+    def __init__(self, interval: float, loop_thread: int):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.loop_thread = loop_thread
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.counts: Counter = Counter()
+        self.totals: Counter = Counter()
+        self._done = threading.Event()
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def run(self):
+        me = threading.get_ident()
+        while not self._done.wait(self.interval):
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                if tid == self.loop_thread:
+                    if _idle(frame):
+                        self._sample_awaiting()
+                    else:
+                        self.counts[("[cpu]",) + _frame_stack(frame)] += 1
+                        self.totals["[cpu]"] += 1
+                elif not _idle(frame):
+                    self.counts[("[thread]",) + _frame_stack(frame)] += 1
+                    self.totals["[thread]"] += 1
+
+    def _sample_awaiting(self):
+        self.totals["[await]"] += 1
+        if self.loop is None:
+            return
+        try:
+            # the loop thread is blocked in select(), so the task set is not changing under us
+            tasks = list(asyncio.all_tasks(self.loop))
+        except RuntimeError:
+            return
+        for task in tasks:
+            if not task.done():
+                self.counts[("[await]",) + _await_chain(task)] += 1
+
+
+class RunProfiler:
+    def __init__(self, out_dir: str = PROFILE_DIR, interval: float = 0.005, track_memory: bool = False):
+        self.out_dir = os.path.join(out_dir, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        self.interval = interval
+        self.track_memory = track_memory
+        self._snapshot = None
+
+    def run(self, main):
+        """asyncio.run(main()) under cProfile and the stack sampler; writes the outputs at the end."""
+        os.makedirs(self.out_dir, exist_ok=True)
+        sampler = StackSampler(self.interval, threading.get_ident())
+        profile = cProfile.Profile()
+
+        async def wrapped():
+            sampler.loop = asyncio.get_running_loop()
+            return await main()
+
+        if self.track_memory:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._snapshot = tracemalloc.take_snapshot()
+        sampler.start()
+        profile.enable()
+        try:
+            return asyncio.run(wrapped())
+        finally:
+            profile.disable()
+            sampler.stop()
+            if self.track_memory:
+                tracemalloc.stop()
+            self._write(profile, sampler)
+
+    def memory_checkpoint(self, label: str):
+        """Log the biggest allocation changes since the previous checkpoint (continuous mode)."""
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        logging.info("Memory after %s: %.1f MiB traced (peak %.1f MiB); top changes:",
+                     label, current / 1024 / 1024, peak / 1024 / 1024)
+        # skipped at print time: Snapshot.filter_traces() fnmatch-es every trace and is slow
+        shown = 0
+        for stat in snapshot.compare_to(self._snapshot, "lineno"):
+            if stat.traceback[0].filename in (__file__, tracemalloc.__file__):
+                continue  # the sampler's own counters, tracemalloc itself
+            logging.info("  %s", stat)
+            shown += 1
+            if shown == TOP_ALLOCATIONS:
+                break
+        self._snapshot = snapshot
+
+    def _write(self, profile: cProfile.Profile, sampler: StackSampler):
+        profile.dump_stats(os.path.join(self.out_dir, "run.pstats"))
+        with open(os.path.join(self.out_dir, "run.collapsed"), "w", encoding="utf-8") as f:
+            for stack, count in sorted(sampler.counts.items()):
+                f.write(";".join(s.replace(";", ":") for s in stack) + f" {count}\n")
+
+        lines = []
+        total = sum(sampler.totals.values()) or 1
+        lines.append(f"samples every {self.interval * 1000:.0f} ms:")
+        for root in ("[cpu]", "[await]", "[thread]"):
+            lines.append(f"  {root:<9} {sampler.totals[root]:7d}  {100 * sampler.totals[root] / total:5.1f}%")
+        for root, title in (("[cpu]", "hottest Python frames (loop thread)"),
+                            ("[await]", "most awaited (innermost coroutine)"),
+                            ("[thread]", "hottest frames in worker threads")):
+            leaves = Counter()
+            for stack, count in sampler.counts.items():
+                if stack[0] == root and len(stack) > 1:
+                    leaves[stack[-1]] += count
+            if leaves:
+                lines.append(f"\n{title}:")
+                lines.extend(f"  {count:7d}  {leaf}" for leaf, count in leaves.most_common(15))
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(25)
+        lines.append("\ncProfile, by cumulative time:")
+        lines.append(out.getvalue())
+        summary = "\n".join(lines)
+        with open(os.path.join(self.out_dir, "summary.txt"), "w", encoding="utf-8") as f:
+            f.write(summary)
+        logging.info("Profile written to %s\n%s", self.out_dir, "\n".join(lines[:4]))
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental readers for the poster's runtime files, used by the GUI dashboard.
+
+- `LogTailer` follows runner.log from the last byte offset. When RotatingFileHandler rolls the
+  file over (new inode, or the file got shorter) the rest of the old file is read from
+  runner.log.1 before starting the new one, so no line is lost or read twice.
+- `MtimeWatch` says whether a small JSON file (post_history.json, runner_state.json) changed,
+  by (mtime, size), so it is only re-read when it did.
+- `RunnerStats` keeps rolling numbers from the log lines: post latencies, failures, retries.
+
+The poster writes one `Post result:` line per post (see `format_post_result`).
+"""
+from __future__ import annotations
+import os
+import re
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+# first read of a large log: only the tail is interesting
+INITIAL_TAIL_BYTES = 256 * 1024
+LATENCY_SAMPLES = 20
+
+_RESULT_RE = re.compile(r"Post result: (?P<status>ok|failed) tweet=(?P<tweet>\S+) latency=(?P<latency>[\d.]+)s")
+_ATTEMPT_RE = re.compile(r"Attempt \d+/\d+ to post failed: (?P<error>.*)")
+_TS_RE = re.compile(r"^\[(?P<ts>[^\]]+)\] ?(?P<msg>.*)$")
+
+
+def format_post_result(ok: bool, tweet_id: str, latency: float) -> str:
+    return f"Post result: {'ok' if ok else 'failed'} tweet={tweet_id} latency={latency:.1f}s"
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
+
+
+class LogTailer:
+    def __init__(self, path: str):
+        self.path = path
+        self.inode: Optional[int] = None
+        self.offset = 0
+        self._partial = b""
+
+    def _read_from(self, path: str, offset: int) -> Tuple[bytes, int]:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        return data, offset + len(data)
+
+    def read_new(self) -> List[str]:
+        """Complete lines appended since the previous call."""
+        st = _stat(self.path)
+        if st is None:
+            return []
+        chunks = []
+        if self.inode is None:
+            # first call: skip to the tail, dropping the (probably cut) first line
+            self.offset = max(0, st.st_size - INITIAL_TAIL_BYTES)
+            self._partial = b""
+            if self.offset:
+                data, self.offset = self._read_from(self.path, self.offset)
+                chunks.append(data.split(b"\n", 1)[1] if b"\n" in data else b"")
+        elif st.st_ino != self.inode or st.st_size < self.offset:
+            # rotated: finish the old file (now runner.log.1) when we can still identify it
+            old = _stat(self.path + ".1")
+            if old is not None and old.st_ino == self.inode and old.st_size > self.offset:
+                data, _ = self._read_from(self.path + ".1", self.offset)
+                chunks.append(data)
+            self.offset = 0
+        self.inode = st.st_ino
+        if st.st_size > self.offset:
+            data, self.offset = self._read_from(self.path, self.offset)
+            chunks.append(data)
+        if not chunks:
+            return []
+        buf = self._partial + b"".join(chunks)
+        *lines, self._partial = buf.split(b"\n")
+        return [ln.decode("utf-8", "replace").rstrip("\r") for ln in lines if ln.strip()]
+
+
+class MtimeWatch:
+    def __init__(self, path: str):
+        self.path = path
+        self._sig = None
+
+    def changed(self) -> bool:
+        st = _stat(self.path)
+        sig = (st.st_mtime_ns, st.st_size) if st else None
+        if sig == self._sig:
+            return False
+        self._sig = sig
+        return True
+
+
+class RunnerStats:
+    def __init__(self):
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+        self.posted = 0
+        self.failed = 0
+        self.retries = 0
+        self.last_error: Optional[str] = None
+        self.last_line: Optional[str] = None
+
+    def feed(self, lines: List[str]):
+        for line in lines:
+            m = _TS_RE.match(line)
+            msg = m.group("msg") if m else line
+            self.last_line = line
+            r = _RESULT_RE.search(msg)
+            if r:
+                self.latencies.append(float(r.group("latency")))
+                if r.group("status") == "ok":
+                    self.posted += 1
+                else:
+                    self.failed += 1
+                    self.last_error = f"{m.group('ts') if m else ''} {msg}".strip()
+                continue
+            a = _ATTEMPT_RE.search(msg)
+            if a:
+                self.retries += 1
+                self.last_error = f"{m.group('ts') if m else ''} {a.group('error')}".strip()
+
+    def latency_summary(self) -> Optional[Tuple[float, float, float]]:
+        """(last, median, max) over the recent samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return self.latencies[-1], ordered[len(ordered) // 2], ordered[-1]
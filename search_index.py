@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Arabic-aware full-text search over tweet text and hashtags.
+
+Normalisation strips tashkeel (harakat, shadda, sukun, superscript alef) and tatweel, unifies
+alef forms (أ إ آ ٱ -> ا), alef maksura (ى -> ي) and taa marbuta (ة -> ه), and lower-cases Latin.
+The inverted index maps token -> set of tweet ids. Queries AND all tokens; the last token also
+matches as a prefix (for search-as-you-type) once it has at least two characters.
+
+The JSON backend persists the index next to tweets.json (`search_index.json`) together with the
+library file's (mtime, size) signature; a mismatch means the index is stale and gets rebuilt.
+A save that changed a few tweets appends their tokens to `search_index.json.log` instead of
+rewriting the whole file: {"log": <token of the base file>, "signature", "put": {id: tokens},
+"del": [ids]}, replayed on load. Lines whose token is not the base file's (left over from
+before a rewrite) are ignored, and the base is rewritten once the log grows past half its size.
+"""
+from __future__ import annotations
+import json
+import os
+import re
+import uuid
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+INDEX_VERSION = 1
+MIN_PREFIX = 2
+# the log is folded into the base file once it is this big (and half the base's size)
+LOG_COMPACT_BYTES = 64 * 1024
+
+# harakat/tanween/shadda/sukun, Quranic marks, superscript alef, tatweel
+_TASHKEEL = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_TRANSLATE = str.maketrans({
+    "\u0623": "\u0627",  # أ -> ا
+    "\u0625": "\u0627",  # إ -> ا
+    "\u0622": "\u0627",  # آ -> ا
+    "\u0671": "\u0627",  # ٱ -> ا
+    "\u0649": "\u064a",  # ى -> ي
+    "\u0629": "\u0647",  # ة -> ه
+})
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def normalize_arabic(text: str) -> str:
+    return _TASHKEEL.sub("", text).translate(_TRANSLATE).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(normalize_arabic(text))
+
+
+def tweet_tokens(text: str, hashtags: Iterable[str]) -> List[str]:
+    toks = set(tokenize(text))
+    for tag in hashtags:
+        toks.update(tokenize(tag))
+    return sorted(toks)
+
+
+def file_signature(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def parse_query(query: str) -> Tuple[List[str], Optional[str]]:
+    """(exact tokens, prefix token or None)."""
+    toks = tokenize(query)
+    if not toks:
+        return [], None
+    last = toks[-1]
+    # a query ending in a space means the last word is complete
+    if len(last) >= MIN_PREFIX and not query[-1:].isspace():
+        return toks[:-1], last
+    return toks, None
+
+
+class SearchIndex:
+    def __init__(self):
+        self.docs: Dict[str, List[str]] = {}
+        self.postings: Dict[str, Set[str]] = {}
+        self.signature: Optional[List[int]] = None
+        # token of the persisted base file these docs are (base + log); None: not persisted as they are
+        self.log_token: Optional[str] = None
+        self._vocab: Optional[List[str]] = None
+
+    # --- maintenance ---
+    def update(self, tid: str, text: str, hashtags: Iterable[str]):
+        self.remove(tid)
+        toks = tweet_tokens(text, hashtags)
+        self.docs[tid] = toks
+        for tok in toks:
+            ids = self.postings.get(tok)
+            if ids is None:
+                self.postings[tok] = ids = set()
+                self._vocab = None
+            ids.add(tid)
+
+    def remove(self, tid: str):
+        for tok in self.docs.pop(tid, ()):
+            ids = self.postings.get(tok)
+            if ids is not None:
+                ids.discard(tid)
+                if not ids:
+                    del self.postings[tok]
+                    self._vocab = None
+
+    @classmethod
+    def build(cls, tweets) -> "SearchIndex":
+        idx = cls()
+        for t in tweets:
+            idx.update(t.id, t.text, t.hashtags)
+        return idx
+
+    # --- query ---
+    def _prefix_postings(self, prefix: str) -> List[Set[str]]:
+        if self._vocab is None:
+            self._vocab = sorted(self.postings)
+        out = []
+        i = bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix):
+            out.append(self.postings[self._vocab[i]])
+            i += 1
+        return out
+
+    def search(self, query: str) -> Set[str]:
+        exact, prefix = parse_query(query)
+        sets = []
+        for tok in exact:
+            ids = self.postings.get(tok)
+            if not ids:
+                return set()
+            sets.append(ids)
+        if prefix is not None:
+            parts = self._prefix_postings(prefix)
+            if not parts:
+                return set()
+            if len(parts) == 1:
+                sets.append(parts[0])
+            elif not sets or sum(map(len, parts)) < min(map(len, sets)):
+                sets.append(set().union(*parts))
+            else:
+                # many completions: filter the exact-word candidates instead of expanding them
+                result = self._intersect(sets)
+                return {tid for tid in result if any(tok.startswith(prefix) for tok in self.docs[tid])}
+        if not sets:
+            return set()
+        return self._intersect(sets)
+
+    @staticmethod
+    def _intersect(sets: List[Set[str]]) -> Set[str]:
+        # smallest posting list first keeps every step bounded by the rarest word
+        sets = sorted(sets, key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            result &= s
+            if not result:
+                break
+        return result
+
+    # --- persistence ---
+    @classmethod
+    def load(cls, path: str) -> Optional["SearchIndex"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        if data.get("version") != INDEX_VERSION:
+            return None
+        idx = cls()
+        idx.signature = data.get("signature")
+        idx.log_token = data.get("log")
+        docs = data.get("docs", {})
+        for entry in _read_log(path, idx.log_token):
+            for tid in entry.get("del", ()):
+                docs.pop(tid, None)
+            docs.update(entry.get("put", {}))
+            idx.signature = entry.get("signature")
+        for tid, toks in docs.items():
+            idx.docs[tid] = toks
+            for tok in toks:
+                idx.postings.setdefault(tok, set()).add(tid)
+        return idx
+
+    def save(self, path: str):
+        self.log_token = write_index(path, self.docs, self.signature)
+
+
+def log_path(path: str) -> str:
+    return path + ".log"
+
+
+def _read_log(path: str, token: Optional[str]) -> List[Dict]:
+    if token is None:
+        return []
+    try:
+        with open(log_path(path), "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in raw.splitlines():
+        try:
+            e = json.loads(line)
+        except ValueError:
+            continue  # cut short by a crash
+        if isinstance(e, dict) and e.get("log") == token:
+            entries.append(e)
+    return entries
+
+
+def write_index(path: str, docs: Dict[str, List[str]], signature: Optional[List[int]]) -> str:
+    """Persist a docs mapping (may be a snapshot taken on another thread) as a new base file with
+    an empty log; returns the base's token for append_index()."""
+    token = uuid.uuid4().hex
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "signature": signature, "log": token, "docs": docs},
+                  f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    # lines of the previous base would be ignored anyway; drop them so the log starts small
+    try:
+        os.remove(log_path(path))
+    except FileNotFoundError:
+        pass
+    return token
+
+
+def append_index(path: str, token: str, put: Dict[str, List[str]], dels: Iterable[str],
+                 signature: Optional[List[int]]):
+    """Persist the tokens of the tweets changed since the base `token` was written (or last appended)."""
+    line = json.dumps({"log": token, "signature": signature, "put": put, "del": list(dels)},
+                      ensure_ascii=False, separators=(",", ":"))
+    with open(log_path(path), "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def log_needs_compaction(path: str) -> bool:
+    try:
+        size = os.path.getsize(log_path(path))
+    except OSError:
+        return False
+    try:
+        base = os.path.getsize(path)
+    except OSError:
+        return True
+    return size > max(LOG_COMPACT_BYTES, base // 2)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Fast session health check for storage_state.json (no browser launch).
+
+Usage:
+  python session_check.py                      # فحص storage_state.json
+  python session_check.py path/to/state.json
+  python session_check.py --probe http://127.0.0.1:8765/compose/tweet
+
+The check parses the Playwright storage state, verifies that the auth cookies
+(auth_token, ct0) exist for x.com/twitter.com and are not expired. The parsed
+result is cached by file hash in `session_check_cache.json`, so repeated runs on
+the same session cost only a hash of the file.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Any, Dict, Optional
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STORAGE = "storage_state.json"
+CACHE_FILE = os.path.join(ROOT, "session_check_cache.json")
+MAX_CACHE_ENTRIES = 32
+
+AUTH_COOKIES = ("auth_token", "ct0")
+AUTH_DOMAINS = ("x.com", "twitter.com")
+# لا نعتبر الجلسة صالحة إذا كانت ستنتهي خلال هذه المدة (ثواني)
+MIN_TTL_SECONDS = 10 * 60
+
+LOGIN_HINT = "شغّل login_helper.py وأعد حفظ storage_state.json (وحدّث السر STORAGE_STATE_B64 في CI)."
+
+
+def _domain_matches(domain: str) -> bool:
+    d = (domain or "").lstrip(".").lower()
+    return any(d == base or d.endswith("." + base) for base in AUTH_DOMAINS)
+
+
+def parse_storage_state(raw: bytes) -> Dict[str, Any]:
+    """Extract what matters for the verdict: missing auth cookies and the earliest expiry."""
+    try:
+        data = json.loads(raw.decode("utf-8"))
+    except Exception as e:
+        return {"error": f"ملف الجلسة ليس JSON صالحاً: {e}"}
+    cookies = data.get("cookies") if isinstance(data, dict) else None
+    if not isinstance(cookies, list):
+        return {"error": "ملف الجلسة لا يحتوي على قائمة cookies."}
+
+    expiries: Dict[str, float] = {}
+    for c in cookies:
+        if not isinstance(c, dict):
+            continue
+        name = c.get("name")
+        if name not in AUTH_COOKIES or not _domain_matches(c.get("domain", "")):
+            continue
+        if not c.get("value"):
+            continue
+        exp = c.get("expires", -1)
+        try:
+            exp = float(exp)
+        except Exception:
+            exp = -1
+        # -1 = session cookie: valid as long as the stored state is used
+        exp = float("inf") if exp <= 0 else exp
+        expiries[name] = max(expiries.get(name, 0), exp)
+
+    missing = [n for n in AUTH_COOKIES if n not in expiries]
+    expires_at = min(expiries.values()) if expiries else 0
+    return {
+        "missing": missing,
+        "expires_at": None if expires_at == float("inf") else int(expires_at),
+    }
+
+
+def _load_cache() -> Dict[str, Any]:
+    if not os.path.exists(CACHE_FILE):
+        return {}
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_cache(cache: Dict[str, Any]):
+    if len(cache) > MAX_CACHE_ENTRIES:
+        newest = sorted(cache.items(), key=lambda kv: kv[1].get("cached_at", 0))[-MAX_CACHE_ENTRIES:]
+        cache = dict(newest)
+    tmp = CACHE_FILE + ".tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, CACHE_FILE)
+    except Exception:
+        pass
+
+
+def _verdict(parsed: Dict[str, Any], now: float, min_ttl: int) -> Dict[str, Any]:
+    if parsed.get("error"):
+        return {"ok": False, "reason": "invalid", "message": f"{parsed['error']} {LOGIN_HINT}"}
+    missing = parsed.get("missing") or []
+    if missing:
+        return {
+            "ok": False,
+            "reason": "missing_cookies",
+            "message": f"الجلسة لا تحتوي على cookies الدخول ({', '.join(missing)}) — غير مسجّل الدخول. {LOGIN_HINT}",
+        }
+    expires_at = parsed.get("expires_at")
+    if expires_at is not None and expires_at - now < min_ttl:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(expires_at))
+        return {
+            "ok": False,
+            "reason": "expired",
+            "expires_at": expires_at,
+            "message": f"انتهت صلاحية الجلسة (أو ستنتهي قريباً) في {when}. {LOGIN_HINT}",
+        }
+    return {"ok": True, "reason": "ok", "expires_at": expires_at, "message": "الجلسة تبدو صالحة."}
+
+
+def check_session(path: str = STORAGE, raw: Optional[bytes] = None, min_ttl: int = MIN_TTL_SECONDS,
+                  use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Return a verdict dict: {"ok": bool, "reason": str, "message": str, "expires_at": int|None}.
+    Pass `raw` to check bytes directly (e.g. decoded STORAGE_STATE_B64) without reading `path`.
+    """
+    if raw is None:
+        if not os.path.exists(path):
+            return {"ok": False, "reason": "not_found", "message": f"{path} غير موجود. {LOGIN_HINT}"}
+        with open(path, "rb") as f:
+            raw = f.read()
+
+    digest = hashlib.sha256(raw).hexdigest()
+    cache = _load_cache() if use_cache else {}
+    parsed = cache.get(digest)
+    if parsed is None:
+        parsed = parse_storage_state(raw)
+        if use_cache:
+            cache[digest] = dict(parsed, cached_at=int(time.time()))
+            _save_cache(cache)
+
+    verdict = _verdict(parsed, time.time(), min_ttl)
+    verdict["hash"] = digest
+    return verdict
+
+
+def _cookie_header(raw: bytes, host: str) -> str:
+    """Cookies for `host`; any other host (a local stand-in) gets the x.com/twitter.com auth cookies."""
+    try:
+        cookies = json.loads(raw.decode("utf-8")).get("cookies", [])
+    except Exception:
+        return ""
+    on_x = _domain_matches(host)
+    pairs = []
+    for c in cookies:
+        d = (c.get("domain") or "").lstrip(".").lower()
+        if on_x:
+            wanted = host == d or host.endswith("." + d)
+        else:
+            wanted = c.get("name") in AUTH_COOKIES and _domain_matches(d)
+        if wanted:
+            pairs.append(f"{c.get('name')}={c.get('value')}")
+    return "; ".join(pairs)
+
+
+def probe_session(url: str, path: str = STORAGE, raw: Optional[bytes] = None, timeout: float = 5.0) -> Dict[str, Any]:
+    """
+    Lightweight authenticated probe: a single GET with the stored cookies (no browser).
+    Intended for a local stand-in server (benchmarks/compose_server.py serves /compose/tweet),
+    which receives the auth_token/ct0 cookies; a redirect to a login/challenge URL or a 401/403
+    means the session is dead.
+    """
+    if raw is None:
+        with open(path, "rb") as f:
+            raw = f.read()
+    host = urllib.parse.urlparse(url).hostname or ""
+    req = urllib.request.Request(url, headers={"Cookie": _cookie_header(raw, host.lower())})
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            final_url = resp.geturl()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        final_url, status = e.geturl() or url, e.code
+    except Exception as e:
+        return {"ok": False, "reason": "probe_error", "message": f"تعذر الاتصال بعنوان الفحص: {e}"}
+
+    if status in (401, 403) or any(p in final_url for p in ("login", "challenge", "verify_password")):
+        return {"ok": False, "reason": "probe_rejected", "message": f"رفض الخادم الجلسة ({status}). {LOGIN_HINT}"}
+    if status >= 400:
+        return {"ok": False, "reason": "probe_error", "message": f"استجابة غير متوقعة من عنوان الفحص: {status}"}
+    return {"ok": True, "reason": "ok", "message": "نجح الفحص المصادق."}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="فحص سريع لصلاحية storage_state.json بدون متصفح")
+    parser.add_argument("path", nargs="?", default=STORAGE, help="مسار ملف الجلسة")
+    parser.add_argument("--probe", help="عنوان لفحص مصادق خفيف (مثلاً خادم محلي بديل)")
+    parser.add_argument("--no-cache", action="store_true", help="تجاهل الذاكرة المؤقتة")
+    args = parser.parse_args()
+
+    verdict = check_session(args.path, use_cache=not args.no_cache)
+    print(verdict["message"])
+    if verdict["ok"] and args.probe:
+        verdict = probe_session(args.probe, args.path)
+        print(verdict["message"])
+    sys.exit(0 if verdict["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
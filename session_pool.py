@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+Named session pool for multiple accounts.
+
+Sessions captured by `login_helper.py --name <account>` are stored in `sessions/`
+(optionally encrypted with Fernet when `cryptography` is installed and SESSION_POOL_KEY
+is set). `sessions/pool.json` tracks health, last use and leases so several poster
+workers on one host can each take a different account without clobbering files.
+"""
+from __future__ import annotations
+import json
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+from session_check import check_session
+
+try:
+    from cryptography.fernet import Fernet
+except Exception:  # optional dependency
+    Fernet = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+POOL_DIR = os.path.join(ROOT, "sessions")
+INDEX_NAME = "pool.json"
+LOCK_NAME = ".pool.lock"
+KEY_ENV = "SESSION_POOL_KEY"
+
+DEFAULT_LEASE_SECONDS = 30 * 60
+LOCK_STALE_SECONDS = 30
+# بعد هذا العدد من الإخفاقات المتتالية تُعلَّم الجلسة "failed" ولا تُسلَّم للعمال
+MAX_FAILURES = 3
+
+
+def default_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def generate_key() -> str:
+    if Fernet is None:
+        raise RuntimeError("التشفير يتطلب الحزمة cryptography: pip install cryptography")
+    return Fernet.generate_key().decode("ascii")
+
+
+def _fernet():
+    if Fernet is None:
+        raise RuntimeError("التشفير يتطلب الحزمة cryptography: pip install cryptography")
+    key = os.getenv(KEY_ENV)
+    if not key:
+        raise RuntimeError(f"عيّن المتغير {KEY_ENV} لمفتاح التشفير (python login_helper.py --gen-key).")
+    return Fernet(key.encode("ascii"))
+
+
+class PoolLock:
+    """Cross-platform exclusive lock using an O_EXCL lock file (stale locks are broken)."""
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+
+    def __enter__(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(fd, default_owner().encode("utf-8"))
+                os.close(fd)
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > LOCK_STALE_SECONDS:
+                        os.unlink(self.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"تعذر الحصول على قفل مجمع الجلسات: {self.path}")
+                time.sleep(0.05)
+
+    def __exit__(self, *exc):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class Lease:
+    def __init__(self, pool: "SessionPool", name: str, owner: str, expires_at: int):
+        self.pool = pool
+        self.name = name
+        self.owner = owner
+        self.expires_at = expires_at
+
+    def renew(self, seconds: int = DEFAULT_LEASE_SECONDS) -> bool:
+        return self.pool.renew(self, seconds)
+
+    def release(self, ok: Optional[bool] = None):
+        self.pool.release(self, ok)
+
+
+class SessionPool:
+    def __init__(self, root: str = POOL_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, INDEX_NAME)
+        self.lock_path = os.path.join(root, LOCK_NAME)
+
+    # --- index helpers (caller holds the lock) ---
+    def _lock(self) -> PoolLock:
+        os.makedirs(self.root, exist_ok=True)
+        return PoolLock(self.lock_path)
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _save_index(self, index: Dict[str, Dict[str, Any]]):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.replace(tmp, self.index_path)
+
+    # --- capture / inspect ---
+    def add(self, name: str, state: bytes, encrypt: bool = False) -> Dict[str, Any]:
+        """Store (or replace) a named session captured by login_helper."""
+        data = _fernet().encrypt(state) if encrypt else state
+        fname = f"{name}.json.enc" if encrypt else f"{name}.json"
+        with self._lock():
+            index = self._load_index()
+            old = index.get(name)
+            tmp = os.path.join(self.root, fname + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(self.root, fname))
+            if old and old.get("file") != fname:
+                try:
+                    os.unlink(os.path.join(self.root, old["file"]))
+                except FileNotFoundError:
+                    pass
+            verdict = check_session(raw=state, use_cache=False)
+            entry = {
+                "file": fname,
+                "encrypted": encrypt,
+                "captured_at": int(time.time()),
+                "last_used": (old or {}).get("last_used", 0),
+                "health": "ok" if verdict["ok"] else verdict["reason"],
+                "expires_at": verdict.get("expires_at"),
+                "failures": 0,
+                "lease": None,
+            }
+            index[name] = entry
+            self._save_index(index)
+        return entry
+
+    def remove(self, name: str) -> bool:
+        with self._lock():
+            index = self._load_index()
+            entry = index.pop(name, None)
+            if entry is None:
+                return False
+            try:
+                os.unlink(os.path.join(self.root, entry["file"]))
+            except FileNotFoundError:
+                pass
+            self._save_index(index)
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        index = self._load_index()
+        return [dict(v, name=k) for k, v in sorted(index.items())]
+
+    def read_state(self, name: str) -> bytes:
+        entry = self._load_index().get(name)
+        if entry is None:
+            raise KeyError(name)
+        with open(os.path.join(self.root, entry["file"]), "rb") as f:
+            data = f.read()
+        return _fernet().decrypt(data) if entry.get("encrypted") else data
+
+    # --- leasing ---
+    def lease(self, owner: Optional[str] = None, name: Optional[str] = None,
+              seconds: int = DEFAULT_LEASE_SECONDS) -> Optional[Lease]:
+        """
+        Lease a healthy, unleased session (least recently used first), or the named one.
+        Returns None when nothing is available.
+        """
+        owner = owner or default_owner()
+        now = int(time.time())
+        with self._lock():
+            index = self._load_index()
+            names = [name] if name else sorted(index, key=lambda k: index[k].get("last_used", 0))
+            for n in names:
+                entry = index.get(n)
+                if entry is None:
+                    continue
+                lease = entry.get("lease")
+                if lease and lease.get("expires_at", 0) > now and lease.get("owner") != owner:
+                    continue
+                if entry.get("health") not in ("ok", "unknown"):
+                    continue
+                # re-check cookie expiry cheaply before handing the session out
+                if entry.get("expires_at") and entry["expires_at"] <= now:
+                    entry["health"] = "expired"
+                    continue
+                expires_at = now + seconds
+                entry["lease"] = {"owner": owner, "expires_at": expires_at}
+                entry["last_used"] = now
+                self._save_index(index)
+                return Lease(self, n, owner, expires_at)
+            self._save_index(index)
+        return None
+
+    def renew(self, lease: Lease, seconds: int = DEFAULT_LEASE_SECONDS) -> bool:
+        with self._lock():
+            index = self._load_index()
+            entry = index.get(lease.name)
+            held = (entry or {}).get("lease") or {}
+            if held.get("owner") != lease.owner:
+                return False
+            lease.expires_at = int(time.time()) + seconds
+            held["expires_at"] = lease.expires_at
+            self._save_index(index)
+        return True
+
+    def release(self, lease: Lease, ok: Optional[bool] = None):
+        """Release a lease; ok=True/False records the outcome in the session's health."""
+        with self._lock():
+            index = self._load_index()
+            entry = index.get(lease.name)
+            if entry is None:
+                return
+            held = entry.get("lease") or {}
+            if held.get("owner") == lease.owner:
+                entry["lease"] = None
+            if ok is True:
+                entry["failures"] = 0
+                entry["health"] = "ok"
+            elif ok is False:
+                entry["failures"] = entry.get("failures", 0) + 1
+                if entry["failures"] >= MAX_FAILURES:
+                    entry["health"] = "failed"
+            self._save_index(index)
+
+    def mark_health(self, name: str, health: str) -> bool:
+        """Set a session's health; False when the pool has no session by that name."""
+        with self._lock():
+            index = self._load_index()
+            if name not in index:
+                return False
+            index[name]["health"] = health
+            if health == "ok":
+                index[name]["failures"] = 0
+            self._save_index(index)
+        return True
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+Optional SQLite backend for the tweet library (TWEETS_BACKEND=sqlite).
+
+Same interface as `tweet_store.TweetStore` (get/all/enabled/by_hashtag/next_id/add/update/
+delete/save), so manage_tweets.py, the GUI and the poster work unchanged. Mutations are
+applied inside one transaction that `save()` commits: an edit touches one row instead of
+rewriting the whole file, and concurrent writers are serialised by SQLite (WAL mode).
+Search tokens (see search_index.py) live in `tweet_tokens` and are written in the same
+transaction as the tweet, so the index can never be stale.
+"""
+from __future__ import annotations
+import json
+import os
+import sqlite3
+from typing import Iterator, List, Optional
+
+from search_index import INDEX_VERSION, parse_query, tweet_tokens
+from tweet_length import worst_case_length
+from tweet_models import Tweet
+from tweet_store import _id_number, _tag_key
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TWEETS_DB = os.getenv("TWEETS_DB") or os.path.join(ROOT, "tweets.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tweets (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    text TEXT NOT NULL,
+    hashtags TEXT NOT NULL,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    extra TEXT,
+    weighted_length INTEGER,
+    media TEXT,
+    thread INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS tweets_enabled ON tweets(enabled);
+CREATE TABLE IF NOT EXISTS tweet_hashtags (
+    tag TEXT NOT NULL,
+    tweet_id TEXT NOT NULL REFERENCES tweets(id) ON DELETE CASCADE,
+    PRIMARY KEY (tag, tweet_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tweet_hashtags_tweet ON tweet_hashtags(tweet_id);
+CREATE TABLE IF NOT EXISTS tweet_tokens (
+    token TEXT NOT NULL,
+    tweet_id TEXT NOT NULL REFERENCES tweets(id) ON DELETE CASCADE,
+    PRIMARY KEY (token, tweet_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tweet_tokens_tweet ON tweet_tokens(tweet_id);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+COLUMNS = "id, text, hashtags, enabled, extra, weighted_length, media, thread"
+
+
+def _row_to_tweet(row) -> Tweet:
+    return Tweet(
+        id=row[0],
+        text=row[1],
+        hashtags=json.loads(row[2]),
+        enabled=bool(row[3]),
+        extra=json.loads(row[4]) if row[4] else None,
+        weighted_length=row[5],
+        media=json.loads(row[6]) if row[6] else [],
+        thread=bool(row[7]),
+    )
+
+
+class SqliteTweetStore:
+    def __init__(self, path: str = TWEETS_DB):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.dirty = False
+        self._ensure_tokens()
+
+    @classmethod
+    def load(cls, path: str = TWEETS_DB) -> "SqliteTweetStore":
+        return cls(path)
+
+    def close(self):
+        self.conn.close()
+
+    # --- queries ---
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM tweets").fetchone()[0]
+
+    def __iter__(self) -> Iterator[Tweet]:
+        return (_row_to_tweet(r) for r in self.conn.execute(f"SELECT {COLUMNS} FROM tweets ORDER BY seq"))
+
+    def __contains__(self, tid: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM tweets WHERE id = ?", (tid,)).fetchone() is not None
+
+    def all(self) -> List[Tweet]:
+        return list(self)
+
+    def enabled(self) -> List[Tweet]:
+        rows = self.conn.execute(f"SELECT {COLUMNS} FROM tweets WHERE enabled = 1 ORDER BY seq")
+        return [_row_to_tweet(r) for r in rows]
+
+    def get(self, tid: str) -> Optional[Tweet]:
+        row = self.conn.execute(f"SELECT {COLUMNS} FROM tweets WHERE id = ?", (tid,)).fetchone()
+        return _row_to_tweet(row) if row else None
+
+    def by_hashtag(self, tag: str) -> List[Tweet]:
+        rows = self.conn.execute(
+            "SELECT t.id, t.text, t.hashtags, t.enabled, t.extra, t.weighted_length, t.media, t.thread FROM tweet_hashtags h"
+            " JOIN tweets t ON t.id = h.tweet_id WHERE h.tag = ? ORDER BY t.seq",
+            (_tag_key(tag),),
+        )
+        return [_row_to_tweet(r) for r in rows]
+
+    def hashtags(self) -> List[str]:
+        return [r[0] for r in self.conn.execute("SELECT DISTINCT tag FROM tweet_hashtags ORDER BY tag")]
+
+    def search(self, query: str) -> List[Tweet]:
+        """Tweets matching every word of `query` (Arabic-normalised), in library order."""
+        exact, prefix = parse_query(query)
+        if not exact and prefix is None:
+            return []
+        conds, args = [], []
+        for tok in exact:
+            conds.append("t.id IN (SELECT tweet_id FROM tweet_tokens WHERE token = ?)")
+            args.append(tok)
+        if prefix is not None:
+            conds.append("t.id IN (SELECT tweet_id FROM tweet_tokens WHERE token >= ? AND token < ?)")
+            args += [prefix, prefix + "\U0010ffff"]
+        rows = self.conn.execute(
+            f"SELECT {COLUMNS} FROM tweets t WHERE {' AND '.join(conds)} ORDER BY t.seq", args)
+        return [_row_to_tweet(r) for r in rows]
+
+    def _max_n(self) -> int:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'max_n'").fetchone()
+        return row[0] if row else 0
+
+    def next_id(self) -> str:
+        return f"t{self._max_n() + 1}"
+
+    # --- mutations (committed by save()) ---
+    def _set_tags(self, tid: str, hashtags: List[str]):
+        self.conn.execute("DELETE FROM tweet_hashtags WHERE tweet_id = ?", (tid,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO tweet_hashtags (tag, tweet_id) VALUES (?, ?)",
+            [(_tag_key(h), tid) for h in hashtags],
+        )
+
+    def _set_tokens(self, t: Tweet):
+        self.conn.execute("DELETE FROM tweet_tokens WHERE tweet_id = ?", (t.id,))
+        self.conn.executemany(
+            "INSERT INTO tweet_tokens (token, tweet_id) VALUES (?, ?)",
+            [(tok, t.id) for tok in tweet_tokens(t.text, t.hashtags)],
+        )
+
+    def _migrate(self):
+        cols = {r[1] for r in self.conn.execute("PRAGMA table_info(tweets)")}
+        if "weighted_length" not in cols:
+            self.conn.execute("ALTER TABLE tweets ADD COLUMN weighted_length INTEGER")
+        if "media" not in cols:
+            self.conn.execute("ALTER TABLE tweets ADD COLUMN media TEXT")
+        if "thread" not in cols:
+            self.conn.execute("ALTER TABLE tweets ADD COLUMN thread INTEGER NOT NULL DEFAULT 0")
+        self.conn.commit()
+
+    def _ensure_tokens(self):
+        """Backfill tweet_tokens for databases created before search existed."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'search_version'").fetchone()
+        if row and row[0] == INDEX_VERSION:
+            return
+        self.conn.execute("DELETE FROM tweet_tokens")
+        for t in list(self):
+            self._set_tokens(t)
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('search_version', ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (INDEX_VERSION,),
+        )
+        self.conn.commit()
+
+    def _begin_write(self):
+        """Hold the write lock until save(): reads made after this see no other writer's changes."""
+        if not self.conn.in_transaction:
+            self.conn.execute("BEGIN IMMEDIATE")
+
+    def insert(self, t: Tweet):
+        """Insert an existing Tweet as-is (used by migrations and bulk import)."""
+        if t.weighted_length is None:
+            t.weighted_length = worst_case_length(t.text, t.hashtags, t.thread)
+        self.conn.execute(
+            f"INSERT INTO tweets ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (t.id, t.text, json.dumps(t.hashtags, ensure_ascii=False), int(t.enabled),
+             json.dumps(t.extra, ensure_ascii=False) if t.extra else None, t.weighted_length,
+             json.dumps(t.media, ensure_ascii=False) if t.media else None, int(t.thread)),
+        )
+        self._set_tags(t.id, t.hashtags)
+        self._set_tokens(t)
+        n = _id_number(t.id)
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('max_n', ?)"
+            " ON CONFLICT(key) DO UPDATE SET value = MAX(value, excluded.value)",
+            (n,),
+        )
+        self.dirty = True
+
+    def add(self, text: str, hashtags: Optional[List[str]] = None, enabled: bool = True,
+            media: Optional[List[str]] = None, thread: bool = False) -> Tweet:
+        # take the write lock before reading max_n, so another writer cannot take the same id
+        self._begin_write()
+        t = Tweet(id=self.next_id(), text=text, hashtags=list(hashtags or []), enabled=enabled, media=list(media or []),
+                  thread=thread)
+        self.insert(t)
+        return t
+
+    def update(self, tid: str, text: Optional[str] = None, hashtags: Optional[List[str]] = None,
+               enabled: Optional[bool] = None, media: Optional[List[str]] = None,
+               thread: Optional[bool] = None) -> Optional[Tweet]:
+        # read and rewrite the row under one write lock, or a concurrent update of another field is lost
+        started = not self.conn.in_transaction
+        self._begin_write()
+        t = self.get(tid)
+        if t is None:
+            if started:
+                self.conn.rollback()
+            return None
+        if text is not None:
+            t.text = text
+        if media is not None:
+            t.media = list(media)
+        if thread is not None and thread != t.thread:
+            t.thread = thread
+            t.weighted_length = worst_case_length(t.text, t.hashtags, t.thread)
+        if hashtags is not None:
+            t.hashtags = list(hashtags)
+            self._set_tags(tid, t.hashtags)
+        if enabled is not None:
+            t.enabled = enabled
+        if text is not None or hashtags is not None:
+            t.weighted_length = worst_case_length(t.text, t.hashtags, t.thread)
+        self.conn.execute(
+            "UPDATE tweets SET text = ?, hashtags = ?, enabled = ?, weighted_length = ?, media = ?, thread = ? WHERE id = ?",
+            (t.text, json.dumps(t.hashtags, ensure_ascii=False), int(t.enabled), t.weighted_length,
+             json.dumps(t.media, ensure_ascii=False) if t.media else None, int(t.thread), tid),
+        )
+        if text is not None or hashtags is not None:
+            self._set_tokens(t)
+        self.dirty = True
+        return t
+
+    def delete(self, tid: str) -> Optional[Tweet]:
+        t = self.get(tid)
+        if t is None:
+            return None
+        self.conn.execute("DELETE FROM tweets WHERE id = ?", (tid,))
+        self.dirty = True
+        return t
+
+    def refresh_lengths(self) -> int:
+        """Recompute every cached weighted length; returns how many changed."""
+        changed = []
+        for t in self:
+            n = worst_case_length(t.text, t.hashtags, t.thread)
+            if n != t.weighted_length:
+                changed.append((n, t.id))
+        self.conn.executemany("UPDATE tweets SET weighted_length = ? WHERE id = ?", changed)
+        if changed:
+            self.dirty = True
+        return len(changed)
+
+    def save(self) -> Optional[str]:
+        """Commit pending changes (one transaction). No file backup: the database is the history."""
+        rows = self.conn.execute("SELECT id, text, hashtags, thread FROM tweets WHERE weighted_length IS NULL").fetchall()
+        self.conn.executemany(
+            "UPDATE tweets SET weighted_length = ? WHERE id = ?",
+            [(worst_case_length(text, json.loads(tags), bool(thread)), tid) for tid, text, tags, thread in rows],
+        )
+        self.conn.commit()
+        self.dirty = False
+        return None
+
+    def rollback(self):
+        self.conn.rollback()
+        self.dirty = False
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import io
+
+import bulk_io
+from tweet_models import Tweet
+
+TWEETS = [
+    Tweet(id="t1", text="سطر أول\n\nفقرة ثانية", hashtags=["#a", "#b"], enabled=False,
+          media=["media/one.jpg", "media/two.png"], thread=True),
+    Tweet(id="t2", text="plain", hashtags=[], enabled=True),
+]
+
+
+def _round_trip(fmt):
+    buf = io.StringIO()
+    assert bulk_io.WRITERS[fmt](buf, TWEETS) == 2
+    buf.seek(0)
+    return [rec for _, rec in bulk_io.READERS[fmt](buf)]
+
+
+def test_jsonl_keeps_media_and_thread():
+    first, second = _round_trip("jsonl")
+    assert first == {"text": TWEETS[0].text, "hashtags": ["#a", "#b"], "enabled": False,
+                     "media": ["media/one.jpg", "media/two.png"], "thread": True}
+    assert second["media"] is None and second["thread"] is False
+
+
+def test_csv_keeps_media_and_thread():
+    first, second = _round_trip("csv")
+    assert first["text"] == TWEETS[0].text and first["enabled"] is False
+    assert first["media"] == "media/one.jpg,media/two.png" and first["thread"] is True
+    assert second["media"] == "" and second["thread"] is False
+
+
+def test_csv_without_the_new_columns_still_reads():
+    rows = list(bulk_io.iter_csv(io.StringIO("text,hashtags\nhello,#x\n")))
+    assert rows == [(2, {"text": "hello", "hashtags": "#x", "enabled": True, "media": None, "thread": False})]
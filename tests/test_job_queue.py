@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    q = JobQueue(str(tmp_path / "jobs.db"))
+    yield q
+    q.close()
+
+
+def status(queue, job):
+    return queue.conn.execute("SELECT status FROM jobs WHERE id = ?", (job["id"],)).fetchone()[0]
+
+
+def test_claim_post_complete(queue):
+    queue.enqueue("t1", "hello")
+    job = queue.claim(owner="w1")
+    assert queue.begin_posting(job)
+    queue.complete(job, True)
+    assert status(queue, job) == "done"
+    assert queue.claim(owner="w2") is None
+
+
+def test_enqueue_is_idempotent(queue):
+    first = queue.enqueue("t1", "hello", not_before=3600)
+    again = queue.enqueue("t1", "hello", not_before=3700)
+    assert first["created"] and not again["created"] and first["id"] == again["id"]
+
+
+def test_complete_does_not_touch_a_job_no_longer_held(queue):
+    queue.enqueue("t1", "hello")
+    job = queue.claim(owner="w1", visibility=-1)
+    assert not queue.begin_posting(job)  # lease already expired
+    queue.conn.execute("UPDATE jobs SET status = 'abandoned' WHERE id = ?", (job["id"],))
+    queue.complete(job, True)
+    assert status(queue, job) == "abandoned"
+
+
+def test_has_due_matches_what_claim_would_find(queue):
+    assert not queue.has_due()
+    queue.enqueue("t1", "later", not_before=int(time.time()) + 3600)
+    queue.enqueue("t2", "mine", account="alice")
+    assert not queue.has_due()  # alice's job is not for an unnamed run
+    assert queue.has_due("alice")
+    assert queue.has_due(any_account=True)
+    job = queue.claim(owner="w1", account="alice", visibility=-1)
+    assert queue.has_due("alice")  # its lease expired: the next claim requeues it
+    queue.begin_posting(job)
+    queue.complete(job, True)
+    assert not queue.has_due("alice")
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import pytest
+
+import library_journal
+from library_journal import LibraryConflict
+from tweet_store import TweetStore
+
+
+@pytest.fixture
+def library(tmp_path):
+    path = str(tmp_path / "tweets.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"id": "t1", "text": "one", "hashtags": [], "enabled": True}], f)
+    return path
+
+
+def records(path):
+    with open(path, encoding="utf-8") as f:
+        return [(r["id"], r["text"]) for r in json.load(f)]
+
+
+def test_save_appends_a_journal_entry_with_the_delta(library):
+    store = TweetStore.load(library)
+    store.add("two")
+    store.save()
+    # nothing to apply a delta to before the first entry
+    assert library_journal.read_entries(library)[-1]["full"] is True
+    store.add("three")
+    store.delete("t1")
+    store.save()
+    entries = library_journal.read_entries(library)
+    assert [r["id"] for r in entries[-1]["put"]] == ["t3"] and entries[-1]["del"] == ["t1"]
+    assert library_journal.version_for(entries, library_journal.file_digest(library)) == entries[-1]["v"]
+
+
+def test_disjoint_edits_are_merged(library):
+    a, b = TweetStore.load(library), TweetStore.load(library)
+    a.add("two")
+    a.save()
+    b.update("t1", text="edited")
+    b.save()
+    assert records(library) == [("t1", "edited"), ("t2", "two")]
+
+
+def test_disjoint_edits_are_merged_after_a_full_entry(library):
+    a, b = TweetStore.load(library), TweetStore.load(library)
+    a.add("two")
+    a.save()
+    with library_journal.LibraryLock(library):
+        library_journal.record_rewrite(library)
+    b.update("t1", text="edited")
+    b.save()
+    assert records(library) == [("t1", "edited"), ("t2", "two")]
+
+
+def test_same_tweet_edited_twice_conflicts(library):
+    a, b = TweetStore.load(library), TweetStore.load(library)
+    a.update("t1", text="from a")
+    a.save()
+    b.update("t1", text="from b")
+    with pytest.raises(LibraryConflict) as err:
+        b.save()
+    assert err.value.ids == ["t1"]
+    assert records(library) == [("t1", "from a")]
+    assert b.dirty is False and b.get("t1").text == "from b"
+
+
+def test_deleting_a_tweet_edited_elsewhere_conflicts(library):
+    a, b = TweetStore.load(library), TweetStore.load(library)
+    a.update("t1", text="from a")
+    a.save()
+    b.delete("t1")
+    with pytest.raises(LibraryConflict):
+        b.save()
+
+
+def test_conflict_without_a_journal(library):
+    a, b = TweetStore.load(library), TweetStore.load(library)
+    a.update("t1", text="from a")
+    a.save()
+    # e.g. a journal lost or never written by an older version
+    os.remove(library_journal.journal_path(library))
+    b.update("t1", text="from b")
+    with pytest.raises(LibraryConflict):
+        b.save()
+
+
+def test_new_tweets_with_a_taken_id_are_renumbered(library):
+    cli, gui = TweetStore.load(library), TweetStore.load(library)
+    cli.add("cli")
+    cli.save()
+    t = gui.add("gui")
+    assert t.id == "t2"
+    gui.save()
+    assert records(library) == [("t1", "one"), ("t2", "cli"), ("t3", "gui")]
+    assert gui.get("t3").text == "gui" and gui.get("t2") is None
+    gui.add("gui again")
+    gui.save()
+    assert records(library)[-1] == ("t4", "gui again")
+
+
+def test_tweet_added_during_a_background_write_keeps_its_own_id(library):
+    cli, gui = TweetStore.load(library), TweetStore.load(library)
+    cli.add("cli")
+    cli.add("cli 2")
+    cli.save()
+    gui.add("first")
+    prepared = gui.prepare_save()
+    gui.add("while writing")
+    gui.write_prepared(prepared)
+    assert gui.finish_save() == {"t2": "t4"}
+    gui.save()
+    assert records(library) == [("t1", "one"), ("t2", "cli"), ("t3", "cli 2"), ("t4", "first"),
+                                ("t5", "while writing")]
+
+
+def test_changes_since():
+    entries = [{"v": 1, "put": [], "del": []}, {"v": 2, "put": [], "del": ["t1"]}, {"v": 3, "full": True}]
+    assert library_journal.changes_since(entries[:2], 1) == entries[1:2]
+    assert library_journal.changes_since(entries[:2], 2) == []
+    assert library_journal.changes_since(entries, 1) is None
+    assert library_journal.changes_since(entries[:2], None) is None
+
+
+def test_merge_records_keeps_order():
+    current = [{"id": "t1"}, {"id": "t2"}, {"id": "t3"}]
+    merged = library_journal.merge_records(current, [{"id": "t2", "x": 1}, {"id": "t4"}], ["t1"])
+    assert merged == [{"id": "t2", "x": 1}, {"id": "t3"}, {"id": "t4"}]
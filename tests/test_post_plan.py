@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import os
+
+import pytest
+
+from job_queue import canonical_hash
+from library_watch import CandidateSet
+from post_plan import PostPlan
+from tweet_models import Tweet
+
+
+def candidates(*texts):
+    return CandidateSet(Tweet(id=f"t{i}", text=text) for i, text in enumerate(texts, 1))
+
+
+@pytest.fixture
+def plan_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("POST_PLAN_SEED", "42")
+    return str(tmp_path / "post_plan.json")
+
+
+def test_refill_plans_distinct_texts_first(plan_path):
+    plan = PostPlan(plan_path)
+    assert plan.refill(candidates("a b", "c d", "e f"), set(), size=3) == 3
+    assert sorted(it["tweet_id"] for it in plan.items) == ["t1", "t2", "t3"]
+    assert all(it["fresh"] for it in plan.items)
+
+
+def test_plan_is_reproducible_and_only_grows_at_the_tail(plan_path, tmp_path):
+    pool = candidates("a b", "c d", "e f", "g h")
+    plan = PostPlan(plan_path)
+    plan.refill(pool, set(), size=2)
+    shown = [it["parts"] for it in plan.items]
+    plan.refill(pool, set(), size=5)
+    assert [it["parts"] for it in plan.items[:2]] == shown
+    other = PostPlan(str(tmp_path / "other.json"))
+    other.refill(pool, set(), size=5)
+    assert [it["parts"] for it in other.items] == [it["parts"] for it in plan.items]
+
+
+def test_head_skips_edited_and_already_posted_entries(plan_path):
+    pool = candidates("a b", "c d", "e f")
+    plan = PostPlan(plan_path)
+    plan.refill(pool, set(), size=3)
+    first, second, third = plan.items
+    edited = CandidateSet(Tweet(id=t.id, text=t.text + " x" if t.id == first["tweet_id"] else t.text)
+                          for t in pool)
+    assert plan.head(edited, {second["source_hash"]}) == third
+    # the drop is saved for the next reader
+    assert PostPlan(plan_path).items == [third]
+
+
+def test_done_removes_only_the_head(plan_path):
+    pool = candidates("a b", "c d")
+    plan = PostPlan(plan_path)
+    plan.refill(pool, set(), size=2)
+    first, second = plan.items
+    plan.done(second)
+    assert PostPlan(plan_path).items == [first, second]
+    plan.done(first)
+    assert PostPlan(plan_path).items == [second]
+
+
+def test_recently_posted_texts_are_planned_last(plan_path):
+    pool = candidates("a b", "c d")
+    plan = PostPlan(plan_path)
+    plan.refill(pool, {canonical_hash("a b")}, size=1)
+    assert plan.items[0]["tweet_id"] == "t2"
+
+
+def test_preview_refill_does_not_write(plan_path):
+    plan = PostPlan(plan_path)
+    assert plan.refill(candidates("a b", "c d"), set(), size=2, save=False) == 2
+    assert not os.path.exists(plan_path)
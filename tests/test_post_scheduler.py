@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+import random
+
+from post_scheduler import (
+    MAX_INTERVAL_SECONDS,
+    MIN_INTERVAL_SECONDS,
+    RETRY_AFTER_FAILURE,
+    PostScheduler,
+    TimerWheel,
+    load_due,
+    sync_accounts,
+)
+
+
+def test_keys_fire_at_their_due_second():
+    wheel = TimerWheel(now=1000)
+    wheel.add("a", 1005)
+    wheel.add("b", 1003)
+    assert wheel.advance(1002) == []
+    assert wheel.advance(1003) == ["b"]
+    assert wheel.advance(1010) == ["a"]
+    assert len(wheel) == 0
+
+
+def test_past_due_fires_on_the_next_tick():
+    wheel = TimerWheel(now=1000)
+    wheel.add("late", 10)
+    assert wheel.advance(1001) == ["late"]
+
+
+def test_cancel_and_re_add():
+    wheel = TimerWheel(now=0)
+    wheel.add("a", 100)
+    wheel.cancel("a")
+    wheel.cancel("missing")
+    assert wheel.advance(200) == []
+    wheel.add("b", 300)
+    wheel.add("b", 250)  # re-adding moves the timer
+    assert wheel.advance(260) == ["b"]
+    assert wheel.advance(400) == []
+
+
+def test_far_timers_cascade_through_levels_and_overflow():
+    start = 123_456
+    wheel = TimerWheel(now=start, bits=3, levels=2)  # 64 s of wheel, later times overflow
+    dues = {"s": start + 5, "m": start + 40, "l": start + 500, "xl": start + 5000}
+    for key, due in dues.items():
+        wheel.add(key, due)
+    fired = {}
+    for t in range(start + 1, start + 5001):
+        for key in wheel.advance(t):
+            fired[key] = t
+    assert fired == dues
+
+
+def test_matches_a_sorted_reference():
+    rng = random.Random(7)
+    start = 50_000
+    wheel = TimerWheel(now=start)
+    dues = {f"k{i}": start + rng.randint(1, 20_000) for i in range(300)}
+    for key, due in dues.items():
+        wheel.add(key, due)
+    fired = []
+    now = start
+    while now < start + 20_000:
+        now += rng.randint(1, 700)  # ticks may skip many seconds
+        fired.extend(wheel.advance(now))
+    assert fired == sorted(dues, key=lambda k: (dues[k], k))
+
+
+def _sched(**kw):
+    kw.setdefault("concurrency", 2)
+    kw.setdefault("min_spacing", 0)
+    return PostScheduler(now=1000, rng=random.Random(1), **kw)
+
+
+def test_concurrency_caps_running_accounts():
+    sched = _sched(concurrency=2)
+    for name in "abc":
+        sched.schedule(name, 1001)
+    assert sched.tick(1001) == ["a", "b"]
+    assert sched.tick(1002) == []
+    sched.finished("a", 1003)
+    assert sched.tick(1003) == ["c"]
+    assert set(sched.running) == {"b", "c"}
+
+
+def test_min_spacing_between_starts():
+    sched = _sched(concurrency=5, min_spacing=60)
+    sched.schedule("a", 1001)
+    sched.schedule("b", 1001)
+    assert sched.tick(1001) == ["a"]
+    assert sched.tick(1060) == []
+    assert sched.tick(1061) == ["b"]
+
+
+def test_waiting_accounts_start_in_fifo_order():
+    sched = _sched(concurrency=1)
+    sched.schedule("late", 1003)
+    sched.schedule("early", 1002)
+    sched.schedule("first", 1001)
+    assert sched.tick(1001) == ["first"]
+    assert sched.tick(1010) == []  # early and late both wait, early first
+    sched.finished("first", 1011)
+    assert sched.tick(1011) == ["early"]
+    sched.finished("early", 1012)
+    assert sched.tick(1012) == ["late"]
+
+
+def test_gate_pushes_an_account_back_without_starting_it():
+    calls = []
+
+    def gate(account, now):
+        calls.append(account)
+        # over the limit on the first check only
+        return now + 500 if account == "limited" and calls.count(account) == 1 else None
+
+    sched = _sched(gate=gate)
+    sched.schedule("limited", 1001)
+    sched.schedule("free", 1001)
+    assert sched.tick(1001) == ["free"]
+    assert "limited" not in sched.running
+    assert sched.due["limited"] == 1501
+    assert sched.tick(1500) == []
+    assert calls == ["free", "limited"]  # same-second keys fire sorted
+    assert sched.tick(1501) == ["limited"]
+
+
+def test_removed_and_rescheduled_accounts_do_not_start_early():
+    sched = _sched(concurrency=1)
+    sched.schedule("gone", 1001)
+    sched.schedule("moved", 1001)
+    sched.schedule("blocker", 1001)
+    sched.remove("gone")
+    assert sched.tick(1001) == ["blocker"]  # gone and moved wait behind the cap
+    sched.schedule("moved", 2000)
+    sched.finished("blocker", 1002, next_due=5000)
+    assert sched.tick(1002) == []
+    assert sched.tick(2000) == ["moved"]
+    assert "gone" not in sched.due and "gone" not in sched.running
+
+
+def test_finished_reschedules_by_outcome():
+    sched = _sched()
+    sched.schedule("a", 1001)
+    sched.schedule("b", 1001)
+    sched.tick(1001)
+    sched.finished("a", 1100, ok=True)
+    sched.finished("b", 1100, ok=False)
+    assert 1100 + MIN_INTERVAL_SECONDS <= sched.due["a"] <= 1100 + MAX_INTERVAL_SECONDS
+    assert sched.due["b"] == 1100 + RETRY_AFTER_FAILURE
+
+
+def test_running_accounts_survive_a_restart(tmp_path):
+    path = str(tmp_path / "scheduler_state.json")
+    sched = _sched()
+    sched.schedule("idle", 9000)
+    sched.schedule("busy", 1001)
+    assert sched.tick(1001) == ["busy"]
+    sched.save(path)
+    assert load_due(path) == {"idle": 9000, "busy": 1001 + RETRY_AFTER_FAILURE}
+
+    restarted = _sched()
+    sync_accounts(restarted, ["idle", "busy"], 1200, load_due(path))
+    assert restarted.due == {"idle": 9000, "busy": 1001 + RETRY_AFTER_FAILURE}
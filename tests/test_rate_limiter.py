@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import rate_limiter
+from rate_limiter import RateLimiter
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock(1_700_000_000)
+    monkeypatch.setattr(rate_limiter.time, "time", c)
+    return c
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "rate_limits.db")
+
+
+def test_blocks_at_the_limit_and_says_when_to_retry(clock, db):
+    with RateLimiter([("1h", 3600, 2)], db) as limiter:
+        assert limiter.acquire("a")["ok"]
+        clock.now += 100
+        assert limiter.acquire("a")["ok"]
+        clock.now += 100
+        verdict = limiter.acquire("a")
+        assert not verdict["ok"] and verdict["rule"] == "1h"
+        # the first post leaves the window 3600 s after it was made
+        assert verdict["retry_after"] == 3600 - 200
+        assert limiter.usage("a") == {"1h": 2}
+        clock.now += verdict["retry_after"]
+        assert limiter.acquire("a")["ok"]
+
+
+def test_accounts_are_independent(clock, db):
+    with RateLimiter([("burst", 900, 1)], db) as limiter:
+        assert limiter.acquire("a")["ok"]
+        assert not limiter.check("a")["ok"]
+        assert limiter.acquire("b")["ok"]
+
+
+def test_exact_window_never_exceeds_the_limit(clock, db):
+    # one attempt a minute across a window boundary: an estimate would let ~2x through
+    with RateLimiter([("24h", 24 * 3600, 20)], db) as limiter:
+        posted = []
+        for _ in range(3 * 24 * 60):
+            if limiter.acquire("a")["ok"]:
+                posted.append(clock.now)
+            clock.now += 60
+    for i, ts in enumerate(posted):
+        assert sum(1 for t in posted[i:] if t < ts + 24 * 3600) <= 20
+
+
+def test_refund_drops_the_newest_post(clock, db):
+    with RateLimiter([("1h", 3600, 1)], db) as limiter:
+        assert limiter.acquire("a")["ok"]
+        limiter.refund("a")
+        assert limiter.check("a")["ok"]
+
+
+def test_seed_only_once_and_within_the_longest_window(clock, db):
+    rules = [("24h", 24 * 3600, 3), ("7d", 7 * 24 * 3600, 5)]
+    with RateLimiter(rules, db) as limiter:
+        old = clock.now - 8 * 24 * 3600
+        limiter.seed("a", [old, clock.now - 3 * 24 * 3600, clock.now - 2 * 24 * 3600, clock.now - 60])
+        assert limiter.usage("a") == {"24h": 1, "7d": 3}
+        limiter.seed("a", [clock.now - 30, clock.now - 20])
+        assert limiter.usage("a") == {"24h": 1, "7d": 3}
+
+
+def test_zero_limit_blocks(clock, db):
+    with RateLimiter([("off", 3600, 0)], db) as limiter:
+        verdict = limiter.acquire("a")
+        assert not verdict["ok"] and verdict["retry_after"] == 3600
+
+
+def test_default_rules_from_env(monkeypatch):
+    monkeypatch.setenv("RATE_LIMITS", "1h=3600:4, 24h=86400:20")
+    assert rate_limiter.default_rules() == [("1h", 3600, 4), ("24h", 86400, 20)]
+    monkeypatch.delenv("RATE_LIMITS")
+    assert [r[0] for r in rate_limiter.default_rules(10)] == ["burst", "1h", "24h", "7d"]
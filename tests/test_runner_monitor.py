@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import os
+
+import runner_monitor
+from runner_monitor import LogTailer, RunnerStats, format_post_result
+
+
+def append(path, text):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def test_reads_only_complete_new_lines(tmp_path):
+    log = str(tmp_path / "runner.log")
+    append(log, "old 1\nold 2\n")
+    tailer = LogTailer(log)
+    assert tailer.read_new() == ["old 1", "old 2"]
+    assert tailer.read_new() == []
+    append(log, "new 1\nhalf")
+    assert tailer.read_new() == ["new 1"]
+    append(log, " line\n")
+    assert tailer.read_new() == ["half line"]
+
+
+def test_missing_file(tmp_path):
+    assert LogTailer(str(tmp_path / "none.log")).read_new() == []
+
+
+def test_first_read_starts_at_the_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(runner_monitor, "INITIAL_TAIL_BYTES", 20)
+    log = str(tmp_path / "runner.log")
+    append(log, "".join(f"line {i}\n" for i in range(10)))
+    # the last 20 of 70 bytes start inside "line 7", which is dropped
+    assert LogTailer(log).read_new() == ["line 8", "line 9"]
+
+
+def test_rotation_finishes_the_old_file_first(tmp_path):
+    log = str(tmp_path / "runner.log")
+    append(log, "a\n")
+    tailer = LogTailer(log)
+    assert tailer.read_new() == ["a"]
+    append(log, "b\n")
+    # what RotatingFileHandler does on rollover
+    os.replace(log, log + ".1")
+    append(log, "c\n")
+    assert tailer.read_new() == ["b", "c"]
+    assert tailer.read_new() == []
+
+
+def test_truncated_file_is_read_from_the_start(tmp_path):
+    log = str(tmp_path / "runner.log")
+    append(log, "a long first line\n")
+    tailer = LogTailer(log)
+    tailer.read_new()
+    with open(log, "w", encoding="utf-8") as f:
+        f.write("x\n")
+    assert tailer.read_new() == ["x"]
+
+
+def test_stats_from_post_results():
+    stats = RunnerStats()
+    stats.feed([f"[2025-01-01 10:00:00] {format_post_result(True, 't1', 12.5)}",
+                f"[2025-01-01 11:00:00] {format_post_result(False, 't2', 30)}"])
+    assert (stats.posted, stats.failed) == (1, 1)
+    assert list(stats.latencies) == [12.5, 30.0]
+    assert "tweet=t2" in stats.last_error
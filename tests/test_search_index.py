@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+
+import search_index
+from search_index import SearchIndex, log_path, normalize_arabic
+from tweet_store import TweetStore
+
+
+def test_arabic_normalisation_and_prefix_search():
+    idx = SearchIndex()
+    idx.update("t1", "مَدْرَسَة الأطفال", ["#تعليم"])
+    idx.update("t2", "مدرسة أخرى", [])
+    assert normalize_arabic("إِلَى") == "الي"
+    assert idx.search("مدرسه") == {"t1", "t2"}
+    assert idx.search("مدرسه الاط") == {"t1"}
+    assert idx.search("تعليم") == {"t1"}
+    idx.remove("t1")
+    assert idx.search("تعليم") == set()
+
+
+def library(tmp_path, n=50):
+    path = str(tmp_path / "tweets.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"id": f"t{i}", "text": f"نص رقم {i}", "hashtags": [], "enabled": True}
+                   for i in range(1, n + 1)], f)
+    return path
+
+
+def test_save_appends_only_the_changes(tmp_path):
+    path = library(tmp_path)
+    store = TweetStore.load(path)
+    store.search("نص")
+    store.add("كلمة جديدة")
+    store.save()  # first save writes the base
+    base_size = os.path.getsize(store.index_path)
+    store.update("t3", text="تعديل فريد")
+    store.delete("t4")
+    store.save()
+    assert os.path.getsize(store.index_path) == base_size
+    with open(log_path(store.index_path), encoding="utf-8") as f:
+        entry = json.loads(f.read().splitlines()[-1])
+    assert set(entry["put"]) == {"t3"} and entry["del"] == ["t4"]
+
+    fresh = TweetStore.load(path)
+    assert [t.id for t in fresh.search("فريد")] == ["t3"]
+    assert fresh.search("نص رقم 4") == []
+    assert [t.id for t in fresh.search("جديده")] == ["t51"]
+    # loaded from base + log, not rebuilt
+    assert fresh.search_index().log_token is not None
+
+
+def test_log_is_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(search_index, "LOG_COMPACT_BYTES", 0)
+    path = library(tmp_path, n=3)
+    store = TweetStore.load(path)
+    store.search("نص")
+    store.save()
+    for i in range(5):
+        store.update("t1", text=f"نسخة {i} " + "طويلة " * 50)
+        store.save()
+    log = log_path(store.index_path)
+    assert not os.path.exists(log) or os.path.getsize(log) <= os.path.getsize(store.index_path)
+    assert [t.id for t in TweetStore.load(path).search("نسخه 4")] == ["t1"]
+
+
+def test_log_of_an_older_base_is_ignored(tmp_path):
+    path = str(tmp_path / "search_index.json")
+    old = search_index.write_index(path, {"t1": ["a"]}, [1, 1])
+    search_index.append_index(path, old, {"t2": ["b"]}, [], [2, 2])
+    with open(log_path(path), "rb") as f:
+        stale = f.read()
+    search_index.write_index(path, {"t1": ["c"]}, [3, 3])
+    with open(log_path(path), "wb") as f:
+        f.write(stale + b'{"log": "cut sh')
+    idx = SearchIndex.load(path)
+    assert idx.docs == {"t1": ["c"]} and idx.signature == [3, 3]
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from tweet_length import (
+    MAX_WEIGHTED_LENGTH,
+    URL_LENGTH,
+    fits,
+    split_thread,
+    weighted_length,
+    worst_case_length,
+)
+
+
+def test_arabic_is_weight_one_and_cjk_or_emoji_weight_two():
+    assert weighted_length("كلمة") == 4
+    assert weighted_length("你好") == 4
+    assert weighted_length("😀") == 2
+    assert weighted_length("👍🏽") == 2  # a skin-toned emoji is still one glyph
+
+
+def test_urls_count_as_a_fixed_length():
+    url = "https://example.com/" + "a" * 100
+    assert weighted_length("see " + url) == 4 + URL_LENGTH
+
+
+def test_worst_case_length_covers_hashtags_and_shuffle_padding():
+    text = "a" * 270
+    assert worst_case_length(text, []) == 270
+    assert worst_case_length(text, ["#tag"]) == 275
+    assert not fits(worst_case_length(text + " (x y)", ["#tag"]))
+    assert fits(MAX_WEIGHTED_LENGTH)
+
+
+def test_short_text_is_one_part():
+    assert split_thread("hello world", ["#a"]) == ["hello world"]
+
+
+def test_explicit_separators_win():
+    assert split_thread("one\n---\ntwo\n  ---  \nthree") == ["one", "two", "three"]
+
+
+def test_parts_fit_and_first_leaves_room_for_hashtags():
+    tags = ["#python", "#threads"]
+    text = "\n\n".join(" ".join(f"word{i}-{j}" for j in range(30)) for i in range(5))
+    parts = split_thread(text, tags)
+    assert len(parts) > 1
+    assert weighted_length(parts[0] + " " + " ".join(tags)) <= MAX_WEIGHTED_LENGTH
+    assert all(weighted_length(p) <= MAX_WEIGHTED_LENGTH for p in parts)
+    # nothing lost or reordered
+    assert " ".join(" ".join(parts).split()) == " ".join(text.split())
+
+
+def test_arabic_splits_at_its_real_weight():
+    text = " ".join(["كلمة"] * 60)  # 299 weighted chars
+    parts = split_thread(text)
+    assert len(parts) == 2
+    assert all(weighted_length(p) <= MAX_WEIGHTED_LENGTH for p in parts)
+    assert split_thread(" ".join(["كلمة"] * 56)) == [" ".join(["كلمة"] * 56)]  # 279
+
+
+def test_a_word_longer_than_the_limit_is_cut():
+    parts = split_thread("x" * 700)
+    assert "".join(parts) == "x" * 700
+    assert all(weighted_length(p) <= MAX_WEIGHTED_LENGTH for p in parts)
+
+
+def test_worst_case_length_of_a_thread():
+    text = "\n\n".join(["a" * 200, "b" * 200])
+    assert worst_case_length(text, ["#tag"], thread=True) <= MAX_WEIGHTED_LENGTH
+    assert worst_case_length(text, ["#tag"]) > MAX_WEIGHTED_LENGTH
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Weighted tweet length (twitter-text v3 rules) and the worst case for a library entry.
+
+Text is NFC-normalised. Code points in the "light" ranges (Latin, Arabic, most scripts below
+U+1100, general punctuation) weigh 1; everything else — CJK, most symbols — weighs 2. An emoji
+sequence (ZWJ joins, skin tones, flags, keycaps) weighs 2 as a whole. URLs count as 23 whatever
+their length. The limit is 280.
+
+The poster shuffles paragraphs/words and adds the hashtags before or after the text, so
+`worst_case_length()` bounds every text the poster can produce from one entry; it is computed
+when a tweet is saved and cached in the record (`Tweet.weighted_length`).
+
+A thread entry (`Tweet.thread`) is posted as several parts: `split_thread()` uses the parts the
+author separated with a line holding only `---`, or else packs paragraphs, then sentences, then
+words into parts that fit. The hashtags go with the first part; the limit applies per part.
+"""
+from __future__ import annotations
+import re
+import unicodedata
+from typing import Iterable, List
+
+MAX_WEIGHTED_LENGTH = 280
+URL_LENGTH = 23
+_SCALE = 100
+_DEFAULT_WEIGHT = 200
+_LIGHT_RANGES = ((0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037))
+
+_URL_RE = re.compile(
+    r"(?P<scheme>https?://)?(?:[^\W_](?:[\w-]*[^\W_])?\.)+[a-z]{2,}(?::\d{1,5})?(?:[/?#][^\s]*)?",
+    re.IGNORECASE,
+)
+_EMOJI_BASE = "\U0001F000-\U0001FAFF\u2300-\u23ff\u2600-\u27bf\u2b00-\u2bff"
+_EMOJI_MOD = "[\ufe0e\ufe0f]?[\U0001F3FB-\U0001F3FF]?"  # variation selector, skin tone
+_EMOJI_RE = re.compile(
+    "[\U0001F1E6-\U0001F1FF]{2}"  # flags
+    "|[0-9#*]\ufe0f?\u20e3"  # keycaps
+    f"|[{_EMOJI_BASE}]{_EMOJI_MOD}(?:\u200d[{_EMOJI_BASE}\u2640\u2642]{_EMOJI_MOD})*[\U000E0020-\U000E007F]*"
+)
+
+
+def _char_weight(cp: int) -> int:
+    for lo, hi in _LIGHT_RANGES:
+        if lo <= cp <= hi:
+            return _SCALE
+    return _DEFAULT_WEIGHT
+
+
+def _plain_weight(text: str) -> int:
+    total = 0
+    pos = 0
+    for m in _EMOJI_RE.finditer(text):
+        total += sum(_char_weight(ord(c)) for c in text[pos:m.start()]) + _DEFAULT_WEIGHT
+        pos = m.end()
+    return total + sum(_char_weight(ord(c)) for c in text[pos:])
+
+
+def weighted_length(text: str) -> int:
+    """Length as counted against the 280 limit."""
+    text = unicodedata.normalize("NFC", text)
+    total = 0
+    pos = 0
+    for m in _URL_RE.finditer(text):
+        total += _plain_weight(text[pos:m.start()])
+        total += _url_weight(m)
+        pos = m.end()
+    total += _plain_weight(text[pos:])
+    return total // _SCALE
+
+
+def _url_weight(m) -> int:
+    # with a scheme it is always a t.co link; a bare domain only is if its TLD is real,
+    # which we cannot check here, so assume the longer of the two
+    if m.group("scheme"):
+        return URL_LENGTH * _SCALE
+    return max(URL_LENGTH * _SCALE, _plain_weight(m.group(0)))
+
+
+_PART_SEPARATOR = re.compile(r"^[ \t]*---[ \t]*$", re.MULTILINE)
+# sentence end: Latin/Arabic punctuation followed by whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?\u061f\u06d4\u2026])\s+")
+
+
+def _pack(pieces: List[str], sep: str, budgets: List[int]) -> List[str]:
+    """Greedily join pieces with sep while each part stays within its budget (last budget repeats)."""
+    parts: List[str] = []
+    cur = ""
+    for piece in pieces:
+        budget = budgets[min(len(parts), len(budgets) - 1)]
+        joined = f"{cur}{sep}{piece}" if cur else piece
+        if weighted_length(joined) <= budget:
+            cur = joined
+        else:
+            if cur:
+                parts.append(cur)
+            cur = piece
+    if cur:
+        parts.append(cur)
+    return parts
+
+
+def _split_piece(piece: str, budget: int) -> List[str]:
+    """A paragraph that does not fit: by sentences, then words, then characters."""
+    if weighted_length(piece) <= budget:
+        return [piece]
+    for pattern, sep in ((_SENTENCE_END, " "), (re.compile(r"\s+"), " ")):
+        pieces = [p for p in pattern.split(piece) if p.strip()]
+        if len(pieces) > 1:
+            return [x for p in _pack(pieces, sep, [budget]) for x in _split_piece(p, budget)]
+    # a single word longer than the limit (a long URL counts as 23 and never gets here)
+    out, cur = [], ""
+    for ch in piece:
+        if cur and weighted_length(cur + ch) > budget:
+            out.append(cur)
+            cur = ""
+        cur += ch
+    return out + ([cur] if cur else [])
+
+
+def split_thread(text: str, hashtags: Iterable[str] = (), limit: int = MAX_WEIGHTED_LENGTH) -> List[str]:
+    """Parts of a thread, in order; the first leaves room for the hashtags."""
+    text = (text or "").strip()
+    if _PART_SEPARATOR.search(text):
+        return [p.strip() for p in _PART_SEPARATOR.split(text) if p.strip()]
+    tags = " ".join(hashtags or [])
+    first = limit - (weighted_length(" " + tags) if tags else 0)
+    paragraphs = [p.strip() for p in text.split("\n\n") if p.strip()]
+    pieces = []
+    for i, p in enumerate(paragraphs):
+        pieces.extend(_split_piece(p, first if i == 0 else limit))
+    return _pack(pieces, "\n\n", [first, limit])
+
+
+def worst_case_length(text: str, hashtags: Iterable[str], thread: bool = False) -> int:
+    """Upper bound of weighted_length() over every post_text.build_post_parts() part."""
+    text = text or ""
+    if thread:
+        parts = split_thread(text, hashtags) or [""]
+        tags = " ".join(hashtags or [])
+        head = weighted_length(parts[0]) + (weighted_length(" " + tags) if tags else 0)
+        return max([head] + [weighted_length(p) for p in parts[1:]])
+    paragraphs = [p for p in text.strip().split("\n\n") if p.strip()]
+    variants = [text, "\n\n".join(paragraphs)]
+    body = max(weighted_length(v) for v in variants)
+    # word shuffling joins tokens with single spaces and pads each (...) group with spaces
+    body += 2 * len(re.findall(r"\([^)]*\)", text))
+    tags = " ".join(hashtags or [])
+    return body + (weighted_length(" " + tags) if tags else 0)
+
+
+def fits(length: int) -> bool:
+    return length <= MAX_WEIGHTED_LENGTH
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Compact in-memory types for tweets and post history.
+
+`Tweet` is a slotted dataclass (no per-instance __dict__). `PostHistory` stores the history
+as two columns: an `array('q')` of timestamps and one packed bytearray of 32-byte sha256
+digests, instead of one dict per post. Both convert to/from the existing JSON layouts, so
+tweets.json and post_history.json keep their format.
+"""
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+DIGEST_SIZE = 32
+KNOWN_KEYS = ("id", "text", "hashtags", "enabled", "weighted_length", "media", "thread")
+
+
+@dataclass(slots=True)
+class Tweet:
+    id: str
+    text: str = ""
+    hashtags: List[str] = field(default_factory=list)
+    enabled: bool = True
+    # أسوأ طول موزون للنص مع الهاشتاغات (tweet_length.worst_case_length)، يُحسب عند الحفظ
+    weighted_length: Optional[int] = None
+    # مسارات صور/فيديو تُرفق بالتغريدة (media_cache.py)
+    media: List[str] = field(default_factory=list)
+    # سلسلة: يُنشر النص على عدة أجزاء متتالية (tweet_length.split_thread)
+    thread: bool = False
+    # مفاتيح إضافية في tweets.json نحتفظ بها كما هي عند الحفظ
+    extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Tweet":
+        extra = {k: v for k, v in d.items() if k not in KNOWN_KEYS}
+        return cls(
+            id=d.get("id", ""),
+            text=d.get("text", ""),
+            hashtags=list(d.get("hashtags", [])),
+            enabled=d.get("enabled", True),
+            weighted_length=d.get("weighted_length"),
+            media=list(d.get("media") or []),
+            thread=bool(d.get("thread", False)),
+            extra=extra or None,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {"id": self.id, "text": self.text, "hashtags": self.hashtags, "enabled": self.enabled}
+        if self.weighted_length is not None:
+            d["weighted_length"] = self.weighted_length
+        if self.media:
+            d["media"] = self.media
+        if self.thread:
+            d["thread"] = True
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+
+def tweets_from_json(data: List[Dict[str, Any]]) -> List[Tweet]:
+    return [Tweet.from_dict(d) for d in data]
+
+
+def tweets_to_json(tweets: List[Tweet]) -> List[Dict[str, Any]]:
+    return [t.to_dict() for t in tweets]
+
+
+class PostHistory:
+    """Posts ordered by timestamp; digest i belongs to timestamp i."""
+
+    __slots__ = ("timestamps", "digests")
+
+    def __init__(self):
+        self.timestamps = array("q")
+        self.digests = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        for i, ts in enumerate(self.timestamps):
+            yield self.digests[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE].hex(), ts
+
+    def append(self, text_hash: str, timestamp: int):
+        digest = bytes.fromhex(text_hash)
+        if self.timestamps and timestamp < self.timestamps[-1]:
+            # out-of-order entry (clock change): keep columns sorted
+            i = bisect_left(self.timestamps, timestamp)
+            self.timestamps.insert(i, timestamp)
+            self.digests[i * DIGEST_SIZE:i * DIGEST_SIZE] = digest
+            return
+        self.timestamps.append(timestamp)
+        self.digests += digest
+
+    def prune(self, cutoff: int) -> "PostHistory":
+        """Drop entries older than `cutoff` (in place)."""
+        i = bisect_left(self.timestamps, cutoff)
+        if i:
+            del self.timestamps[:i]
+            del self.digests[:i * DIGEST_SIZE]
+        return self
+
+    def count_since(self, cutoff: int) -> int:
+        return len(self.timestamps) - bisect_left(self.timestamps, cutoff)
+
+    def hashes_since(self, cutoff: int) -> Set[str]:
+        d = self.digests
+        start = bisect_left(self.timestamps, cutoff) * DIGEST_SIZE
+        return {d[i:i + DIGEST_SIZE].hex() for i in range(start, len(d), DIGEST_SIZE)}
+
+    @classmethod
+    def from_json(cls, data: List[Dict[str, Any]]) -> "PostHistory":
+        hist = cls()
+        rows = []
+        for h in data or []:
+            try:
+                rows.append((int(h.get("timestamp", 0)), bytes.fromhex(h["hash"])))
+            except Exception:
+                continue
+        rows.sort(key=lambda r: r[0])
+        hist.timestamps = array("q", (r[0] for r in rows))
+        hist.digests = bytearray(b"".join(r[1] for r in rows))
+        return hist
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        return [{"hash": h, "timestamp": ts} for h, ts in self]
@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+"""
+Indexed in-memory tweet library shared by manage_tweets.py, the GUI and the poster.
+
+One load, O(1) lookups by id (id -> position dict), a cached max `tN` counter for new ids,
+and a hashtag inverted index — all maintained incrementally by add/update/delete. Deleted
+slots are tombstoned and compacted on save, so a delete does not shift positions.
+
+Full-text search (`search()`) uses `search_index.SearchIndex`, persisted as search_index.json
+next to the library; it is loaded lazily and kept in sync by the same mutations and by save(),
+which appends only the changed tweets' tokens to its log.
+
+Writes take the library lock and append to the change journal (library_journal.py). A store
+remembers the ids it edited since its last write and how each of them looked when loaded. If
+another process rewrote the file in between, save() merges the edits onto the current file
+instead of overwriting it: LibraryConflict when one of those tweets is no longer as loaded there,
+and new tweets whose id was taken meanwhile are renumbered (see finish_save()).
+"""
+from __future__ import annotations
+import json
+import logging
+import os
+from typing import Dict, Iterator, List, Optional, Set
+
+import library_journal
+from backup_store import BackupStore
+from library_journal import LibraryConflict, LibraryLock
+from search_index import SearchIndex, append_index, file_signature, log_needs_compaction, write_index
+from tweet_length import worst_case_length
+from tweet_models import Tweet, tweets_from_json, tweets_to_json
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TWEETS_FILE = os.path.join(ROOT, "tweets.json")
+
+
+def sqlite_backend() -> bool:
+    return os.getenv("TWEETS_BACKEND", "json").lower() == "sqlite"
+
+
+def open_store(json_path: str = TWEETS_FILE):
+    """TweetStore over tweets.json, or the SQLite backend when TWEETS_BACKEND=sqlite."""
+    if sqlite_backend():
+        from sqlite_store import SqliteTweetStore
+        return SqliteTweetStore.load()
+    return TweetStore.load(json_path)
+
+
+def _id_number(tid: str) -> int:
+    if isinstance(tid, str) and tid.startswith("t"):
+        try:
+            return int(tid[1:])
+        except ValueError:
+            return 0
+    return 0
+
+
+def _tag_key(tag: str) -> str:
+    return tag.lstrip("#").lower()
+
+
+def _content(record: dict) -> tuple:
+    """What a merge compares: the editable fields of a JSON record (not the cached length)."""
+    return (record.get("text", ""), list(record.get("hashtags", [])), record.get("enabled", True),
+            list(record.get("media") or []), bool(record.get("thread", False)))
+
+
+class TweetStore:
+    def __init__(self, tweets: Optional[List[Tweet]] = None, path: str = TWEETS_FILE):
+        self.path = path
+        self._items: List[Optional[Tweet]] = []
+        self._pos: Dict[str, int] = {}
+        self._by_tag: Dict[str, Set[str]] = {}
+        self._max_n = 0
+        self._live = 0
+        self.dirty = False
+        self.index_path = os.path.join(os.path.dirname(os.path.abspath(path)), "search_index.json")
+        self._search: Optional[SearchIndex] = None
+        # ids touched since the last save, applied to a persisted index loaded later
+        self._changed: Set[str] = set()
+        self._removed: Set[str] = set()
+        self._signature = file_signature(path)
+        # journal version and sha256 of the file as last read or written (None: unknown)
+        self.version: Optional[int] = None
+        self.digest: Optional[str] = None
+        # the version these in-memory tweets are; differs from `version` once a write merged
+        # others' changes into the file, and then every later write merges too
+        self._loaded: Optional[int] = None
+        # id -> save generation of its last edit, until a write of that generation succeeded
+        self._edited: Dict[str, int] = {}
+        # id -> _content() of the tweet before this store's first unsaved edit (None: added here)
+        self._base: Dict[str, Optional[tuple]] = {}
+        self._generation = 0
+        # (generation, {id: written content}, {old id: new id}) of a finished write, for finish_save()
+        self._finished = None
+        for t in tweets or []:
+            self._insert(t)
+
+    @classmethod
+    def load(cls, path: str = TWEETS_FILE) -> "TweetStore":
+        if not os.path.exists(path):
+            return cls(path=path)
+        # stat before reading: if the file is replaced in between, the next save merges
+        signature = file_signature(path)
+        with open(path, "rb") as f:
+            raw = f.read()
+        return cls.from_snapshot(json.loads(raw.decode("utf-8")), path, signature, library_journal.digest_of(raw))
+
+    @classmethod
+    def from_snapshot(cls, records: List[dict], path: str, signature, digest: Optional[str]) -> "TweetStore":
+        """A store over JSON records read from `path` when it had `signature` and sha256 `digest`."""
+        store = cls(tweets_from_json(records), path=path)
+        store._signature = signature
+        store.digest = digest
+        if digest is not None:
+            store.version = store._loaded = library_journal.version_for(library_journal.read_entries(path), digest)
+        return store
+
+    # --- index maintenance ---
+    def _index_tags(self, t: Tweet):
+        for tag in t.hashtags:
+            self._by_tag.setdefault(_tag_key(tag), set()).add(t.id)
+
+    def _unindex_tags(self, t: Tweet):
+        for tag in t.hashtags:
+            ids = self._by_tag.get(_tag_key(tag))
+            if ids is not None:
+                ids.discard(t.id)
+                if not ids:
+                    del self._by_tag[_tag_key(tag)]
+
+    def _insert(self, t: Tweet):
+        self._pos[t.id] = len(self._items)
+        self._items.append(t)
+        self._live += 1
+        self._max_n = max(self._max_n, _id_number(t.id))
+        self._index_tags(t)
+
+    # --- queries ---
+    def __len__(self) -> int:
+        return self._live
+
+    def __iter__(self) -> Iterator[Tweet]:
+        return (t for t in self._items if t is not None)
+
+    def __contains__(self, tid: str) -> bool:
+        return tid in self._pos
+
+    def all(self) -> List[Tweet]:
+        return [t for t in self._items if t is not None]
+
+    def enabled(self) -> List[Tweet]:
+        return [t for t in self._items if t is not None and t.enabled]
+
+    def get(self, tid: str) -> Optional[Tweet]:
+        i = self._pos.get(tid)
+        return None if i is None else self._items[i]
+
+    def by_hashtag(self, tag: str) -> List[Tweet]:
+        ids = self._by_tag.get(_tag_key(tag), ())
+        return sorted((self._items[self._pos[i]] for i in ids), key=lambda t: self._pos[t.id])
+
+    def hashtags(self) -> List[str]:
+        return sorted(self._by_tag)
+
+    def next_id(self) -> str:
+        return f"t{self._max_n + 1}"
+
+    def search_index(self) -> SearchIndex:
+        if self._search is None:
+            idx = SearchIndex.load(self.index_path)
+            if idx is None or idx.signature is None or idx.signature != self._signature:
+                idx = SearchIndex.build(self)
+                idx.signature = self._signature
+                if self._signature is not None and not (self._changed or self._removed):
+                    idx.save(self.index_path)
+            else:
+                for tid in self._removed:
+                    idx.remove(tid)
+                for tid in self._changed:
+                    t = self.get(tid)
+                    if t is not None:
+                        idx.update(t.id, t.text, t.hashtags)
+            self._search = idx
+        return self._search
+
+    def search(self, query: str) -> List[Tweet]:
+        """Tweets matching every word of `query` (Arabic-normalised), in library order."""
+        ids = self.search_index().search(query)
+        if len(ids) * 8 > len(self._items):
+            # broad match: one ordered scan is cheaper than sorting
+            return [t for t in self._items if t is not None and t.id in ids]
+        return sorted((self._items[self._pos[i]] for i in ids if i in self._pos), key=lambda t: self._pos[t.id])
+
+    def _mark(self, tid: str, before: Optional[Tweet]):
+        # call before changing the tweet
+        if tid not in self._base:
+            self._base[tid] = None if before is None else _content(before.to_dict())
+        self._edited[tid] = self._generation
+
+    def _touch(self, t: Tweet):
+        self._changed.add(t.id)
+        if self._search is not None:
+            self._search.update(t.id, t.text, t.hashtags)
+
+    # --- mutations ---
+    def add(self, text: str, hashtags: Optional[List[str]] = None, enabled: bool = True,
+            media: Optional[List[str]] = None, thread: bool = False) -> Tweet:
+        t = Tweet(id=self.next_id(), text=text, hashtags=list(hashtags or []), enabled=enabled, media=list(media or []),
+                  thread=thread)
+        t.weighted_length = worst_case_length(t.text, t.hashtags, t.thread)
+        self._insert(t)
+        self._touch(t)
+        self._mark(t.id, None)
+        self.dirty = True
+        return t
+
+    def update(self, tid: str, text: Optional[str] = None, hashtags: Optional[List[str]] = None,
+               enabled: Optional[bool] = None, media: Optional[List[str]] = None,
+               thread: Optional[bool] = None) -> Optional[Tweet]:
+        t = self.get(tid)
+        if t is None:
+            return None
+        self._mark(tid, t)
+        if text is not None:
+            t.text = text
+        if media is not None:
+            t.media = list(media)
+        if thread is not None and thread != t.thread:
+            t.thread = thread
+            t.weighted_length = worst_case_length(t.text, t.hashtags, t.thread)
+        if hashtags is not None:
+            self._unindex_tags(t)
+            t.hashtags = list(hashtags)
+            self._index_tags(t)
+        if enabled is not None:
+            t.enabled = enabled
+        if text is not None or hashtags is not None:
+            t.weighted_length = worst_case_length(t.text, t.hashtags, t.thread)
+            self._touch(t)
+        self.dirty = True
+        return t
+
+    def delete(self, tid: str) -> Optional[Tweet]:
+        i = self._pos.pop(tid, None)
+        if i is None:
+            return None
+        t = self._items[i]
+        self._mark(tid, t)
+        self._items[i] = None
+        self._live -= 1
+        self._unindex_tags(t)
+        self._changed.discard(tid)
+        self._removed.add(tid)
+        if self._search is not None:
+            self._search.remove(tid)
+        self.dirty = True
+        return t
+
+    def refresh_lengths(self) -> int:
+        """Recompute every cached weighted length; returns how many changed."""
+        changed = 0
+        for t in self:
+            n = worst_case_length(t.text, t.hashtags, t.thread)
+            if n != t.weighted_length:
+                self._mark(t.id, t)
+                t.weighted_length = n
+                changed += 1
+        if changed:
+            self.dirty = True
+        return changed
+
+    # --- persistence ---
+    def _compact(self):
+        if self._live == len(self._items):
+            return
+        self._items = [t for t in self._items if t is not None]
+        self._pos = {t.id: i for i, t in enumerate(self._items)}
+
+    def backup(self) -> Optional[str]:
+        # content-addressed: unchanged contents cost a hash and no write
+        return BackupStore(self.path).backup_target()
+
+    def save(self) -> Optional[str]:
+        """Write the whole library once (atomic replace); returns the backup path if any."""
+        backup = self.write_prepared(self.prepare_save())
+        self.finish_save()
+        return backup
+
+    def prepare_save(self):
+        """In-memory half of save(): a snapshot that write_prepared() can write from another
+        thread while this store keeps being edited (Tweet fields are replaced, never mutated)."""
+        self.finish_save()
+        self._compact()
+        for t in self._items:
+            # records from older files or bulk loads get their cached length once
+            if t.weighted_length is None:
+                t.weighted_length = worst_case_length(t.text, t.hashtags, t.thread)
+        data = tweets_to_json(self._items)
+        # the search index is only maintained once it exists (built on the first search); when the
+        # persisted one is these docs as of the last write, only the tweets changed since are appended
+        index = None
+        if self._search is not None or os.path.exists(self.index_path):
+            idx = self.search_index()
+            if (idx.log_token is not None and idx.signature == self._signature
+                    and not log_needs_compaction(self.index_path)):
+                index = (idx.log_token, {tid: idx.docs[tid] for tid in self._changed if tid in idx.docs},
+                         sorted(self._removed))
+            else:
+                index = (None, dict(idx.docs), [])
+            # set again once written: after a failed write the next save rewrites it whole
+            idx.log_token = None
+        # the delta since the last successful write (edits of a failed write are still here);
+        # a tweet added and deleted again never reached the file
+        put = [data[self._pos[tid]] for tid in self._edited if tid in self._pos]
+        dels = [tid for tid in self._edited if tid not in self._pos and self._base[tid] is not None]
+        bases = {tid: self._base[tid] for tid in self._edited}
+        generation = self._generation
+        self._generation += 1
+        self._changed.clear()
+        self._removed.clear()
+        self.dirty = False
+        return data, index, put, dels, bases, generation
+
+    def write_prepared(self, prepared) -> Optional[str]:
+        """Disk half of save(), under the library lock: backup, atomic write, journal entry, search
+        index. If another process wrote the file since this store read it, the delta is merged
+        onto the current contents instead (see _merge()). Safe to run on another thread; the
+        store's own thread calls finish_save() afterwards."""
+        data, index, put, dels, bases, generation = prepared
+        renamed = {}
+        with LibraryLock(self.path):
+            entries = library_journal.read_entries(self.path)
+            merged = self._loaded != self.version or file_signature(self.path) != self._signature
+            if merged:
+                data, base, put, renamed = self._merge(entries, put, dels, bases)
+                index = None  # describes this store, not the merged file: rebuilt on the next load
+            else:
+                base = self.version
+            backup = self.backup()
+            raw = (json.dumps(data, ensure_ascii=False, indent=2) + "\n").encode("utf-8")
+            digest = library_journal.digest_of(raw)
+            # a delta is only meaningful on top of the journal's last version
+            full = base is None or not entries or base != entries[-1]["v"]
+            # journaled before the replace, so whoever reads the new file finds its version
+            version = library_journal.append(self.path, entries, digest, put, dels, full=full)
+            tmp = self.path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(raw)
+            os.replace(tmp, self.path)
+            self._signature = file_signature(self.path)
+        self.version, self.digest = version, digest
+        if not merged:
+            self._loaded = version
+        self._finished = (generation, {r["id"]: _content(r) for r in put}, renamed)
+        if index is not None:
+            token, docs, removed = index
+            if token is None:
+                token = write_index(self.index_path, docs, self._signature)
+            else:
+                append_index(self.index_path, token, docs, removed, self._signature)
+            if self._search is not None:
+                self._search.signature = self._signature
+                self._search.log_token = token
+        return backup
+
+    def behind(self) -> bool:
+        """The file holds other writers' changes that these in-memory tweets lack (after a merge)."""
+        return self._loaded != self.version
+
+    def finish_save(self) -> Dict[str, str]:
+        """After a write_prepared(), on the store's own thread: forget the edits it wrote and give
+        tweets the merge renumbered their new ids. Returns {old id: new id}."""
+        if self._finished is None:
+            return {}
+        generation, written, renamed = self._finished
+        self._finished = None
+        if renamed:
+            self._max_n = max(self._max_n, max(_id_number(new) for new in renamed.values()))
+        for old, new in renamed.items():
+            if new in self._pos:
+                # added while that write ran: still unsaved, so it can move on as well
+                self._rename(new, self.next_id())
+            self._rename(old, new)
+        for tid in list(self._edited):
+            if self._edited[tid] <= generation:
+                del self._edited[tid]
+                del self._base[tid]
+            elif tid in written:
+                # edited again while it was being written: compare with what was written
+                self._base[tid] = written[tid]
+        return renamed
+
+    def _rename(self, old: str, new: str):
+        i = self._pos.pop(old, None)
+        if i is not None:
+            t = self._items[i]
+            self._unindex_tags(t)
+            t.id = new
+            self._pos[new] = i
+            self._index_tags(t)
+            self._changed.discard(old)
+            self._removed.add(old)
+            self._touch(t)
+            if self._search is not None:
+                self._search.remove(old)
+        self._max_n = max(self._max_n, _id_number(new))
+        for d in (self._edited, self._base):
+            if old in d:
+                d[new] = d.pop(old)
+
+    def _merge(self, entries: List[dict], put: List[dict], dels: List[str], bases: Dict[str, Optional[tuple]]):
+        """This store's delta applied to the file as it is now: (records, that file's journal
+        version, the records written, {old id: new id}). A three-way check: an edited or
+        deleted tweet must still be as this store loaded it, or LibraryConflict; new tweets
+        whose id another writer took meanwhile get the next free ids."""
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            current = json.loads(raw.decode("utf-8"))
+            version = library_journal.version_for(entries, library_journal.digest_of(raw))
+        except FileNotFoundError:
+            current, version = [], None
+        by_id = {r.get("id"): r for r in current}
+        clash = [r["id"] for r in put if bases[r["id"]] is not None
+                 and (r["id"] not in by_id or _content(by_id[r["id"]]) != bases[r["id"]])]
+        clash += [tid for tid in dels if tid in by_id and _content(by_id[tid]) != bases[tid]]
+        if clash:
+            raise LibraryConflict(clash)
+        renamed = {}
+        taken = sorted((r["id"] for r in put if bases[r["id"]] is None and r["id"] in by_id), key=_id_number)
+        if taken:
+            # past this store's ids too (_max_n only grows): one the other writer deleted may
+            # still be here
+            n = max([self._max_n] + [_id_number(tid) for tid in list(by_id) + [r["id"] for r in put]])
+            for tid in taken:
+                n += 1
+                renamed[tid] = f"t{n}"
+            put = [dict(r, id=renamed[r["id"]]) if r["id"] in renamed else r for r in put]
+        logging.info("Merged %d edited tweet(s) onto the current %s%s.", len(put) + len(dels), self.path,
+                     f" (new ids: {', '.join(f'{a}->{b}' for a, b in renamed.items())})" if renamed else "")
+        return library_journal.merge_records(current, put, dels), version, put, renamed